@@ -0,0 +1,225 @@
+"""
+Compares the interned, integer encoded cards against the previous layout,
+where every deck rebuild created 52 new Card objects holding two strings
+and scoring looked the value up by rank name.
+
+Both layouts are dealt through a deck's deal_card. Deck.deal_card also keeps
+the cards left of every rank for the counts, so the time it takes includes
+that bookkeeping, while the allocations only compare the deck rebuilds.
+
+Run with: python -m benchmarks.card_encoding [-n CARDS]
+"""
+import argparse
+import time
+import tracemalloc
+from random import Random
+from typing import List, Optional
+
+from blackjack.deck import Deck
+
+
+class LegacyCard:
+    """
+    A card laid out like the original Card class, with a __dict__ and two strings.
+    """
+
+    def __init__(self, rank: str, suit: str):
+        """
+        Initializes an instance of LegacyCard
+
+        Parameters:
+            rank (str): The name of the rank
+            suit (str): The name of the suit
+        """
+
+        self._rank = rank
+        self._suit = suit
+
+    @property
+    def rank(self) -> str:
+        """
+        Gets the rank of the card
+
+        Returns:
+            The name of the rank
+        """
+
+        return self._rank
+
+
+class LegacyDeck:
+    """
+    A deck laid out like the original Deck class, rebuilt from new LegacyCard objects.
+    """
+
+    def __init__(self, rng: Random):
+        """
+        Initializes an instance of LegacyDeck, empty until init_deck is called
+
+        Parameters:
+            rng (Random): The source of the shuffles
+        """
+
+        self._cards = []
+        self._rng = rng
+
+    def init_deck(self):
+        """
+        Rebuilds the deck with 52 new cards
+        """
+
+        self._cards.clear()
+        for suit in Deck.card_suits:
+            for rank in Deck.card_ranks:
+                self._cards.append(LegacyCard(rank, suit))
+
+    def shuffle(self):
+        """
+        Shuffles the deck of cards
+        """
+
+        self._rng.shuffle(self._cards)
+
+    def deal_card(self) -> Optional[LegacyCard]:
+        """
+        Removes the last card from the deck
+
+        Returns:
+            The card dealt, or None if the deck is empty
+        """
+
+        if len(self._cards) <= 0:
+            return None
+
+        return self._cards.pop()
+
+
+def legacy_deal(n_cards: int, rng: Random) -> int:
+    """
+    Deals cards from a LegacyDeck, which is rebuilt and shuffled whenever it runs out
+
+    Parameters:
+        n_cards (int): The amount of cards to deal
+        rng (Random): The source of the shuffles
+
+    Returns:
+        The sum of the values dealt, so the work can't be skipped
+    """
+
+    values = dict(Deck.card_values, Ace=1)
+    deck = LegacyDeck(rng)
+    total = 0
+    for _ in range(n_cards):
+        card = deck.deal_card()
+        if card is None:
+            deck.init_deck()
+            deck.shuffle()
+            card = deck.deal_card()
+        total += values[card.rank]
+    return total
+
+
+def interned_deal(n_cards: int, rng: Random) -> int:
+    """
+    Deals cards from a Deck, which is refilled with the shared Card instances
+    and shuffled whenever it runs out
+
+    Parameters:
+        n_cards (int): The amount of cards to deal
+        rng (Random): The source of the shuffles
+
+    Returns:
+        The sum of the values dealt, so the work can't be skipped
+    """
+
+    # Counting cards isn't part of the encoding, so the deck doesn't keep a count
+    deck = Deck(count_systems=(), rng=rng)
+    deck.shuffle()
+    total = 0
+    for _ in range(n_cards):
+        if deck.needs_reshuffle:
+            deck.reshuffle()
+        total += deck.deal_card().value
+    return total
+
+
+def legacy_rebuild_bytes() -> int:
+    """
+    Measures the memory allocated when rebuilding a deck of LegacyCard objects
+
+    Returns:
+        The bytes allocated by one rebuild
+    """
+
+    cards = []
+    tracemalloc.start()
+    cards[:] = [LegacyCard(rank, suit) for suit in Deck.card_suits for rank in Deck.card_ranks]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return allocated
+
+
+def interned_rebuild_bytes() -> int:
+    """
+    Measures the memory allocated when a Deck is refilled with the shared cards
+
+    Returns:
+        The bytes allocated by one rebuild
+    """
+
+    deck = Deck()
+    deck.cards.clear()
+    tracemalloc.start()
+    deck.init_deck()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return allocated
+
+
+def time_deal(deal, n_cards: int) -> float:
+    """
+    Times a dealing function
+
+    Parameters:
+        deal (Callable): The dealing function to measure
+        n_cards (int): The amount of cards to deal
+
+    Returns:
+        The seconds taken
+    """
+
+    start = time.perf_counter()
+    deal(n_cards, Random(0))
+    return time.perf_counter() - start
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Runs the comparison from the command line and prints it per million dealt cards
+
+    Parameters:
+        argv (List[str]): The command line arguments, None to use sys.argv
+    """
+
+    parser = argparse.ArgumentParser(description="Benchmarks the card encoding per million dealt cards.")
+    parser.add_argument("-n", "--cards", type=int, default=1_000_000, help="amount of cards to deal")
+    args = parser.parse_args(argv)
+
+    # Every 52 dealt cards the deck is rebuilt
+    scale = 1_000_000 / args.cards
+    rebuilds = 1_000_000 / 52
+
+    legacy_time = time_deal(legacy_deal, args.cards) * scale
+    interned_time = time_deal(interned_deal, args.cards) * scale
+    legacy_bytes = legacy_rebuild_bytes() * rebuilds
+    interned_bytes = interned_rebuild_bytes() * rebuilds
+
+    print("Per million dealt cards:")
+    print(f"  legacy:   {legacy_time:.3f} s, {legacy_bytes / 2 ** 20:.1f} MiB allocated by deck rebuilds")
+    print(f"  interned: {interned_time:.3f} s, {interned_bytes / 2 ** 20:.1f} MiB allocated by deck rebuilds")
+    print(f"  saved:    {legacy_time - interned_time:.3f} s ({1 - interned_time / legacy_time:.1%}), "
+          f"{(legacy_bytes - interned_bytes) / 2 ** 20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+"""
+Puts load on a game server with many bot players, each one on its own connection,
+betting, hitting and staying following a player policy with a random think time
+between actions. Every second it reports the actions and rounds per second and the
+p50/p95/p99/max latency of the actions, measured from sending a command to reading
+the end of its answer, and a summary of the whole run at the end.
+
+Unless --connect is given, a server is started for the run on a free local port and
+stopped after it. With --max-p99 or --min-throughput it fails when the run is slower
+than allowed, so it can be used as a capacity check.
+
+Run with: python -m benchmarks.load [-n BOTS] [--duration SECONDS] [--policy NAME] [--think MS]
+"""
+import argparse
+import asyncio
+import re
+import resource
+import subprocess
+import sys
+import time
+from random import Random
+from typing import List, Optional, Sequence, Tuple
+
+from blackjack.policy import PLAYER_POLICIES, PlayerPolicy
+from blackjack.server import RANK_CODES
+
+# Policies that decide on their own, the interactive one would ask for input
+BOT_POLICIES = sorted(name for name in PLAYER_POLICIES if name != "interactive")
+
+# The hard value of every rank code of the protocol, aces are 1
+RANK_VALUES = {code: min(index + 2, 10) for index, code in enumerate(RANK_CODES)}
+RANK_VALUES["A"] = 1
+
+
+def percentiles(latencies: Sequence[float]) -> Tuple[float, float, float, float]:
+    """
+    Works out the latency percentiles, by nearest rank
+
+    Parameters:
+        latencies (Sequence[float]): The latencies, in seconds
+
+    Returns:
+        The p50, p95, p99 and max latency, all 0 when there are none
+    """
+
+    if not latencies:
+        return 0.0, 0.0, 0.0, 0.0
+
+    ordered = sorted(latencies)
+    last = len(ordered) - 1
+    return (ordered[last * 50 // 100], ordered[last * 95 // 100],
+            ordered[last * 99 // 100], ordered[last])
+
+
+class Recorder:
+    """
+    This class collects the latency of every action, for the current
+    interval and for the whole run.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty Recorder
+        """
+
+        self.latencies: List[float] = []
+        self.rounds = 0
+        self.errors = 0
+        self._interval: List[float] = []
+        self._interval_rounds = 0
+
+    def action(self, seconds: float):
+        """
+        Records the latency of an action
+
+        Parameters:
+            seconds (float): How long the answer took
+        """
+
+        self.latencies.append(seconds)
+        self._interval.append(seconds)
+
+    def round(self):
+        """
+        Records that a round was settled
+        """
+
+        self.rounds += 1
+        self._interval_rounds += 1
+
+    def interval(self) -> Tuple[List[float], int]:
+        """
+        Takes what was recorded since the last interval
+
+        Returns:
+            The latencies of the actions and the amount of rounds settled
+        """
+
+        latencies, rounds = self._interval, self._interval_rounds
+        self._interval = []
+        self._interval_rounds = 0
+        return latencies, rounds
+
+
+def _line(label: str, seconds: float, latencies: Sequence[float], rounds: int) -> str:
+    """
+    Describes the load over a period in one line
+
+    Parameters:
+        label (str): What the period is, e.g. the second of the run
+        seconds (float): How long the period was
+        latencies (Sequence[float]): The latency of every action in the period
+        rounds (int): The rounds settled in the period
+
+    Returns:
+        The line with the throughput and the latency percentiles in milliseconds
+    """
+
+    p50, p95, p99, worst = percentiles(latencies)
+    return (f"{label:>6} {len(latencies) / seconds:>10.0f} {rounds / seconds:>9.0f} "
+            f"{p50 * 1000:>8.2f} {p95 * 1000:>8.2f} {p99 * 1000:>8.2f} {worst * 1000:>8.2f}")
+
+
+class Bot:
+    """
+    This class plays as one player over a connection, until the run is over.
+    """
+
+    def __init__(self, policy: PlayerPolicy, rng: Random, think: float, recorder: Recorder):
+        """
+        Initializes an instance of Bot
+
+        Parameters:
+            policy (PlayerPolicy): Decides the bets and whether to hit
+            rng (Random): The source of the think times
+            think (float): The mean seconds the bot waits before every action, 0 to not wait
+            recorder (Recorder): Where the latency of every action is recorded
+        """
+
+        self._policy = policy
+        self._rng = rng
+        self._think = think
+        self._recorder = recorder
+        self._tokens = 0
+
+    async def _send(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                    command: str) -> List[str]:
+        """
+        Sends a command and reads its whole answer, recording how long it took
+
+        Parameters:
+            reader (asyncio.StreamReader): The incoming side of the connection
+            writer (asyncio.StreamWriter): The outgoing side of the connection
+            command (str): The command, without the line break
+
+        Returns:
+            The lines of the answer
+        """
+
+        start = time.perf_counter()
+        writer.write(f"{command}\n".encode())
+        await writer.drain()
+
+        lines = []
+        while True:
+            line = (await reader.readline()).decode().strip()
+            if not line:
+                raise ConnectionError("The server closed the connection")
+
+            lines.append(line)
+            kind = line.split(maxsplit=1)[0]
+            # An answer ends with an error, with the tokens once the round is
+            # settled, or with the cards the player decides on next
+            if kind in ("ERROR", "TOKENS"):
+                break
+            if kind == "UPCARD" and int(lines[-2].split()[-1]) < 21:
+                break
+            if kind == "HAND" and command == "HIT" and int(line.split()[-1]) < 21:
+                break
+
+        self._recorder.action(time.perf_counter() - start)
+        if kind == "TOKENS":
+            self._tokens = int(line.split()[1])
+            if command != "AGAIN":
+                self._recorder.round()
+        elif kind == "ERROR":
+            self._recorder.errors += 1
+
+        return lines
+
+    async def _wait(self):
+        """
+        Thinks before the next action
+        """
+
+        if self._think:
+            await asyncio.sleep(self._rng.expovariate(1 / self._think))
+
+    async def run(self, host: str, port: int, deadline: float):
+        """
+        Plays rounds until the deadline, starting over when out of tokens
+
+        Parameters:
+            host (str): The address of the server
+            port (int): The port of the server
+            deadline (float): The time.perf_counter() value to stop at
+        """
+
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            self._recorder.errors += 1
+            return
+
+        try:
+            await reader.readline()
+            self._tokens = int((await reader.readline()).split()[1])
+
+            while time.perf_counter() < deadline:
+                await self._wait()
+                if self._tokens <= 0:
+                    await self._send(reader, writer, "AGAIN")
+                    continue
+
+                lines = await self._send(reader, writer, f"BET {self._policy.bet(self._tokens)}")
+                if lines[-1].startswith(("ERROR", "TOKENS")):
+                    continue
+
+                upcard = RANK_VALUES[lines[2].split()[1][:-1]]
+                hand = lines[1].split()
+                while True:
+                    total = int(hand[-1])
+                    hard = sum(RANK_VALUES[code[:-1]] for code in hand[1:-1])
+                    await self._wait()
+                    if not self._policy.hit(total, total != hard, upcard):
+                        await self._send(reader, writer, "STAY")
+                        break
+
+                    lines = await self._send(reader, writer, "HIT")
+                    if lines[-1].startswith(("ERROR", "TOKENS")):
+                        break
+                    hand = lines[0].split()
+
+            writer.write(b"QUIT\n")
+            await writer.drain()
+        except (ConnectionError, ValueError, IndexError):
+            self._recorder.errors += 1
+        finally:
+            writer.close()
+
+
+def start_server(decks: int) -> Tuple[subprocess.Popen, int]:
+    """
+    Starts a game server on a free local port, in its own process
+
+    Parameters:
+        decks (int): The amount of decks in every session's shoe
+
+    Returns:
+        The server's process and the port it listens on
+    """
+
+    process = subprocess.Popen([sys.executable, "-u", "-m", "blackjack.server", "--port", "0",
+                                "--timeout", "0", "-d", str(decks)], stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    match = re.search(r"(\d+)\)", line)
+    if match is None:
+        process.kill()
+        raise RuntimeError(f"The server didn't start: {line!r}")
+
+    return process, int(match.group(1))
+
+
+def _raise_file_limit(bots: int):
+    """
+    Raises the limit of open files so every bot and its session can connect
+
+    Parameters:
+        bots (int): The amount of bots
+    """
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = bots + 256
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        limit = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+
+
+async def _start_bots(bots: List[Bot], tasks: List[asyncio.Task], host: str, port: int,
+                      start: float, ramp: float, deadline: float):
+    """
+    Starts the bots evenly over the ramp, each one at its own time so delays don't add up
+
+    Parameters:
+        bots (List[Bot]): The bots to start
+        tasks (List[asyncio.Task]): Where the task of every started bot is added
+        host (str): The address of the server
+        port (int): The port of the server
+        start (float): The time.perf_counter() value the ramp starts at
+        ramp (float): Seconds over which the bots are started
+        deadline (float): The time.perf_counter() value the bots stop at
+    """
+
+    for index, bot in enumerate(bots):
+        delay = start + ramp * index / len(bots) - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(bot.run(host, port, deadline)))
+
+
+async def load(host: str, port: int, bots: int, duration: float, policy: str, think: float,
+               ramp: float, seed: Optional[int]) -> Tuple[Recorder, float]:
+    """
+    Plays every bot against the server for the duration, printing a line every second
+
+    Parameters:
+        host (str): The address of the server
+        port (int): The port of the server
+        bots (int): The amount of bots
+        duration (float): Seconds to play for once every bot was started
+        policy (str): The name of the policy every bot plays, see BOT_POLICIES
+        think (float): The mean seconds every bot waits before an action
+        ramp (float): Seconds over which the bots are started
+        seed (int): The seed of the think times, None for random ones
+
+    Returns:
+        What was recorded over the whole run and how many seconds it took
+    """
+
+    recorder = Recorder()
+    rng = Random(seed)
+    # Policies only depend on their arguments, so the bots share one
+    shared = PLAYER_POLICIES[policy]()
+    players = [Bot(shared, Random(rng.random()), think, recorder) for _ in range(bots)]
+
+    print(f"{'second':>6} {'actions/s':>10} {'rounds/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    start = time.perf_counter()
+    deadline = start + ramp + duration
+    tasks: List[asyncio.Task] = []
+    starter = asyncio.create_task(_start_bots(players, tasks, host, port, start, ramp, deadline))
+
+    last = start
+    while not starter.done() or not all(task.done() for task in tasks):
+        if starter.done():
+            # Returns early once every bot stopped
+            await asyncio.wait(tasks, timeout=1.0)
+        else:
+            await asyncio.sleep(1.0)
+        now = time.perf_counter()
+        latencies, rounds = recorder.interval()
+        print(_line(f"{now - start:.0f}", now - last, latencies, rounds))
+        last = now
+
+    return recorder, time.perf_counter() - start
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Runs the load test from the command line, against a server it starts or one given with --connect
+
+    Parameters:
+        argv (List[str]): The command line arguments, None to use sys.argv
+
+    Returns:
+        The exit status, 1 if the run missed --max-p99 or --min-throughput
+    """
+
+    parser = argparse.ArgumentParser(description="Puts load on a game server with bot players.")
+    parser.add_argument("-n", "--bots", type=int, default=1000, help="bots playing at once")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to play once every bot started")
+    parser.add_argument("--ramp", type=float, default=1.0, help="seconds over which the bots are started")
+    parser.add_argument("--policy", choices=BOT_POLICIES, default="basic", help="how the bots bet and play")
+    parser.add_argument("--think", type=float, default=100.0, help="mean milliseconds a bot waits before acting")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="seed of the think times")
+    parser.add_argument("-d", "--decks", type=int, default=6, help="decks in every shoe of a started server")
+    parser.add_argument("--connect", default=None, metavar="HOST:PORT",
+                        help="play against a running server instead of starting one")
+    parser.add_argument("--max-p99", type=float, default=None, metavar="MS",
+                        help="fail when the p99 latency of the run is higher")
+    parser.add_argument("--min-throughput", type=float, default=None, metavar="ACTIONS",
+                        help="fail when fewer actions per second were answered")
+    args = parser.parse_args(argv)
+
+    _raise_file_limit(args.bots)
+    process = None
+    if args.connect:
+        host, port = args.connect.rsplit(":", 1)
+        port = int(port)
+    else:
+        process, port = start_server(args.decks)
+        host = "127.0.0.1"
+
+    try:
+        recorder, elapsed = asyncio.run(load(host, port, args.bots, args.duration, args.policy,
+                                             args.think / 1000, args.ramp, args.seed))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print(_line("total", elapsed, recorder.latencies, recorder.rounds))
+    print(f"{args.bots} bots played {recorder.rounds} rounds in {elapsed:.1f} s, {recorder.errors} errors")
+
+    _, _, p99, _ = percentiles(recorder.latencies)
+    throughput = len(recorder.latencies) / elapsed
+    failed = False
+    if args.max_p99 is not None and p99 * 1000 > args.max_p99:
+        print(f"FAIL p99 latency {p99 * 1000:.2f} ms is over {args.max_p99} ms")
+        failed = True
+    if args.min_throughput is not None and throughput < args.min_throughput:
+        print(f"FAIL throughput {throughput:.0f} actions/s is under {args.min_throughput}")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
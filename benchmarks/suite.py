@@ -0,0 +1,292 @@
+"""
+Times the hot paths of the game at several scales, saves the results as a baseline
+and compares later runs against it, failing when anything got slower than allowed.
+
+Timings are only comparable on the same machine, so record a baseline with --save
+on the machine that runs the checks. The baseline isn't committed for that reason.
+The default threshold of 25% leaves room for the noise of a busy machine,
+lower it on a quiet one.
+
+Run with: python -m benchmarks.suite [--save] [--baseline FILE] [--threshold PERCENT]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import timeit
+from typing import Callable, Dict, List, Optional, Tuple
+
+from blackjack import blackjack
+from blackjack.currency import Currency
+from blackjack.deck import Deck
+from blackjack.engine import Engine
+from blackjack.hand import Hand
+
+# Where the baseline is kept when no other file is given
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# A benchmark builds the function to time and says how many times to call it per repeat
+Benchmark = Callable[[], Tuple[Callable[[], object], int]]
+
+
+def _deck(decks: int) -> Deck:
+    """
+    Builds a shuffled deck, or a shoe when there's more than one deck
+
+    Parameters:
+        decks (int): The amount of decks
+
+    Returns:
+        The shuffled Deck or Shoe
+    """
+
+    return blackjack.init_deck() if decks == 1 else blackjack.init_shoe(decks)
+
+
+def count_points(cards: int) -> Benchmark:
+    """
+    Times counting the points of a hand
+
+    Parameters:
+        cards (int): The amount of cards in the hand
+
+    Returns:
+        The benchmark
+    """
+
+    def build():
+        deck = _deck(1)
+        hand = Hand([deck.deal_card() for _ in range(cards)])
+        return lambda: blackjack.count_points(hand), 200_000
+
+    return build
+
+
+def init_deck(decks: int) -> Benchmark:
+    """
+    Times refilling a deck with all of its cards
+
+    Parameters:
+        decks (int): The amount of decks
+
+    Returns:
+        The benchmark
+    """
+
+    def build():
+        deck = _deck(decks)
+        return deck.init_deck, 20_000 // decks
+
+    return build
+
+
+def shuffle(decks: int) -> Benchmark:
+    """
+    Times shuffling a deck
+
+    Parameters:
+        decks (int): The amount of decks
+
+    Returns:
+        The benchmark
+    """
+
+    def build():
+        deck = _deck(decks)
+        return deck.shuffle, 5_000 // decks
+
+    return build
+
+
+def deal_card(decks: int) -> Benchmark:
+    """
+    Times dealing a card, reshuffling the deck whenever it runs out
+
+    Parameters:
+        decks (int): The amount of decks
+
+    Returns:
+        The benchmark
+    """
+
+    def build():
+        deck = _deck(decks)
+
+        def deal():
+            # The deck is refilled when it runs out, which is part of dealing a whole deck
+            if deck.cards_left == 0:
+                deck.reshuffle()
+            return deck.deal_card()
+
+        return deal, 100_000
+
+    return build
+
+
+def reset_turn(decks: int) -> Benchmark:
+    """
+    Times dealing new hands to the player and the dealer
+
+    Parameters:
+        decks (int): The amount of decks
+
+    Returns:
+        The benchmark
+    """
+
+    def build():
+        deck = _deck(decks)
+        hands = [blackjack.init_hand(deck), blackjack.init_hand(deck)]
+        return lambda: blackjack.reset_turn(hands, deck), 50_000
+
+    return build
+
+
+def engine_round(decks: int) -> Benchmark:
+    """
+    Times a complete round of the headless engine
+
+    Parameters:
+        decks (int): The amount of decks
+
+    Returns:
+        The benchmark
+    """
+
+    def build():
+        engine = Engine(Currency(10 ** 12), seed=0, decks=decks)
+        return lambda: engine.play_round(100), 50_000
+
+    return build
+
+
+# Every benchmark in the suite, by name
+BENCHMARKS: Dict[str, Benchmark] = {}
+for _cards in (2, 5, 10):
+    BENCHMARKS[f"count_points[{_cards} cards]"] = count_points(_cards)
+for _decks in (1, 6, 8):
+    BENCHMARKS[f"init_deck[{_decks} decks]"] = init_deck(_decks)
+    BENCHMARKS[f"shuffle[{_decks} decks]"] = shuffle(_decks)
+    BENCHMARKS[f"deal_card[{_decks} decks]"] = deal_card(_decks)
+    BENCHMARKS[f"reset_turn[{_decks} decks]"] = reset_turn(_decks)
+    BENCHMARKS[f"engine_round[{_decks} decks]"] = engine_round(_decks)
+
+
+def run(names: List[str], repeat: int, scale: float) -> Dict[str, float]:
+    """
+    Times the given benchmarks
+
+    Parameters:
+        names (List[str]): The names of the benchmarks to run
+        repeat (int): How many times every benchmark is timed, the fastest one is kept
+        scale (float): Multiplies the amount of calls, lower it for quicker runs
+
+    Returns:
+        The seconds every call took, by benchmark name
+    """
+
+    results = {}
+    for name in names:
+        function, number = BENCHMARKS[name]()
+        number = max(int(number * scale), 1)
+        results[name] = min(timeit.repeat(function, number=number, repeat=repeat)) / number
+        print(f"{name:<28} {results[name] * 1e9:12.1f} ns")
+
+    return results
+
+
+def machine() -> Dict[str, object]:
+    """
+    Describes the machine the benchmarks ran on
+
+    Returns:
+        The machine metadata
+    """
+
+    return {"python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpus": os.cpu_count(),
+            "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")}
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    """
+    Compares the results against the baseline
+
+    Parameters:
+        results (Dict[str, float]): The seconds per call of this run
+        baseline (Dict[str, float]): The seconds per call of the baseline
+        threshold (float): How many percent slower a benchmark can get
+
+    Returns:
+        The names of the benchmarks that regressed
+    """
+
+    regressions = []
+    for name, seconds in results.items():
+        if name not in baseline:
+            continue
+
+        change = (seconds / baseline[name] - 1) * 100
+        regressed = change > threshold
+        print(f"{name:<28} {change:+7.1f}%{'  REGRESSION' if regressed else ''}")
+        if regressed:
+            regressions.append(name)
+
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Runs the benchmarks from the command line, then saves them as the baseline
+    or compares them against it
+
+    Parameters:
+        argv (List[str]): The command line arguments, None to use sys.argv
+
+    Returns:
+        The exit status, 1 if any benchmark regressed
+    """
+
+    parser = argparse.ArgumentParser(description="Benchmarks the hot paths of the game.")
+    parser.add_argument("--baseline", default=BASELINE, help="JSON file holding the baseline")
+    parser.add_argument("--save", action="store_true", help="save this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=25.0,
+                        help="fail when a benchmark is this many percent slower than the baseline")
+    parser.add_argument("--repeat", type=int, default=5, help="timings per benchmark, the fastest is kept")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplies the amount of calls timed")
+    parser.add_argument("-k", "--filter", default="", help="only run benchmarks whose name contains this")
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    results = run(names, args.repeat, args.scale)
+
+    if args.save:
+        with open(args.baseline, "w") as file:
+            json.dump({"machine": machine(), "results": results}, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save to record one")
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+
+    print(f"\nCompared to the baseline from {baseline['machine']['date']} "
+          f"({baseline['machine']['processor']}, Python {baseline['machine']['python']}):")
+    regressions = compare(results, baseline["results"], args.threshold)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold}%")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,28 +2,64 @@
 This module contains all the functions necessary for the correct
 functioning of the blackjack game.
 """
-from collections import Sequence
+from collections.abc import Sequence
+from random import Random
+from typing import Optional
 
+from blackjack import instrumentation
 from blackjack.currency import Currency
 from blackjack.deck import Deck
 from blackjack.hand import Hand
+from blackjack.rules import DEFAULT_RULES, Rules
+from blackjack.shoe import Shoe
 
+# How many cards every hand is given room for when deciding whether
+# a deck that doesn't keep its discards has to be reshuffled before dealing
+CARDS_PER_HAND = 5
 
-def init_deck() -> Deck:
+
+def init_deck(rng: Optional[Random] = None, lazy: bool = False) -> Deck:
     """
     Initializes the deck
 
+    Parameters:
+        rng (Random): The source of the shuffles, a random.Random or a NumPy Generator,
+        the random module when None
+        lazy (bool): Whether to pick every card when it's dealt instead of shuffling
+
     Returns:
         The deck of cards initialized and shuffled
     """
 
     # Initializes deck and shuffles it
-    d = Deck()
+    d = Deck(rng=rng, lazy=lazy)
     d.shuffle()
 
     return d
 
 
+def init_shoe(decks=6, penetration=0.75, rng: Optional[Random] = None, lazy: bool = False) -> Shoe:
+    """
+    Initializes a shoe of several decks
+
+    Parameters:
+        decks (int): The amount of decks in the shoe
+        penetration (float): The share of the shoe dealt before the cut card
+        rng (Random): The source of the shuffles, a random.Random or a NumPy Generator,
+        the random module when None
+        lazy (bool): Whether to pick every card when it's dealt instead of shuffling
+
+    Returns:
+        The shoe of cards initialized and shuffled
+    """
+
+    # Initializes shoe and shuffles it
+    s = Shoe(decks, penetration, rng=rng, lazy=lazy)
+    s.shuffle()
+
+    return s
+
+
 def init_hand(deck: Deck) -> Hand:
     """
     Initializes a hand of cards
@@ -52,19 +88,24 @@ def init_currency(starting_tokens=1000) -> Currency:
     return Currency(starting_tokens)
 
 
-def ask_bet(currency: Currency):
+@instrumentation.timed("bet")
+def ask_bet(tokens: int, minimum: int = 100) -> int:
     """
     Asks the player how much they want to bet
 
     Parameters:
-        currency (Currency): The player's tokens to bet
+        tokens (int): The tokens the player has
+        minimum (int): The smallest bet allowed
+
+    Returns:
+        The amount of tokens to bet
     """
 
     # This loop will run until the user enters a number
     while True:
         # Asks the user to enter their bet, showing them
         # the tokens they currently own
-        print(f"You have {currency.total_tokens} tokens left!")
+        print(f"You have {tokens} tokens left!")
         p_choice = input("What's your bet? ")
 
         # Checks the user's choice to make sure it's a number
@@ -73,26 +114,20 @@ def ask_bet(currency: Currency):
             print("* You need to enter a number! *\n")
             continue
         
-        # Checks if the bet is at least 100 and if it isn't
+        # Checks if the bet is at least the minimum and if it isn't
         # then it's not a valid bet
-        if int(p_choice) < 100:
-            print("* The minimum bet is 100! *\n")
+        if int(p_choice) < minimum:
+            print(f"* The minimum bet is {minimum}! *\n")
             continue
 
-        # Places the bet as integer, displaying the bet to the console
-        # and ends the loop
-        currency.bet(int(p_choice))
-        print(f"You bet {currency.tokens_bet} tokens!\n")
-        break
+        # The bet is placed by the caller, which also displays it
+        return int(p_choice)
 
 
-def ask_hit_or_stay(hand: Hand, deck: Deck) -> bool:
+@instrumentation.timed("player")
+def ask_hit_or_stay() -> bool:
     """
-    Asks the player whether they want to be hit or stay
-
-    Parameters:
-        hand (Hand): The player's hand
-        deck (Deck): The deck of cards
+    Asks the player whether they want to be hit or stay, the card is dealt by the caller
 
     Returns:
         The player's choice (hit/true or stay/false)
@@ -107,24 +142,7 @@ def ask_hit_or_stay(hand: Hand, deck: Deck) -> bool:
         # The choice is turned into lowercase so there's
         # no need to check for abnormal versions of the word 'hit'
         if (p_choice == 'h') or (p_choice == "hit"):
-            # The player is dealt a card from the deck
-            # The card object could be set to None just in case
-            # the deck has run out of cards
-            new_card = deck.deal_card()
-
-            if new_card:
-                # Adds the card to the player's hand
-                # and shows the user what card they drew
-                # as well as their new hand
-                # then returns the choice
-                hand.hit(new_card)
-                print(f"You got {new_card}!\n")
-                print("This is your hand:")
-                print(f"{hand}\n")
-                return True
-            else:
-                print("* The deck has no more cards left! *\n")
-                break
+            return True
         elif (p_choice == 's') or (p_choice == "stay"):
             # Prints a newline just for neater output
             # and returns the choice
@@ -135,20 +153,20 @@ def ask_hit_or_stay(hand: Hand, deck: Deck) -> bool:
         print("* You need to enter one of the following: h/hit, s/stay *\n")
 
 
-def dealer_hit_or_stay(hand: Hand, deck: Deck):
+@instrumentation.timed("dealer")
+def dealer_hit_or_stay(hand: Hand, deck: Deck, rules: Rules = DEFAULT_RULES):
     """
-    Deals cards to the dealer until they reach a score of 17 or higher
+    Deals cards to the dealer until they reach a score of 17 or higher,
+    or past a soft 17 when the rules say so
 
     Parameters:
         hand (Hand): The hand of cards for the dealer
         deck (Deck): The deck of cards
+        rules (Rules): The rules of the table
     """
 
-    # Counts the dealer's score before starting to deal cards to them
-    current_total = count_points(hand)
-
     # The dealer can only deal cards to themselves if their score is less than 17
-    while current_total < 17:
+    while rules.dealer_hits(hand.total, hand.is_soft):
         # Deals a new card
         new_card = deck.deal_card()
 
@@ -157,9 +175,8 @@ def dealer_hit_or_stay(hand: Hand, deck: Deck):
             break
 
         # Deck isn't empty, therefore hits the dealer's hand
-        # and checks their score after the new card has been dealt
+        # which updates their score with the new card
         hand.hit(new_card)
-        current_total = count_points(hand)
 
 
 def count_points(hand: Hand) -> int:
@@ -173,57 +190,12 @@ def count_points(hand: Hand) -> int:
         The total points a hand of cards has
     """
 
-    total_points = 0
-    # Creates a list of all aces in the hand
-    ace_list = [card for card in hand.cards if card.rank == "Ace"]
+    if instrumentation.enabled:
+        instrumentation.count("count_points")
 
-    # Adds up all the cards that are not aces
-    for card in hand.cards:
-        # Skips aces because they will be counted separately
-        if card.rank == "Ace":
-            continue
-
-        total_points += Deck.card_values[card.rank]
-
-    # There's only one ace in the hand
-    if len(ace_list) == 1:
-        # The total points in the hand without the ace is not more than 10
-        if total_points <= 10:
-            # Ace is valued at 11 points
-            Deck.change_ace_value_to_eleven()
-        else:
-            # Ace is valued at 1 point because the total
-            # already surpasses 10
-            Deck.change_ace_value_to_one()
-
-        # Adds the ace value to the total
-        total_points += Deck.card_values["Ace"]
-    elif len(ace_list) > 1:
-        # There is more than one ace in the hand
-
-        # # The total points in the hand without the aces is not more than 10
-        if total_points <= 10:
-            # First ace is valued at 11 points and added to the total
-            Deck.change_ace_value_to_eleven()
-            total_points += Deck.card_values["Ace"]
-
-            # The remaining aces will all be valued at one
-            # because there can only be one ace valued at 11
-            Deck.change_ace_value_to_one()
-            # Loop starts counting from the second ace
-            # as the first ace has already been counted
-            # and all the aces are added to the total
-            for i in range(1, len(ace_list)):
-                total_points += Deck.card_values["Ace"]
-        else:
-            # The total without aces surpasses 10
-            # therefore all aces will be valued at one
-            # and added to the total
-            Deck.change_ace_value_to_one()
-            for i in range(len(ace_list)):
-                total_points += Deck.card_values["Ace"]
-
-    return total_points
+    # The hand keeps a running score as cards are added, so counting
+    # doesn't need to walk the cards or change the values in the Deck
+    return hand.total
 
 
 def reset_game(deck: Deck, hands: Sequence[Hand], currency: Currency, initial_currency=1000):
@@ -241,8 +213,7 @@ def reset_game(deck: Deck, hands: Sequence[Hand], currency: Currency, initial_cu
     currency.reset(initial_currency)
 
     # Reset deck
-    deck.init_deck()
-    deck.shuffle()
+    deck.reshuffle()
 
     # Reset hands
     for hand in list(hands):
@@ -251,6 +222,7 @@ def reset_game(deck: Deck, hands: Sequence[Hand], currency: Currency, initial_cu
         hand.hit(deck.deal_card())
         
 
+@instrumentation.timed("deal")
 def reset_turn(hands: Sequence[Hand], deck: Deck):
     """
     Clears the player's and dealer's hands and gives them new cards
@@ -260,8 +232,21 @@ def reset_turn(hands: Sequence[Hand], deck: Deck):
         deck (Deck): The deck of cards
     """
     
-    # Reset hands
-    for hand in list(hands):
+    if instrumentation.enabled:
+        instrumentation.count("rounds")
+
+    # Cards in hand go to the discard tray
+    hands = list(hands)
+    for hand in hands:
+        deck.discard(hand.cards)
         hand.clear()
+
+    # The deck is reshuffled between rounds once it's due, or when it
+    # may not have enough cards left to play every hand, like Table.deal
+    if deck.needs_reshuffle or deck.cards_left < CARDS_PER_HAND * len(hands):
+        deck.reshuffle()
+
+    # Deal new hands
+    for hand in hands:
         hand.hit(deck.deal_card())
         hand.hit(deck.deal_card())
@@ -1,6 +1,37 @@
 """
 This module holds the Card class.
+
+Every card is encoded as a small integer from 0 to 51 (suit index * 13 + rank index)
+and the 52 possible cards are built once, so creating a card with the same rank and
+suit always gives back the same immutable instance.
 """
+from typing import Tuple
+
+# All the card suits in the deck
+SUITS = ("Clubs",
+         "Diamonds",
+         "Hearts",
+         "Spades")
+# All the card ranks in the deck
+RANKS = ("Two",
+         "Three",
+         "Four",
+         "Five",
+         "Six",
+         "Seven",
+         "Eight",
+         "Nine",
+         "Ten",
+         "Jack",
+         "Queen",
+         "King",
+         "Ace")
+# The hard value of every rank, indexed like RANKS (aces are valued at 1)
+RANK_VALUES = (2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 1)
+
+# Position of every rank and suit name, used to find a card's code
+_RANK_INDEXES = {rank: index for index, rank in enumerate(RANKS)}
+_SUIT_INDEXES = {suit: index for index, suit in enumerate(SUITS)}
 
 
 class Card:
@@ -9,17 +40,100 @@ class Card:
     access its fields and use its methods.
     """
 
-    def __init__(self, rank: str, suit: str):
+    __slots__ = ("_code", "_rank_index", "_value")
+
+    def __new__(cls, rank: str, suit: str) -> "Card":
         """
-        Initializes an instance of a card object.
+        Gets the instance of a card for the given rank and suit.
 
         Parameters:
             rank (str): The rank for the card e.g. one, jack, ace etc.
             suit (str): The suit for the card e.g. hearts, diamonds etc.
+
+        Returns:
+            The shared Card for that rank and suit.
+        """
+
+        return CARDS[_SUIT_INDEXES[suit] * 13 + _RANK_INDEXES[rank]]
+
+    @classmethod
+    def _build(cls, code: int) -> "Card":
+        """
+        Builds the only instance of the card with the given code.
+
+        Parameters:
+            code (int): The code for the card, from 0 to 51
+
+        Returns:
+            The newly built Card.
+        """
+
+        card = object.__new__(cls)
+        object.__setattr__(card, "_code", code)
+        object.__setattr__(card, "_rank_index", code % 13)
+        object.__setattr__(card, "_value", RANK_VALUES[code % 13])
+        return card
+
+    @staticmethod
+    def from_code(code: int) -> "Card":
+        """
+        Gets the card with the given code.
+
+        Parameters:
+            code (int): The code for the card, from 0 to 51
+
+        Returns:
+            The shared Card for that code.
+        """
+
+        return CARDS[code]
+
+    def __setattr__(self, name, value):
+        """
+        Prevents cards from being changed, since they are shared.
+        """
+
+        raise AttributeError("Cards can't be changed")
+
+    def __reduce__(self):
+        """
+        Allows pickled cards to be loaded back as the shared instances.
         """
 
-        self._rank = rank
-        self._suit = suit
+        return Card.from_code, (self._code,)
+
+    @property
+    def code(self) -> int:
+        """
+        Gets the integer code of a Card.
+
+        Returns:
+            The code of a Card, from 0 to 51.
+        """
+
+        return self._code
+
+    @property
+    def rank_index(self) -> int:
+        """
+        Gets the position of the Card's rank, from Two (0) to Ace (12).
+
+        Returns:
+            The rank index of a Card.
+        """
+
+        return self._rank_index
+
+    @property
+    def value(self) -> int:
+        """
+        Gets the hard value of a Card, with aces valued at 1.
+
+        Returns:
+            The points a Card is worth.
+        """
+
+        return self._value
 
     @property
     def rank(self) -> str:
@@ -30,7 +144,7 @@ class Card:
             The rank of a Card.
         """
 
-        return self._rank
+        return RANKS[self._rank_index]
 
     @property
     def suit(self) -> str:
@@ -41,7 +155,17 @@ class Card:
             The suit of a Card.
         """
 
-        return self._suit
+        return SUITS[self._code // 13]
+
+    def __repr__(self) -> str:
+        """
+        Representation of a Card for debugging.
+
+        Returns:
+            A string with the rank and suit of a Card.
+        """
+
+        return f"Card({self.rank!r}, {self.suit!r})"
 
     def __str__(self) -> str:
         """
@@ -51,4 +175,8 @@ class Card:
             A string displaying info about a Card.
         """
 
-        return f"{self._rank} of {self._suit}"
+        return f"{self.rank} of {self.suit}"
+
+
+# The 52 cards of a standard deck, indexed by their code
+CARDS: Tuple[Card, ...] = tuple(Card._build(code) for code in range(52))
@@ -0,0 +1,84 @@
+"""
+This module holds the CountSystem class and the card counting systems
+that decks can keep track of while cards are dealt.
+"""
+from typing import Dict, Sequence
+
+
+class CountSystem:
+    """
+    This class describes a card counting system: how much every card adds to the
+    running count, and where the running count starts for unbalanced systems.
+    """
+
+    __slots__ = ("_name", "_weights", "_deck_offset")
+
+    def __init__(self, name: str, weights: Sequence[int], deck_offset: int = 0):
+        """
+        Initializes an instance of CountSystem
+
+        Parameters:
+            name (str): The name of the system
+            weights (Sequence[int]): What every card value adds to the running count,
+            from aces (1) to ten-valued cards (10)
+            deck_offset (int): The initial running count for every deck after the first
+        """
+
+        self._name = name
+        # Indexed by the card value itself, there's no card valued at 0
+        self._weights = (0,) + tuple(weights)
+        self._deck_offset = deck_offset
+
+    @property
+    def name(self) -> str:
+        """
+        Gets the name of the system
+
+        Returns:
+            The name of the system
+        """
+
+        return self._name
+
+    @property
+    def weights(self) -> Sequence[int]:
+        """
+        Gets what every card value adds to the running count
+
+        Returns:
+            The weights indexed by card value, aces are valued at 1
+        """
+
+        return self._weights
+
+    def initial_count(self, decks: int) -> int:
+        """
+        Gets the running count of a freshly shuffled shoe
+
+        Parameters:
+            decks (int): The amount of decks in the shoe
+
+        Returns:
+            The initial running count
+        """
+
+        return self._deck_offset * (decks - 1)
+
+    def __str__(self) -> str:
+        """
+        Allows to print out the name of the system
+
+        Returns:
+            The name of the system
+        """
+
+        return self._name
+
+
+# Weights are given from aces to ten-valued cards
+HI_LO = CountSystem("Hi-Lo", (-1, 1, 1, 1, 1, 1, 0, 0, 0, -1))
+KO = CountSystem("KO", (-1, 1, 1, 1, 1, 1, 1, 0, 0, -1), deck_offset=-4)
+OMEGA_II = CountSystem("Omega II", (0, 1, 1, 2, 2, 2, 1, 0, -1, -2))
+
+# Systems that can be selected by name
+COUNT_SYSTEMS: Dict[str, CountSystem] = {system.name: system for system in (HI_LO, KO, OMEGA_II)}
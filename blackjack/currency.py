@@ -1,6 +1,9 @@
 """
 This module holds the Currency class
 """
+from fractions import Fraction
+
+from blackjack import metrics
 
 
 class Currency:
@@ -65,6 +68,11 @@ class Currency:
         # they will go all in, however, they can only bet as much as they own
         self._tokens_bet = bet_amount if (bet_amount < self._total_tokens) else self._total_tokens
 
+        # Every bet starts a round
+        if metrics.enabled:
+            metrics.ROUNDS_STARTED.inc()
+            metrics.TOKENS_WAGERED.inc(self._tokens_bet)
+
     def reset_bet(self):
         """
         Resets the tokens bet to zero
@@ -87,6 +95,18 @@ class Currency:
         self._total_tokens += self._tokens_bet // 2
         self.reset_bet()
 
+    def cash_in_payout(self, payout: Fraction):
+        """
+        Adds to the total tokens based on a share of the player's bet,
+        rounded down like cash_in_half
+
+        Parameters:
+            payout (Fraction): The tokens won for every token bet, e.g. Rules.blackjack_pays
+        """
+
+        self._total_tokens += self._tokens_bet * payout.numerator // payout.denominator
+        self.reset_bet()
+
     def cash_out(self):
         """
         Removes from the total tokens based on the player's bet
@@ -105,3 +125,15 @@ class Currency:
 
         self._total_tokens = initial_amt
         self._tokens_bet = 0
+
+    def restore(self, total_tokens: int, tokens_bet: int):
+        """
+        Puts back the tokens saved from another currency, without placing a new bet
+
+        Parameters:
+            total_tokens (int): The amount of tokens owned
+            tokens_bet (int): The amount of tokens bet on the round being played
+        """
+
+        self._total_tokens = total_tokens
+        self._tokens_bet = tokens_bet
@@ -1,37 +1,31 @@
 """
 This module holds the Deck class.
 """
-from random import shuffle
-from typing import List, Optional
+import random
+from random import Random
+from typing import Dict, List, Optional, Sequence, Tuple
 
-from blackjack.card import Card
+from blackjack import instrumentation, metrics
+from blackjack.card import CARDS, RANKS, SUITS, Card
+from blackjack.count import HI_LO, CountSystem
 
 
 class Deck:
     """
     This class allows you to instantiate a deck of cards
     as well as access its methods.
+
+    A lazy deck doesn't shuffle its cards up front: every card dealt is picked at random
+    from the ones left, which is one step of the same Fisher-Yates shuffle random.shuffle
+    does. Dealing stays O(1) per card and shuffling costs nothing, and a lazy deck given
+    the same random.Random deals the same cards as one shuffled up front. The order of
+    the cards left in a lazy deck isn't the order they'll be dealt in.
     """
 
     # All the card suits in the deck
-    card_suits = ("Clubs",
-                  "Diamonds",
-                  "Hearts",
-                  "Spades")
+    card_suits = SUITS
     # All the card ranks in the deck
-    card_ranks = ("Two",
-                  "Three",
-                  "Four",
-                  "Five",
-                  "Six",
-                  "Seven",
-                  "Eight",
-                  "Nine",
-                  "Ten",
-                  "Jack",
-                  "Queen",
-                  "King",
-                  "Ace")
+    card_ranks = RANKS
     # All the card values based on ranks
     # (Note that the dict keys must coincide with the values in the ranks tuple)
     card_values = {"Two": 2,
@@ -48,11 +42,34 @@ class Deck:
                    "King": 10,
                    "Ace": 11}
 
-    def __init__(self):
+    def __init__(self, count_systems: Sequence[CountSystem] = (HI_LO,), rng: Optional[Random] = None,
+                 lazy: bool = False):
         """
         Initializes an instance of a Deck object.
+
+        Parameters:
+            count_systems (Sequence[CountSystem]): The counting systems to keep track of,
+            the first one is used by running_count and true_count
+            rng (Random): The source of the shuffles, a random.Random or a NumPy Generator,
+            the random module when None
+            lazy (bool): Whether to pick every card when it's dealt instead of shuffling
         """
 
+        # Both kinds of generators shuffle lists, but only random.Random has randrange
+        source = rng if rng is not None else random
+        self._rng = rng
+        self._lazy = lazy
+        self._shuffle = source.shuffle
+        self._randbelow = source.randrange if hasattr(source, "randrange") else source.integers
+
+        # Cards left of every rank and the running count of every system,
+        # updated every time a card is dealt
+        self._count_systems = tuple(count_systems)
+        self._rank_counts = [0] * len(RANKS)
+        self._running_counts = [0] * len(self._count_systems)
+        # How many times the cards have been reshuffled, which numbers the shoes dealt
+        self._reshuffles = 0
+
         # Instantiates and initializes the list of cards.
         self._cards = []
         self.init_deck()
@@ -84,6 +101,227 @@ class Deck:
 
         return self._cards
 
+    @property
+    def rng(self) -> Optional[Random]:
+        """
+        Gets the source of the shuffles.
+
+        Returns:
+            The injected generator, None when the random module is used.
+        """
+
+        return self._rng
+
+    @property
+    def lazy(self) -> bool:
+        """
+        Checks whether cards are picked when they're dealt instead of shuffled up front.
+
+        Returns:
+            True if the deck shuffles lazily, false otherwise.
+        """
+
+        return self._lazy
+
+    @property
+    def decks(self) -> int:
+        """
+        Gets the amount of decks the cards come from.
+
+        Returns:
+            The amount of decks.
+        """
+
+        return 1
+
+    @property
+    def cards_left(self) -> int:
+        """
+        Gets how many cards haven't been dealt yet.
+
+        Returns:
+            The amount of undealt cards.
+        """
+
+        return len(self._cards)
+
+    @property
+    def dealt(self) -> int:
+        """
+        Gets how many cards were dealt since the last reshuffle.
+
+        Returns:
+            The amount of dealt cards.
+        """
+
+        return self.decks * 52 - len(self._cards)
+
+    @property
+    def reshuffles(self) -> int:
+        """
+        Gets how many times the cards were reshuffled, the first shuffle doesn't count.
+
+        Returns:
+            The amount of reshuffles.
+        """
+
+        return self._reshuffles
+
+    @property
+    def rank_counts(self) -> List[int]:
+        """
+        Gets how many cards of every rank haven't been dealt yet.
+
+        Returns:
+            The counts indexed like Deck.card_ranks.
+        """
+
+        return self._rank_counts
+
+    @property
+    def decks_remaining(self) -> float:
+        """
+        Gets how many decks' worth of cards haven't been dealt yet.
+
+        Returns:
+            The amount of decks remaining.
+        """
+
+        return self.cards_left / 52
+
+    @property
+    def running_count(self) -> int:
+        """
+        Gets the running count of the first counting system.
+
+        Returns:
+            The running count.
+        """
+
+        return self._running_counts[0]
+
+    @property
+    def true_count(self) -> float:
+        """
+        Gets the running count of the first counting system divided by the decks remaining.
+
+        Returns:
+            The true count, or the running count when no cards are left.
+        """
+
+        decks_remaining = self.decks_remaining
+        if decks_remaining <= 0:
+            return float(self._running_counts[0])
+
+        return self._running_counts[0] / decks_remaining
+
+    @property
+    def running_counts(self) -> Dict[str, int]:
+        """
+        Gets the running count of every counting system.
+
+        Returns:
+            The running counts by the name of their system.
+        """
+
+        return {system.name: count for system, count in zip(self._count_systems, self._running_counts)}
+
+    @property
+    def count_systems(self) -> Tuple[CountSystem, ...]:
+        """
+        Gets the counting systems kept track of.
+
+        Returns:
+            The counting systems, in the order of their running counts.
+        """
+
+        return self._count_systems
+
+    def get_state(self) -> Tuple[List[Card], int, int]:
+        """
+        Gets where every card is, to put the deck back as it is with set_state.
+
+        Returns:
+            The cards in the order they're kept, which must not be changed, how many
+            of them haven't been dealt yet and how many were discarded.
+        """
+
+        return self._cards, len(self._cards), 0
+
+    def set_state(self, cards: Sequence[Card], remaining: int, discarded: int,
+                  rank_counts: Sequence[int], running_counts: Sequence[int],
+                  reshuffles: int = 0, dealt: Optional[int] = None):
+        """
+        Puts the deck back to a state given by get_state, with the counts it had.
+
+        Parameters:
+            cards (Sequence[Card]): The cards in the order they're kept
+            remaining (int): How many of the cards haven't been dealt yet
+            discarded (int): How many of the dealt cards were discarded
+            rank_counts (Sequence[int]): The undealt cards of every rank, like rank_counts
+            running_counts (Sequence[int]): The running count of every counting system
+            reshuffles (int): How many times the cards were reshuffled, like reshuffles
+            dealt (int): How many cards were dealt since the last reshuffle, like dealt,
+            a single deck works it out from its cards
+        """
+
+        # A single deck only keeps the cards it hasn't dealt
+        if remaining != len(cards) or discarded:
+            raise ValueError("A deck only holds its undealt cards")
+
+        self._cards[:] = cards
+        self._set_counts(rank_counts, running_counts)
+        self._reshuffles = reshuffles
+
+    def _set_counts(self, rank_counts: Sequence[int], running_counts: Sequence[int]):
+        """
+        Replaces the counts with ones saved before.
+
+        Parameters:
+            rank_counts (Sequence[int]): The undealt cards of every rank
+            running_counts (Sequence[int]): The running count of every counting system
+        """
+
+        if len(rank_counts) != len(RANKS) or len(running_counts) != len(self._count_systems):
+            raise ValueError("The counts don't match the deck's ranks and counting systems")
+
+        self._rank_counts[:] = rank_counts
+        self._running_counts[:] = running_counts
+
+    def _reset_counts(self):
+        """
+        Resets the counts for a full set of cards.
+        """
+
+        decks = self.decks
+        self._rank_counts[:] = [4 * decks] * len(RANKS)
+        self._running_counts[:] = [system.initial_count(decks) for system in self._count_systems]
+
+    def _count(self, card: Card):
+        """
+        Updates the counts with a card that was just dealt.
+
+        Parameters:
+            card (Card): The dealt card
+        """
+
+        self._rank_counts[card.rank_index] -= 1
+        value = card.value
+        running_counts = self._running_counts
+        for index, system in enumerate(self._count_systems):
+            running_counts[index] += system.weights[value]
+
+    @property
+    def needs_reshuffle(self) -> bool:
+        """
+        Checks whether the deck has to be refilled before the next round.
+
+        Returns:
+            True if the deck has run out of cards, false otherwise.
+        """
+
+        return len(self._cards) == 0
+
     def __str__(self) -> str:
         """
         Allows for printing the deck of cards.
@@ -93,7 +331,7 @@ class Deck:
         """
 
         deck_string = "+++++++++++++++++\n"
-        deck_string += '\n'.join(str(card) for card in self._cards)
+        deck_string += '\n'.join(str(card) for card in self.cards)
         deck_string += "\n+++++++++++++++++"
         return deck_string
 
@@ -105,20 +343,43 @@ class Deck:
             The list of 52 cards in the deck.
         """
 
-        # Clear out the list of cards before initializing deck
-        self._cards.clear()
-
-        # Runs a nested loop to add all the ranks for all the suits.
-        for suit in Deck.card_suits:
-            for rank in Deck.card_ranks:
-                self._cards.append(Card(rank, suit))
+        # Refills the list in place with the shared cards for all the ranks
+        # and suits, so no new Card objects are created.
+        self._cards[:] = CARDS
+        self._reset_counts()
 
     def shuffle(self):
         """
-        Shuffles the deck of cards.
+        Shuffles the deck of cards, a lazy deck has nothing to do.
         """
 
-        shuffle(self._cards)
+        if not self._lazy:
+            self._shuffle(self._cards)
+
+    def reshuffle(self):
+        """
+        Refills the deck with all of its cards and shuffles it.
+        """
+
+        if instrumentation.enabled:
+            instrumentation.count("reshuffles")
+        if metrics.enabled:
+            metrics.RESHUFFLES.inc()
+
+        self._reshuffles += 1
+        self.init_deck()
+        self.shuffle()
+
+    def discard(self, cards: Sequence[Card]):
+        """
+        Takes back the cards that were dealt once they're no longer in play.
+        A single deck doesn't keep its discards, they're restored by init_deck.
+
+        Parameters:
+            cards (Sequence[Card]): The cards being discarded
+        """
+
+        pass
 
     def deal_card(self) -> Optional[Card]:
         """
@@ -130,7 +391,20 @@ class Deck:
         """
 
         # Can't deal cards if the deck is empty
-        if len(self._cards) <= 0:
+        cards = self._cards
+        left = len(cards)
+        if left <= 0:
             return None
 
-        return self._cards.pop()
+        if self._lazy and left > 1:
+            # A random card left swaps places with the next one to deal
+            index = self._randbelow(left)
+            cards[index], cards[-1] = cards[-1], cards[index]
+
+        card = cards.pop()
+        self._count(card)
+
+        if instrumentation.enabled:
+            instrumentation.count("cards_dealt")
+
+        return card
@@ -0,0 +1,275 @@
+"""
+This module works out the house edge of many rule variants at once, for a player
+following the strategy table of every variant on a full shoe. Every starting hand is
+played out against the shoe without the player's two cards and the upcard, but the
+cards the player hits aren't taken out of it, which favours the player by less than
+a tenth of a percent on a single deck and by less with more decks.
+
+Variants share most of their work: the dealer's odds only depend on the shoe and on
+whether the dealer hits a soft 17, and the value of the hands the player plays out
+doesn't depend on what blackjacks pay. Every sub-result is cached by what it depends
+on, so a grid of variants only works out each of them once.
+"""
+import argparse
+import time
+from fractions import Fraction
+from itertools import product
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from blackjack.probability import DealerProbabilities, Distribution, remove, shoe_composition
+from blackjack.rules import DEFAULT_RULES, Rules, ratio
+from blackjack.strategy import TOTALS, hand_values, stand_value
+
+# A variant is the amount of decks in the shoe and the rules of the table
+Variant = Tuple[int, Rules]
+
+# The dealer's final total odds and the chance of drawing every value, for every upcard
+UpcardOdds = List[Tuple[Distribution, List[float]]]
+
+
+class EdgeResult:
+    """
+    This class holds the house edge of a variant.
+    """
+
+    __slots__ = ("decks", "rules", "house_edge")
+
+    def __init__(self, decks: int, rules: Rules, house_edge: float):
+        """
+        Initializes an instance of EdgeResult
+
+        Parameters:
+            decks (int): The amount of decks in the shoe
+            rules (Rules): The rules of the table
+            house_edge (float): The share of every token bet that the house keeps
+        """
+
+        self.decks = decks
+        self.rules = rules
+        self.house_edge = house_edge
+
+    def __str__(self) -> str:
+        """
+        Allows to print out the result as a row of a table
+
+        Returns:
+            A string with the variant and its house edge
+        """
+
+        return f"{self.decks:>5}  {str(self.rules):<42} {self.house_edge:>8.4%}"
+
+
+class EdgeAnalyzer:
+    """
+    This class works out the house edge of rule variants, keeping the sub-results
+    that variants share between them.
+    """
+
+    def __init__(self):
+        """
+        Initializes an instance of EdgeAnalyzer with empty caches
+        """
+
+        # One dealer calculator for each way of playing a soft 17
+        self._dealers: Dict[bool, DealerProbabilities] = {}
+        # Keyed by (decks, hits soft 17)
+        self._upcards: Dict[Tuple[int, bool], UpcardOdds] = {}
+        # Keyed by (decks, hits soft 17, tie payout), see _hands
+        self._hands: Dict[Tuple[int, bool, Fraction], Tuple[float, float, float]] = {}
+
+    @property
+    def cache_sizes(self) -> Dict[str, int]:
+        """
+        Gets how many sub-results are cached
+
+        Returns:
+            The amount of cached dealer distributions, upcard odds and hand values
+        """
+
+        return {"dealer": sum(dealer.cache_size for dealer in self._dealers.values()),
+                "upcards": len(self._upcards),
+                "hands": len(self._hands)}
+
+    def _upcard_odds(self, decks: int, hits_soft_17: bool) -> UpcardOdds:
+        """
+        Works out the dealer's odds and the player's draws for every upcard
+
+        Parameters:
+            decks (int): The amount of decks in the shoe
+            hits_soft_17 (bool): Whether the dealer hits a soft 17
+
+        Returns:
+            The odds for every upcard, indexed by its value - 1
+        """
+
+        key = (decks, hits_soft_17)
+        odds = self._upcards.get(key)
+        if odds is not None:
+            return odds
+
+        dealer = self._dealers.get(hits_soft_17)
+        if dealer is None:
+            dealer = self._dealers[hits_soft_17] = DealerProbabilities(Rules(hits_soft_17))
+
+        counts = shoe_composition(decks)
+        odds = []
+        for upcard in range(1, 11):
+            left = remove(counts, upcard)
+            chances = [count / sum(left) for count in left]
+            odds.append((dealer.final_totals(upcard, left), chances))
+
+        self._upcards[key] = odds
+        return odds
+
+    def _hand_values(self, decks: int, hits_soft_17: bool, tie_pays: Fraction) -> Tuple[float, float, float]:
+        """
+        Works out everything about the first two cards that doesn't depend on what blackjacks pay
+
+        Parameters:
+            decks (int): The amount of decks in the shoe
+            hits_soft_17 (bool): Whether the dealer hits a soft 17
+            tie_pays (Fraction): The tokens won for every token bet on a tie
+
+        Returns:
+            The expected value of the hands played out, and the chances of a blackjack
+            on the first two cards when the dealer reaches 21 and when they don't
+        """
+
+        key = (decks, hits_soft_17, tie_pays)
+        values = self._hands.get(key)
+        if values is not None:
+            return values
+
+        upcard_odds = self._upcard_odds(decks, hits_soft_17)
+        dealer = self._dealers[hits_soft_17]
+        counts = shoe_composition(decks)
+        size = sum(counts)
+        tie = float(tie_pays)
+        played = 0.0
+        natural_tied = 0.0
+        natural_won = 0.0
+
+        for upcard, (distribution, chances) in enumerate(upcard_odds, 1):
+            # The player follows the strategy table, which is made without their cards
+            stands = [stand_value(total, distribution, tie) for total in range(TOTALS)]
+            _, hits = hand_values(stands, chances)
+            decisions = {(hard, ace): hit > stands[hard + 10 if (ace and hard <= 11) else hard]
+                         for (hard, ace), hit in hits.items()}
+
+            # The player's cards are dealt before the upcard, each one out of what's left,
+            # and both orders of two different cards are the same hand
+            for first in range(1, 11):
+                first_chance = counts[first - 1] / size
+                for second in range(first, 11):
+                    second_chance = (counts[second - 1] - (second == first)) / (size - 1)
+                    upcard_count = counts[upcard - 1] - (upcard == first) - (upcard == second)
+                    chance = first_chance * second_chance * upcard_count / (size - 2) * (1 if first == second else 2)
+
+                    # The hand plays out against the shoe without the three cards dealt
+                    left = remove(remove(remove(counts, first), second), upcard)
+                    dealt = dealer.final_totals(upcard, left)
+
+                    hard = first + second
+                    ace = first == 1 or second == 1
+                    if ace and hard == 11:
+                        # The dealer still plays and can only tie a blackjack with a 21
+                        natural_tied += chance * dealt[4]
+                        natural_won += chance * (1 - dealt[4])
+                    else:
+                        best, _ = hand_values([stand_value(total, dealt, tie) for total in range(TOTALS)],
+                                              [count / sum(left) for count in left], decisions)
+                        played += chance * best[(hard, ace)]
+
+        values = self._hands[key] = (played, natural_tied, natural_won)
+        return values
+
+    def house_edge(self, decks: int, rules: Rules = DEFAULT_RULES) -> float:
+        """
+        Works out the house edge of a variant
+
+        Parameters:
+            decks (int): The amount of decks in the shoe
+            rules (Rules): The rules of the table
+
+        Returns:
+            The share of every token bet that the house keeps, negative when the player wins
+        """
+
+        played, natural_tied, natural_won = self._hand_values(decks, rules.hits_soft_17, rules.tie_pays)
+        value = played + natural_tied * float(rules.tie_pays) + natural_won * float(rules.blackjack_pays)
+        return -value
+
+    def analyze(self, variants: Iterable[Variant]) -> List[EdgeResult]:
+        """
+        Works out the house edge of every variant
+
+        Parameters:
+            variants (Iterable[Variant]): The amount of decks and the rules of every variant
+
+        Returns:
+            The result of every variant, in the same order
+        """
+
+        return [EdgeResult(decks, rules, self.house_edge(decks, rules)) for decks, rules in variants]
+
+
+def rule_grid(decks: Sequence[int] = (1, 2, 6, 8), hits_soft_17: Sequence[bool] = (False, True),
+              blackjack_pays: Sequence[Fraction] = (Fraction(1), Fraction(3, 2), Fraction(6, 5)),
+              tie_pays: Sequence[Fraction] = (Fraction(1, 2), Fraction(0))) -> List[Variant]:
+    """
+    Makes every combination of the given rules
+
+    Parameters:
+        decks (Sequence[int]): The amounts of decks in the shoe
+        hits_soft_17 (Sequence[bool]): Whether the dealer hits a soft 17
+        blackjack_pays (Sequence[Fraction]): What a blackjack on the first two cards pays
+        tie_pays (Sequence[Fraction]): What a tie pays
+
+    Returns:
+        The variants, with the amount of decks changing slowest
+    """
+
+    return [(deck_count, Rules(hits, blackjack, tie))
+            for deck_count, hits, blackjack, tie in product(decks, hits_soft_17, blackjack_pays, tie_pays)]
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Runs the rule variant comparison from the command line and prints the edge of each
+
+    Parameters:
+        argv (List[str]): The command line arguments, None to use sys.argv
+    """
+
+    parser = argparse.ArgumentParser(description="Compares the house edge of a grid of rule variants.")
+    parser.add_argument("-d", "--decks", type=int, nargs="+", default=[1, 2, 6, 8], help="decks in the shoe")
+    parser.add_argument("--soft-17", choices=("stand", "hit", "both"), default="both",
+                        help="whether the dealer hits a soft 17")
+    parser.add_argument("--blackjack-pays", type=ratio, nargs="+", metavar="RATIO",
+                        default=[Fraction(1), Fraction(3, 2), Fraction(6, 5)],
+                        help="what a two-card 21 pays, e.g. 1 3:2 6:5")
+    parser.add_argument("--tie-pays", type=ratio, nargs="+", metavar="RATIO",
+                        default=[Fraction(1, 2), Fraction(0)], help="what a tie pays, 0 for a normal push")
+    parser.add_argument("--from-scratch", action="store_true",
+                        help="work out every variant with empty caches, to compare the time it takes")
+    args = parser.parse_args(argv)
+
+    hits_soft_17 = {"stand": (False,), "hit": (True,), "both": (False, True)}[args.soft_17]
+    variants = rule_grid(args.decks, hits_soft_17, args.blackjack_pays, args.tie_pays)
+
+    start = time.perf_counter()
+    if args.from_scratch:
+        results = [EdgeAnalyzer().analyze([variant])[0] for variant in variants]
+    else:
+        analyzer = EdgeAnalyzer()
+        results = analyzer.analyze(variants)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'decks':>5}  {'rules':<42} {'edge':>8}")
+    for result in results:
+        print(result)
+    print(f"Analyzed {len(results)} variants in {elapsed:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
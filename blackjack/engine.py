@@ -0,0 +1,878 @@
+"""
+This module contains a headless engine that plays complete rounds of
+blackjack without asking for any input, so that a large number of rounds
+can be simulated with the same rules used by the interactive game.
+"""
+import argparse
+import struct
+import time
+from itertools import accumulate
+from random import Random
+from typing import TYPE_CHECKING, Callable, Iterator, List, Optional, Tuple
+
+from blackjack import instrumentation
+from blackjack.card import CARDS
+from blackjack.count import COUNT_SYSTEMS, HI_LO, CountSystem
+from blackjack.currency import Currency
+from blackjack.history import MAX_CARDS, RECORD, STOOD, TRUNCATED, HandHistoryWriter, record_dtype
+from blackjack.rules import DEFAULT_RULES, Rules, ratio
+from blackjack.strategy import TOTALS, UPCARDS
+
+if TYPE_CHECKING:
+    # The export needs NumPy, which the engine doesn't
+    from blackjack.export import RoundExporter
+
+# A policy receives the player's current total, whether the hand is soft
+# (an ace is being counted as 11) and the value of the dealer's upcard
+# (aces are valued at 1), and returns True to hit or False to stay
+Policy = Callable[[int, bool, int], bool]
+
+# All the possible outcomes of a round
+PLAYER_BUST = 0
+LOSE = 1
+DRAW = 2
+WIN = 3
+DEALER_BUST = 4
+BLACKJACK = 5
+BLACKJACK_DRAW = 6
+
+# Names for the outcomes, indexed by the outcome itself
+OUTCOME_NAMES = ("player_bust",
+                 "lose",
+                 "draw",
+                 "win",
+                 "dealer_bust",
+                 "blackjack",
+                 "blackjack_draw")
+
+# The hard value of every card in a standard deck (aces are valued at 1,
+# the extra 10 points of a soft hand are added when counting the total)
+HARD_VALUES = tuple(card.value for card in CARDS)
+
+
+def dealer_policy(total: int, soft: bool, upcard: int) -> bool:
+    """
+    Mimics the dealer, hitting until the total is 17 or higher
+
+    Parameters:
+        total (int): The player's current total
+        soft (bool): Whether an ace is being counted as 11
+        upcard (int): The value of the dealer's upcard
+
+    Returns:
+        True to hit, False to stay
+    """
+
+    return total < 17
+
+
+def stand_policy(total: int, soft: bool, upcard: int) -> bool:
+    """
+    Always stays on the first two cards
+
+    Parameters:
+        total (int): The player's current total
+        soft (bool): Whether an ace is being counted as 11
+        upcard (int): The value of the dealer's upcard
+
+    Returns:
+        Always False
+    """
+
+    return False
+
+
+# Policies that can be selected by name from the command line
+POLICIES = {"dealer": dealer_policy,
+            "stand": stand_policy}
+
+
+def compile_table(policy: Policy) -> bytes:
+    """
+    Asks a policy for its decision on every hand up front, so that playing
+    a round only has to look them up. The policy must only depend on its arguments.
+
+    Parameters:
+        policy (Policy): Decides whether the player hits or stays
+
+    Returns:
+        The decisions indexed by (total * 2 + soft) * UPCARDS + upcard, like
+        a StrategyTable, 1 to hit and 0 to stay
+    """
+
+    # Totals of 21 never ask the policy and neither do upcards of 0
+    table = bytearray(TOTALS * 2 * UPCARDS)
+    for total in range(4, TOTALS - 1):
+        for soft in (False, True):
+            for upcard in range(1, UPCARDS):
+                table[(total * 2 + soft) * UPCARDS + upcard] = bool(policy(total, soft, upcard))
+
+    return bytes(table)
+
+
+class BetRamp:
+    """
+    This class sizes bets from the true count: one unit at a true count of 1
+    or lower, and one more unit for every point above it, up to a spread.
+    """
+
+    def __init__(self, unit: int = 100, spread: int = 8):
+        """
+        Initializes an instance of BetRamp
+
+        Parameters:
+            unit (int): The smallest bet
+            spread (int): The largest bet, in units
+        """
+
+        self._unit = unit
+        self._spread = spread
+
+    def __call__(self, true_count: float) -> int:
+        """
+        Sizes the bet for a true count
+
+        Parameters:
+            true_count (float): The true count before the round
+
+        Returns:
+            The amount of tokens to bet
+        """
+
+        units = int(true_count)
+        if units < 1:
+            return self._unit
+
+        return self._unit * (units if units < self._spread else self._spread)
+
+
+class Engine:
+    """
+    This class plays rounds of blackjack against the dealer for a single
+    player, deciding the player's moves through a policy instead of
+    asking for input and settling each round on the player's Currency.
+    """
+
+    def __init__(self, currency: Currency, policy: Policy = dealer_policy,
+                 seed: Optional[int] = None, decks: int = 1, penetration: float = 0.75,
+                 count_system: Optional[CountSystem] = None, rules: Rules = DEFAULT_RULES):
+        """
+        Initializes an instance of the Engine.
+
+        Parameters:
+            currency (Currency): The player's tokens
+            policy (Policy): Decides whether the player hits or stays, it's compiled
+            into a table unless it already has one, like the policies of blackjack.policy
+            seed (int): The seed for the shuffles, None for a random one
+            decks (int): The amount of decks in the shoe
+            penetration (float): The share of the shoe dealt before it's
+            reshuffled, like the cut card of a Shoe
+            count_system (CountSystem): The counting system for running_count
+            and true_count, None to not keep a count unless the policy sizes
+            its own bets, which then read the Hi-Lo count
+            rules (Rules): The rules the dealer plays and the bets are settled by
+        """
+
+        if count_system is None and hasattr(policy, "bet"):
+            # Policies like blackjack.policy.CountBetting size bets from the true count
+            count_system = HI_LO
+
+        self._currency = currency
+        self._rules = rules
+        self._policy = policy
+        # Every decision is a single lookup in the compiled policy
+        self._table = getattr(policy, "table", None) or compile_table(policy)
+        self._rng = Random(seed)
+        self._values = HARD_VALUES * decks
+        self._decks = decks
+
+        # The running count after every amount of dealt cards, worked out
+        # for the whole shoe when it's shuffled so dealing doesn't pay for it
+        self._count_system = count_system
+        self._running_counts: List[int] = []
+        # The shoe is reshuffled before a round once it has fewer cards than this,
+        # there are always enough cards left to deal the first four
+        self._reshuffle_at = max(int(len(self._values) * (1 - penetration)), 4)
+
+        # The shoe is a list of card values, dealt from the end
+        self._cards: List[int] = []
+        # The order the shoe is dealt in, where the last round started in it and
+        # the cards it dealt from the previous shoe, all kept for the hand history
+        self._order = b""
+        self._mark = 0
+        self._carry = b""
+        # The order of every shoe since keep_shoes, None when they aren't kept
+        self._shoes: Optional[List[bytes]] = None
+        self._reshuffles = 0
+        self._cards_dealt = 0
+        self.reshuffle()
+
+        # The first shuffle doesn't count as a reshuffle
+        self._reshuffles = 0
+        self._cards_dealt = 0
+
+        # Details of the last round played, the dealer's total
+        # is 0 when the player busted and the dealer didn't play
+        self.player_total = 0
+        self.player_cards = 0
+        self.upcard = 0
+        self.dealer_total = 0
+
+    @property
+    def currency(self) -> Currency:
+        """
+        Gets the player's tokens
+
+        Returns:
+            The player's Currency
+        """
+
+        return self._currency
+
+    @property
+    def policy(self) -> Policy:
+        """
+        Gets what decides the player's moves
+
+        Returns:
+            The policy given to the engine
+        """
+
+        return self._policy
+
+    @property
+    def cards(self) -> List[int]:
+        """
+        Gets the values of the cards left in the shoe
+
+        Returns:
+            The list of card values, the last one is dealt first
+        """
+
+        return self._cards
+
+    def reshuffle(self):
+        """
+        Refills the shoe with all of its cards and shuffles it
+        """
+
+        # Keeps the tallies of the shoe being replaced
+        self._reshuffles += 1
+        self._cards_dealt += len(self._values) - len(self._cards)
+
+        self._cards[:] = self._values
+        self._rng.shuffle(self._cards)
+        self._order = bytes(reversed(self._cards))
+        if self._shoes is not None:
+            self._shoes.append(self._order)
+
+        if self._count_system is not None:
+            # Cards are dealt from the end of the list
+            self._running_counts[:] = accumulate(map(self._count_system.weights.__getitem__, reversed(self._cards)),
+                                                 initial=self._count_system.initial_count(self._decks))
+
+    def keep_shoes(self) -> List[bytes]:
+        """
+        Starts keeping the order every shoe is dealt in, so the cards of many
+        rounds can be recorded at once instead of calling last_round after each
+
+        Returns:
+            The list the order of every new shoe is added to, starting with the current one
+        """
+
+        self._shoes = [self._order]
+        return self._shoes
+
+    @property
+    def reshuffles(self) -> int:
+        """
+        Gets how many times the shoe was reshuffled
+
+        Returns:
+            The amount of reshuffles
+        """
+
+        return self._reshuffles
+
+    @property
+    def cards_dealt(self) -> int:
+        """
+        Gets how many cards were dealt since the engine was created
+
+        Returns:
+            The amount of dealt cards
+        """
+
+        return self._cards_dealt + len(self._values) - len(self._cards)
+
+    @property
+    def running_count(self) -> int:
+        """
+        Gets the running count of the cards dealt since the last reshuffle
+
+        Returns:
+            The running count, 0 when no count is kept
+        """
+
+        if self._count_system is None:
+            return 0
+
+        return self._running_counts[len(self._values) - len(self._cards)]
+
+    @property
+    def true_count(self) -> float:
+        """
+        Gets the running count divided by the decks remaining
+
+        Returns:
+            The true count, 0 when no count is kept
+        """
+
+        if not self._cards:
+            return float(self.running_count)
+
+        return self.running_count * 52 / len(self._cards)
+
+    def _draw(self) -> int:
+        """
+        Deals a card when the shoe has run out in the middle of a round
+
+        Returns:
+            The value of the card dealt from a freshly shuffled shoe
+        """
+
+        # Every card left in the old shoe was dealt during this round
+        self._carry = self._order[len(self._values) - self._mark:]
+        self.reshuffle()
+        return self._cards.pop()
+
+    def last_round(self) -> Tuple[int, int, bytes]:
+        """
+        Gets where the last round was dealt from and the cards dealt in it
+
+        Returns:
+            The shoe the round started in (counting reshuffles), how many cards
+            had been dealt from it before the round, and the values of the cards
+            in the order they were dealt: two to the player, two to the dealer,
+            then the player's hits and the dealer's hits
+        """
+
+        # The order is kept as it's dealt, so the round is a slice of it
+        size = len(self._values)
+        start = size - self._mark
+        if self._carry:
+            # The shoe ran out in the middle of the round
+            return self._reshuffles - 1, start, self._carry + self._order[:size - len(self._cards)]
+
+        return self._reshuffles, start, self._order[start:size - len(self._cards)]
+
+    def _dealer_total(self, hard: int, soft: bool) -> int:
+        """
+        Deals cards to the dealer until they reach a score of 17 or higher,
+        or past a soft 17 when the rules say so, just like blackjack.dealer_hit_or_stay
+
+        Parameters:
+            hard (int): The dealer's total with every ace valued at 1
+            soft (bool): Whether the dealer holds an ace
+
+        Returns:
+            The dealer's final total
+        """
+
+        cards = self._cards
+        hits_soft_17 = self._rules.hits_soft_17
+        total = hard + 10 if (soft and hard <= 11) else hard
+
+        # A soft 17 is an ace with 6 more points
+        while total < 17 or (total == 17 and hits_soft_17 and soft and hard == 7):
+            card = cards.pop() if cards else self._draw()
+            hard += card
+            soft = soft or card == 1
+            total = hard + 10 if (soft and hard <= 11) else hard
+
+        return total
+
+    def play_round(self, bet: int) -> int:
+        """
+        Plays a complete round, from the bet to the settlement
+
+        Parameters:
+            bet (int): The amount of tokens to bet
+
+        Returns:
+            The outcome of the round
+        """
+
+        cards = self._cards
+        currency = self._currency
+
+        # The shoe is reshuffled between rounds once the cut card comes out
+        if len(cards) < self._reshuffle_at:
+            self.reshuffle()
+        self._mark = len(cards)
+        self._carry = b""
+
+        currency.bet(bet)
+
+        # Deals two cards to the player and then two to the dealer
+        # in the same order as blackjack.reset_turn
+        p_first = cards.pop()
+        p_second = cards.pop()
+        upcard = cards.pop()
+        hole = cards.pop()
+
+        p_hard = p_first + p_second
+        p_ace = p_first == 1 or p_second == 1
+        p_total = p_hard + 10 if (p_ace and p_hard <= 11) else p_hard
+
+        # The player's moves, a total of 21 ends them straight away
+        table = self._table
+        p_cards = 2
+        while p_total < 21 and table[(p_total * 2 + (p_ace and p_hard <= 11)) * UPCARDS + upcard]:
+            p_cards += 1
+            card = cards.pop() if cards else self._draw()
+            p_hard += card
+            p_ace = p_ace or card == 1
+            p_total = p_hard + 10 if (p_ace and p_hard <= 11) else p_hard
+
+        d_hard = upcard + hole
+        d_ace = upcard == 1 or hole == 1
+        self.player_total = p_total
+        self.player_cards = p_cards
+        self.upcard = upcard
+
+        if p_total > 21:
+            # Player has busted, the dealer doesn't need to play
+            self.dealer_total = 0
+            currency.cash_out()
+            return PLAYER_BUST
+
+        # Dealer hits their hand, a total of 21 for the player
+        # can only be tied by the dealer also reaching 21
+        d_total = self.dealer_total = self._dealer_total(d_hard, d_ace)
+
+        if p_total == 21:
+            if d_total == 21:
+                currency.cash_in_payout(self._rules.tie_pays)
+                return BLACKJACK_DRAW
+
+            # Only a 21 on the first two cards is paid as a blackjack
+            if p_cards == 2:
+                currency.cash_in_payout(self._rules.blackjack_pays)
+            else:
+                currency.cash_in()
+            return BLACKJACK
+
+        if d_total > 21:
+            currency.cash_in()
+            return DEALER_BUST
+
+        if p_total > d_total:
+            currency.cash_in()
+            return WIN
+
+        if p_total < d_total:
+            currency.cash_out()
+            return LOSE
+
+        currency.cash_in_payout(self._rules.tie_pays)
+        return DRAW
+
+
+    def play(self, n_rounds: int, bet: int = 100, starting_tokens: int = 1000) -> Iterator[Tuple[int, int, int, int]]:
+        """
+        Plays rounds one after another and streams them, this is the loop behind
+        simulate, the shards of blackjack.parallel and the stream of blackjack.stats
+
+        A policy with a bet method, like the ones of blackjack.policy, sizes every
+        bet from the player's tokens and the true count. When the player runs out
+        of tokens they start over with the starting amount, just like choosing to
+        play again in the game, once the round has been streamed.
+
+        Parameters:
+            n_rounds (int): The amount of rounds to play
+            bet (int): The amount of tokens bet every round, unless the policy sizes its bets
+            starting_tokens (int): The amount of tokens the player starts over with
+
+        Returns:
+            An iterator over the outcome, the tokens bet, the tokens won (negative
+            when lost) and the tokens the player had after every round
+        """
+
+        currency = self._currency
+        play_round = self.play_round
+        size_bet = getattr(self._policy, "bet", None)
+
+        for _ in range(n_rounds):
+            before = currency.total_tokens
+            if size_bet is not None:
+                bet = size_bet(before, self.true_count)
+
+            outcome = play_round(bet)
+            after = currency.total_tokens
+            # Bets are capped to the tokens the player has, like Currency.bet does
+            yield outcome, bet if bet < before else before, after - before, after
+
+            # The player is out of tokens and plays again
+            if after <= 0:
+                currency.reset(starting_tokens)
+
+
+class SimulationResult:
+    """
+    This class holds the summary of a batch of simulated rounds.
+    """
+
+    def __init__(self, rounds: int, outcomes: List[int], wagered: int, net: int,
+                 rebuys: int, elapsed: float):
+        """
+        Initializes an instance of SimulationResult
+
+        Parameters:
+            rounds (int): The amount of rounds played
+            outcomes (List[int]): How many rounds ended with each outcome
+            wagered (int): The total amount of tokens bet
+            net (int): The tokens won (or lost when negative) overall
+            rebuys (int): How many times the player ran out of tokens
+            elapsed (float): The seconds it took to play the rounds
+        """
+
+        self.rounds = rounds
+        self.outcomes = outcomes
+        self.wagered = wagered
+        self.net = net
+        self.rebuys = rebuys
+        self.elapsed = elapsed
+
+    @property
+    def house_edge(self) -> float:
+        """
+        Gets the share of every token bet that the house keeps
+
+        Returns:
+            The house edge, negative when the player is winning
+        """
+
+        return -self.net / self.wagered if self.wagered else 0.0
+
+    @property
+    def rounds_per_second(self) -> float:
+        """
+        Gets the throughput of the simulation
+
+        Returns:
+            The amount of rounds played every second
+        """
+
+        return self.rounds / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        """
+        Allows to print out the summary of a simulation
+
+        Returns:
+            A string with the counts of every outcome and the house edge
+        """
+
+        lines = [f"Rounds played: {self.rounds}"]
+        lines += [f"  {name}: {count}" for name, count in zip(OUTCOME_NAMES, self.outcomes)]
+        lines.append(f"Tokens wagered: {self.wagered}")
+        lines.append(f"Net result: {self.net}")
+        lines.append(f"House edge: {self.house_edge:.4%}")
+        lines.append(f"Rebuys: {self.rebuys}")
+        lines.append(f"Rounds per second: {self.rounds_per_second:.0f}")
+        return '\n'.join(lines)
+
+
+class _RoundLog:
+    """
+    This class records the rounds of an engine to a hand history in blocks: every round
+    packs what only the engine knows straight into its record, and the shoes, positions
+    and cards of a whole block are filled in afterwards with NumPy.
+    """
+
+    # Outcome, bet, net result, tokens after the round and the player's card count go
+    # where the record keeps them. The cards left in the shoe after the round and the
+    # player's total wait where the cards go until the block is filled in
+    ROUND = struct.Struct("<BxIiqBxHB")
+    OFFSET = struct.calcsize("<QIH")
+
+    def __init__(self, engine: Engine, history: HandHistoryWriter, block: int = 4096):
+        """
+        Initializes an instance of _RoundLog, before the engine plays its next round
+
+        Parameters:
+            engine (Engine): The engine playing the rounds
+            history (HandHistoryWriter): Where to record the rounds
+            block (int): How many rounds are packed before filling them in
+        """
+
+        # NumPy is only needed to fill in the records
+        import numpy as np
+
+        self._np = np
+        self._history = history
+        self._size = len(engine._values)
+        self._reshuffle_at = engine._reshuffle_at
+        self._shoes = engine.keep_shoes()
+        # The shoe the first kept order belongs to, and the shoe
+        # being dealt and the cards left in it after the last round
+        self._first = engine.reshuffles
+        self._shoe = engine.reshuffles
+        self._left = len(engine.cards)
+
+        dtype = record_dtype()
+        self.buffer = bytearray(RECORD.size * block)
+        self._records = np.frombuffer(self.buffer, dtype)
+        cards = dtype.fields["cards"][1]
+        self._waiting = np.frombuffer(self.buffer, np.dtype({"names": ["left", "total"], "formats": ["<u2", "u1"],
+                                                             "offsets": [cards, cards + 2],
+                                                             "itemsize": RECORD.size}))
+
+    def flush(self, rounds: int):
+        """
+        Fills in the records of the packed rounds and writes them to the hand history
+
+        Parameters:
+            rounds (int): How many rounds were packed since the last flush
+        """
+
+        if not rounds:
+            return
+
+        np = self._np
+        size = self._size
+        records = self._records[:rounds]
+        left = self._waiting["left"][:rounds].astype(np.int64)
+        stood = self._waiting["total"][:rounds] < 21
+
+        # The engine reshuffles between rounds once the cut card came out, and a round
+        # ending before it started ran out of cards and went on in the next shoe
+        before = np.concatenate(([self._left], left[:-1]))
+        reshuffled = before < self._reshuffle_at
+        start = np.where(reshuffled, 0, size - before)
+        end = size - left
+        drew = end < start
+        shoe = self._shoe + np.cumsum(reshuffled) + np.cumsum(drew) - drew
+        count = end - start + drew * size
+
+        records["round"] = np.arange(self._history.rounds, self._history.rounds + rounds)
+        records["shoe"] = shoe
+        records["position"] = start
+        records["flags"] = np.where(stood, STOOD, 0) | np.where(count > MAX_CARDS, TRUNCATED, 0)
+        records["dealer_count"] = count - records["player_count"]
+
+        # The shoes are dealt one after the other, so the cards of a round
+        # are a slice of their orders even when it went on in the next shoe
+        dealt = b"".join(self._shoes) + bytes(MAX_CARDS)
+        slices = np.ndarray((len(dealt) - MAX_CARDS + 1, MAX_CARDS), np.uint8, dealt, strides=(1, 1))
+        cards = slices[(shoe - self._first) * size + start]
+        cards *= np.arange(MAX_CARDS, dtype=np.uint8) < count.astype(np.uint8)[:, None]
+        records["cards"] = cards
+
+        self._history.write_records(records)
+
+        # Only the order of the shoe being dealt is still needed
+        self._shoe = int(shoe[-1] + drew[-1])
+        self._left = int(left[-1])
+        self._first += len(self._shoes) - 1
+        del self._shoes[:-1]
+
+
+def simulate(n_rounds: int, seed: Optional[int] = None, policy: Policy = dealer_policy,
+             bet: int = 100, starting_tokens: int = 1000, decks: int = 1,
+             penetration: float = 0.75, count_system: Optional[CountSystem] = None,
+             history: Optional[HandHistoryWriter] = None,
+             rules: Rules = DEFAULT_RULES, export: Optional["RoundExporter"] = None) -> SimulationResult:
+    """
+    Plays the given amount of rounds without any input, see Engine.play
+
+    Parameters:
+        n_rounds (int): The amount of rounds to play
+        seed (int): The seed for the shuffles, None for a random one
+        policy (Policy): Decides whether the player hits or stays, a PlayerPolicy
+        of blackjack.policy also sizes every bet from the tokens and the true count
+        bet (int): The amount of tokens bet every round, unless the policy sizes its bets
+        starting_tokens (int): The amount of tokens the player starts with
+        decks (int): The amount of decks in the shoe
+        penetration (float): The share of the shoe dealt before it's reshuffled
+        count_system (CountSystem): The counting system the policy's bets read,
+        Hi-Lo when the policy sizes its bets without one
+        history (HandHistoryWriter): Where to record every round, None to not record them
+        rules (Rules): The rules the dealer plays and the bets are settled by
+        export (RoundExporter): Where to write the results of every round as columns,
+        None to not export them
+
+    Returns:
+        The summary of the simulation
+    """
+
+    engine = Engine(Currency(starting_tokens), policy, seed, decks, penetration, count_system, rules)
+    cards = engine.cards
+    log = None
+    if history is not None:
+        try:
+            log = _RoundLog(engine, history)
+        except ImportError:
+            # Without NumPy every round is packed on its own, which is slower
+            pass
+    last_round = engine.last_round
+    write = history.write if history is not None and log is None else None
+    pack = _RoundLog.ROUND.pack_into if log is not None else None
+    buffer = log.buffer if log is not None else None
+    # Where the next round is packed in the buffer
+    packed = _RoundLog.OFFSET
+    record_size = RECORD.size
+    full = len(buffer) if log is not None else 0
+    export_round = export.write if export is not None else None
+
+    outcomes = [0] * len(OUTCOME_NAMES)
+    wagered = 0
+    net = 0
+    rebuys = 0
+
+    start = time.perf_counter()
+    for outcome, placed, result, after in engine.play(n_rounds, bet, starting_tokens):
+        outcomes[outcome] += 1
+        wagered += placed
+        net += result
+
+        if pack is not None:
+            pack(buffer, packed, outcome, placed, result, after, engine.player_cards, len(cards), engine.player_total)
+            packed += record_size
+            if packed > full:
+                log.flush(full // record_size)
+                packed = _RoundLog.OFFSET
+        elif write is not None:
+            shoe, position, dealt = last_round()
+            write(shoe, position, outcome, placed, result, after,
+                  engine.player_cards, dealt, engine.player_total < 21)
+
+        if export_round is not None:
+            export_round(engine.player_total, engine.upcard, engine.dealer_total, outcome, placed, after)
+
+        if after <= 0:
+            rebuys += 1
+    if log is not None:
+        log.flush((packed - _RoundLog.OFFSET) // record_size)
+    elapsed = time.perf_counter() - start
+
+    if instrumentation.enabled:
+        instrumentation.count("rounds", n_rounds)
+        instrumentation.count("cards_dealt", engine.cards_dealt)
+        instrumentation.count("reshuffles", engine.reshuffles)
+
+    return SimulationResult(n_rounds, outcomes, wagered, net, rebuys, elapsed)
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Runs a simulation from the command line and prints its summary
+
+    Parameters:
+        argv (List[str]): The command line arguments, None to use sys.argv
+    """
+
+    parser = argparse.ArgumentParser(description="Simulates rounds of blackjack without any input.")
+    parser.add_argument("-n", "--rounds", type=int, default=1_000_000, help="amount of rounds to play")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="seed for the shuffles")
+    parser.add_argument("-b", "--bet", type=int, default=100, help="tokens bet every round")
+    parser.add_argument("-t", "--tokens", type=int, default=1000,
+                        help="tokens the player starts with, not with the vectorized backend")
+    parser.add_argument("-d", "--decks", type=int, default=1, help="decks in the shoe")
+    parser.add_argument("--penetration", type=float, default=0.75,
+                        help="share of the shoe dealt before reshuffling, not with the vectorized backend")
+    parser.add_argument("-p", "--policy", choices=sorted(POLICIES), default="dealer",
+                        help="how the player decides to hit or stay")
+    parser.add_argument("--backend", choices=("scalar", "vectorized"), default="scalar",
+                        help="play rounds one at a time or in batches of array operations (needs NumPy)")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="split the scalar simulation across this many processes")
+    parser.add_argument("--strategy", default=None,
+                        help="JSON strategy table to use as the policy instead of --policy")
+    parser.add_argument("--count", choices=sorted(COUNT_SYSTEMS), default=None,
+                        help="size bets from the true count of this system, from --bet to --spread times it")
+    parser.add_argument("--spread", type=int, default=8, help="largest bet in units of --bet when counting")
+    parser.add_argument("--profile", default=None, metavar="PATH",
+                        help="profile the simulation in this process, writing PATH.prof and PATH.alloc.txt")
+    parser.add_argument("--history", default=None, metavar="DIR",
+                        help="record every round of the simulation in this process to a hand history in DIR")
+    parser.add_argument("--export", default=None, metavar="DIR",
+                        help="write the results of every round of the simulation in this process "
+                             "as .npy columns in DIR (needs NumPy)")
+    parser.add_argument("--hit-soft-17", action="store_true",
+                        help="the dealer hits a soft 17, not with the vectorized backend")
+    parser.add_argument("--blackjack-pays", type=ratio, default=DEFAULT_RULES.blackjack_pays, metavar="RATIO",
+                        help="what a two-card 21 pays, e.g. 3:2, not with the vectorized backend")
+    parser.add_argument("--tie-pays", type=ratio, default=DEFAULT_RULES.tie_pays, metavar="RATIO",
+                        help="what a tie pays, 0 for a normal push, not with the vectorized backend")
+    args = parser.parse_args(argv)
+
+    rules = Rules(args.hit_soft_17, args.blackjack_pays, args.tie_pays)
+    vectorized_backend = args.backend == "vectorized" and not args.workers
+    # Options that would otherwise be silently dropped
+    if args.workers or vectorized_backend:
+        for option, value in (("--profile", args.profile), ("--history", args.history), ("--export", args.export)):
+            if value:
+                parser.error(f"{option} only works with the scalar backend in a single process")
+    if vectorized_backend and (args.count or rules != DEFAULT_RULES):
+        parser.error("--count, --hit-soft-17, --blackjack-pays and --tie-pays don't work with the vectorized backend")
+    # Every vectorized round is dealt from a fresh shoe and bets the same amount, without a bankroll
+    if vectorized_backend and (args.penetration != parser.get_default("penetration")
+                               or args.tokens != parser.get_default("tokens")):
+        parser.error("--penetration and --tokens don't work with the vectorized backend")
+
+    policy = POLICIES[args.policy]
+    if args.strategy:
+        # Loads a table made by blackjack.strategy instead of recomputing it
+        from blackjack.strategy import StrategyTable
+        policy = StrategyTable.load(args.strategy)
+
+    count_system = None
+    if args.count:
+        # Bets are sized by the policy, which plays the same hands
+        from blackjack.policy import CountBetting, TablePolicy
+        policy = CountBetting(args.bet, args.spread, TablePolicy.compile(policy))
+        count_system = COUNT_SYSTEMS[args.count]
+
+    if args.workers:
+        # Shards the rounds across a pool of processes
+        from blackjack import parallel
+        result = parallel.simulate(args.rounds, args.seed, args.workers, None, policy, args.bet,
+                                   args.tokens, args.decks, args.penetration, count_system, rules)
+    elif vectorized_backend:
+        # NumPy is only needed by the vectorized backend
+        from blackjack import vectorized
+        result = vectorized.simulate(args.rounds, args.seed, policy, args.bet, args.decks)
+    else:
+        history = None
+        if args.history:
+            try:
+                history = HandHistoryWriter(args.history, args.seed, args.decks, args.penetration, rules=rules)
+            except ValueError as error:
+                parser.error(str(error))
+        export = None
+        if args.export:
+            # NumPy is only needed by the export
+            from blackjack.export import RoundExporter
+            export = RoundExporter(args.export)
+
+        def run() -> SimulationResult:
+            return simulate(args.rounds, args.seed, policy, args.bet, args.tokens,
+                            args.decks, args.penetration, count_system, history, rules, export)
+
+        if args.profile:
+            result = instrumentation.profile(run, args.profile)
+            print(instrumentation.report(result.elapsed))
+        else:
+            result = run()
+
+        if history is not None:
+            history.close()
+        if export is not None:
+            export.close()
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
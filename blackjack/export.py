@@ -0,0 +1,220 @@
+"""
+This module exports the results of every simulated round as columns: one NumPy
+.npy file for every field, which can be opened as memory-mapped arrays without
+reading them into memory. It needs NumPy to be installed.
+
+Rounds are packed into a fixed-size buffer, like the hand history does, and every
+full buffer is copied into the files through memory maps of just that part of them,
+so an export takes the same memory however many rounds it holds. The files are
+preallocated and grow by doubling, and they're cut down to the rounds written once
+the export is closed. Until then their headers say they're empty.
+"""
+import io
+import os
+import struct
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Player's total, dealer's upcard, dealer's final total (0 when the player busted
+# and the dealer didn't play), outcome, bet and the tokens left after the round
+COLUMNS = (("player_total", "u1"),
+           ("upcard", "u1"),
+           ("dealer_total", "u1"),
+           ("outcome", "u1"),
+           ("bet", "<i8"),
+           ("bankroll", "<i8"))
+
+# A buffered round, laid out like the structured dtype of the columns
+ROW = struct.Struct("<BBBBqq")
+ROW_DTYPE = np.dtype(list(COLUMNS))
+
+
+def _header(dtype: np.dtype, rounds: int) -> bytes:
+    """
+    Makes the .npy header of a column
+
+    Parameters:
+        dtype (np.dtype): The type of the column
+        rounds (int): The amount of rounds in the column
+
+    Returns:
+        The header, which is as long for any amount of rounds that fits in 64 bits
+    """
+
+    header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (rounds,)}
+    file = io.BytesIO()
+    np.lib.format.write_array_header_1_0(file, header)
+    return file.getvalue()
+
+
+class RoundExporter:
+    """
+    This class writes the results of rounds to a directory of .npy columns.
+    """
+
+    def __init__(self, directory: str, chunk_rounds: int = 1 << 20, capacity: int = 1 << 24):
+        """
+        Initializes an instance of RoundExporter, replacing any export already in directory
+
+        Parameters:
+            directory (str): Where to write the columns, created when missing
+            chunk_rounds (int): How many rounds are buffered before they're written
+            capacity (int): How many rounds the files are preallocated for
+        """
+
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._chunk_rounds = chunk_rounds
+        self._capacity = max(capacity, chunk_rounds)
+        self._rounds = 0
+        self._closed = False
+
+        self._buffer = bytearray(ROW.size * chunk_rounds)
+        self._buffered = 0
+        self._pack = ROW.pack_into
+
+        # Every column starts with a header for no rounds, all of them
+        # are the same length so the data always starts at the same offset
+        self._paths = {name: os.path.join(directory, f"{name}.npy") for name, _ in COLUMNS}
+        self._offsets: Dict[str, int] = {}
+        for name, dtype in COLUMNS:
+            header = _header(np.dtype(dtype), 0)
+            with open(self._paths[name], "wb") as file:
+                file.write(header)
+                # The rest of the file is left sparse until it's written
+                file.truncate(len(header) + self._capacity * np.dtype(dtype).itemsize)
+            self._offsets[name] = len(header)
+
+    @property
+    def directory(self) -> str:
+        """
+        Gets where the columns are written
+
+        Returns:
+            The directory of the export
+        """
+
+        return self._directory
+
+    @property
+    def rounds(self) -> int:
+        """
+        Gets how many rounds have been exported, buffered ones included
+
+        Returns:
+            The amount of rounds
+        """
+
+        return self._rounds + self._buffered
+
+    def write(self, player_total: int, upcard: int, dealer_total: int, outcome: int, bet: int, bankroll: int):
+        """
+        Adds a round to the export
+
+        Parameters:
+            player_total (int): The player's final total
+            upcard (int): The value of the dealer's upcard, aces are 1
+            dealer_total (int): The dealer's final total, 0 when they didn't play
+            outcome (int): One of the outcomes in blackjack.engine
+            bet (int): The tokens bet
+            bankroll (int): The tokens the player had after the round
+        """
+
+        self._pack(self._buffer, self._buffered * ROW.size,
+                   player_total, upcard, dealer_total, outcome, bet, bankroll)
+        self._buffered += 1
+        if self._buffered == self._chunk_rounds:
+            self.flush()
+
+    def _grow(self, rounds: int):
+        """
+        Makes room in the files for at least the given amount of rounds, doubling them
+
+        Parameters:
+            rounds (int): The amount of rounds the files need to hold
+        """
+
+        while self._capacity < rounds:
+            self._capacity *= 2
+
+        for name, dtype in COLUMNS:
+            with open(self._paths[name], "r+b") as file:
+                file.truncate(self._offsets[name] + self._capacity * np.dtype(dtype).itemsize)
+
+    def flush(self):
+        """
+        Copies the buffered rounds to the files, one column at a time
+        """
+
+        count = self._buffered
+        if not count:
+            return
+
+        if self._rounds + count > self._capacity:
+            self._grow(self._rounds + count)
+
+        rows = np.frombuffer(self._buffer, ROW_DTYPE, count)
+        for name, dtype in COLUMNS:
+            dtype = np.dtype(dtype)
+            # Only the part of the file being written is mapped
+            column = np.memmap(self._paths[name], dtype, "r+", self._offsets[name] + self._rounds * dtype.itemsize,
+                               (count,))
+            column[:] = rows[name]
+            column.flush()
+            del column
+
+        self._rounds += count
+        self._buffered = 0
+
+    def close(self):
+        """
+        Writes the rounds left in the buffer, cuts the files down to the rounds
+        written and gives them their final headers
+        """
+
+        if self._closed:
+            return
+
+        self.flush()
+        for name, dtype in COLUMNS:
+            dtype = np.dtype(dtype)
+            header = _header(dtype, self._rounds)
+            with open(self._paths[name], "r+b") as file:
+                file.write(header)
+                file.truncate(len(header) + self._rounds * dtype.itemsize)
+        self._closed = True
+
+    def __enter__(self) -> "RoundExporter":
+        """
+        Allows the exporter to be used in a with statement
+
+        Returns:
+            The exporter itself
+        """
+
+        return self
+
+    def __exit__(self, *exc_info):
+        """
+        Closes the export when the with statement ends, even on an error,
+        so the rounds written so far can still be opened
+        """
+
+        self.close()
+
+
+def open_rounds(directory: str, columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+    """
+    Opens the columns of a closed export as read-only memory-mapped arrays, without copying them
+
+    Parameters:
+        directory (str): Where the columns were written
+        columns (List[str]): The names of the columns to open, every one of COLUMNS when None
+
+    Returns:
+        The arrays by the name of their column
+    """
+
+    names = columns if columns is not None else [name for name, _ in COLUMNS]
+    return {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in names}
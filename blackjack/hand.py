@@ -1,7 +1,7 @@
 """
 This module holds the Hand class
 """
-from collections import Sequence
+from collections.abc import Sequence
 
 from blackjack.card import Card
 
@@ -17,7 +17,15 @@ class Hand:
         Initializes an instance of the Hand class.
         """
 
-        self._cards = list(cards)
+        self._cards = []
+
+        # Running score of the hand, updated every time a card is added
+        # The hard total counts every ace as 1 point
+        self._hard_total = 0
+        self._aces = 0
+
+        for card in cards:
+            self.hit(card)
 
     @property
     def cards(self) -> Sequence[Card]:
@@ -30,6 +38,76 @@ class Hand:
 
         return self._cards
 
+    @property
+    def hard_total(self) -> int:
+        """
+        Gets the total of the hand with every ace valued at 1
+
+        Returns:
+            The hard total of the hand
+        """
+
+        return self._hard_total
+
+    @property
+    def aces(self) -> int:
+        """
+        Gets how many aces are in the hand
+
+        Returns:
+            The amount of aces in hand
+        """
+
+        return self._aces
+
+    @property
+    def is_soft(self) -> bool:
+        """
+        Checks whether an ace in the hand is being valued at 11
+
+        Returns:
+            True if the hand is soft, false otherwise
+        """
+
+        return self._aces > 0 and self._hard_total <= 11
+
+    @property
+    def total(self) -> int:
+        """
+        Gets the points of the hand, valuing one ace at 11
+        whenever that doesn't make the hand go over 21
+
+        Returns:
+            The total points in hand
+        """
+
+        if self._aces > 0 and self._hard_total <= 11:
+            return self._hard_total + 10
+
+        return self._hard_total
+
+    @property
+    def is_bust(self) -> bool:
+        """
+        Checks whether the hand went over 21
+
+        Returns:
+            True if busted, false otherwise
+        """
+
+        return self._hard_total > 21
+
+    @property
+    def is_blackjack(self) -> bool:
+        """
+        Checks whether the hand scores 21, which the game counts as a blackjack
+
+        Returns:
+            True if there's a blackjack, false otherwise
+        """
+
+        return self.total == 21
+
     def __str__(self) -> str:
         """
         Allows to print out a hand of cards
@@ -53,9 +131,17 @@ class Hand:
 
         self._cards.append(card)
 
+        # Updates the running score with the new card
+        value = card.value
+        self._hard_total += value
+        if value == 1:
+            self._aces += 1
+
     def clear(self):
         """
         Removes all cards from a hand
         """
 
         self._cards.clear()
+        self._hard_total = 0
+        self._aces = 0
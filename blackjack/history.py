@@ -0,0 +1,665 @@
+"""
+This module keeps a hand history: every round played, written as fixed-width
+binary records to append-only segment files, and read back through memory maps.
+
+A segment starts with a header describing the game (seed, decks, penetration, how
+cards are encoded and the rules the rounds were settled by) followed by records of
+RECORD.size bytes each. Cards are stored one byte each, in the order they were dealt:
+two to the player, two to the dealer, then the player's hits and the dealer's hits.
+The engine stores card values (aces are 1) while game sessions store card codes
+(see blackjack.card).
+
+Every record also holds the table it was played at, so the sessions of a server can
+share one hand history: a SessionPool seeds the shoe of table N with "{seed}/{N}".
+
+Segments are never rewritten: a new writer on the same directory starts a new
+segment and keeps numbering rounds from where the last one stopped, as long as it
+writes rounds of the same game.
+"""
+import argparse
+import glob
+import mmap
+import os
+import struct
+from bisect import bisect_right
+from fractions import Fraction
+from typing import Iterator, List, Optional, Tuple
+
+from blackjack.rules import DEFAULT_RULES, Rules
+
+# Identifies the segment files and the version of their layout
+MAGIC = b"BJHH"
+VERSION = 2
+
+# How the cards of a segment are encoded
+CARD_VALUES = 0
+CARD_CODES = 1
+
+# Bits of the flags field of a record
+STOOD = 1       # The player chose to stay instead of busting or reaching 21
+TRUNCATED = 2   # The round dealt more cards than a record holds, the rest are missing
+
+# The most cards a record holds, a round almost never deals more than ten
+MAX_CARDS = 24
+
+# Magic, version, card encoding, decks, seed (-1 when unknown), penetration, first round,
+# whether the dealer hits a soft 17, and the blackjack and tie payouts as numerator and denominator
+HEADER = struct.Struct("<4sHBBqdQBIIII")
+# Round, shoe, position in the shoe, outcome, flags, bet, net result,
+# tokens after the round, player's card count, dealer's card count, cards, table
+RECORD = struct.Struct(f"<QIHBBIiqBB{MAX_CARDS}sI2x")
+
+# The segment files of a directory sort in the order they were written
+SEGMENT_NAME = "segment-{:06d}.bjh"
+
+
+def segment_paths(directory: str) -> List[str]:
+    """
+    Lists the segment files of a hand history
+
+    Parameters:
+        directory (str): The directory holding the hand history
+
+    Returns:
+        The paths of the segments, oldest first
+    """
+
+    return sorted(glob.glob(os.path.join(directory, SEGMENT_NAME.replace("{:06d}", "[0-9]" * 6))))
+
+
+def record_dtype():
+    """
+    Describes a record as a NumPy structured type, to read or pack many of them at once.
+    Needs NumPy to be installed.
+
+    Returns:
+        The NumPy dtype with the fields and layout of RECORD
+    """
+
+    # NumPy is only needed by whoever asks for the dtype
+    import numpy as np
+
+    return np.dtype([("round", "<u8"), ("shoe", "<u4"), ("position", "<u2"),
+                     ("outcome", "u1"), ("flags", "u1"), ("bet", "<u4"), ("net", "<i4"),
+                     ("tokens", "<i8"), ("player_count", "u1"), ("dealer_count", "u1"),
+                     ("cards", "u1", (MAX_CARDS,)), ("table", "<u4"), ("padding", "V2")])
+
+
+class HandRecord:
+    """
+    This class holds one round of a hand history.
+    """
+
+    __slots__ = ("round", "shoe", "position", "outcome", "flags", "bet", "net", "tokens",
+                 "player_count", "dealer_count", "cards", "table")
+
+    def __init__(self, round: int, shoe: int, position: int, outcome: int, flags: int, bet: int,
+                 net: int, tokens: int, player_count: int, dealer_count: int, cards: bytes, table: int):
+        """
+        Initializes an instance of HandRecord from the fields of a record
+
+        Parameters:
+            round (int): The number of the round, counting from 0
+            shoe (int): The shoe the round started in, counting reshuffles
+            position (int): How many cards were dealt from the shoe before the round
+            outcome (int): The outcome of the round, as in blackjack.engine
+            flags (int): The STOOD and TRUNCATED bits
+            bet (int): The tokens bet
+            net (int): The tokens won, negative when lost
+            tokens (int): The tokens the player had after the round
+            player_count (int): How many cards the player was dealt
+            dealer_count (int): How many cards the dealer was dealt
+            cards (bytes): The cards in the order they were dealt, padded with zeros
+            table (int): The table the round was played at
+        """
+
+        self.round = round
+        self.shoe = shoe
+        self.position = position
+        self.outcome = outcome
+        self.flags = flags
+        self.bet = bet
+        self.net = net
+        self.tokens = tokens
+        self.player_count = player_count
+        self.dealer_count = dealer_count
+        self.cards = cards[:player_count + dealer_count]
+        self.table = table
+
+    @property
+    def hits(self) -> int:
+        """
+        Gets how many times the player hit
+
+        Returns:
+            The amount of hits
+        """
+
+        return self.player_count - 2
+
+    @property
+    def stood(self) -> bool:
+        """
+        Checks whether the player's turn ended by staying
+
+        Returns:
+            True if the player stayed, false if they busted or reached 21
+        """
+
+        return bool(self.flags & STOOD)
+
+    @property
+    def player_cards(self) -> bytes:
+        """
+        Gets the cards dealt to the player
+
+        Returns:
+            The player's cards in the order they were dealt
+        """
+
+        return self.cards[:2] + self.cards[4:2 + self.player_count]
+
+    @property
+    def dealer_cards(self) -> bytes:
+        """
+        Gets the cards dealt to the dealer
+
+        Returns:
+            The dealer's cards in the order they were dealt
+        """
+
+        return self.cards[2:4] + self.cards[2 + self.player_count:]
+
+    def __str__(self) -> str:
+        """
+        Allows to print out the round
+
+        Returns:
+            A string with the round number, the cards of both hands and the settlement
+        """
+
+        return (f"#{self.round} table {self.table} shoe {self.shoe}+{self.position}: "
+                f"player {list(self.player_cards)} dealer {list(self.dealer_cards)} "
+                f"outcome {self.outcome} bet {self.bet} net {self.net:+} tokens {self.tokens}")
+
+
+class HandHistoryWriter:
+    """
+    This class appends rounds to a hand history, packing them into a buffer
+    that is written in bulk and starting a new segment every segment_records rounds.
+    """
+
+    def __init__(self, directory: str, seed: Optional[int] = None, decks: int = 1,
+                 penetration: float = 0.75, encoding: int = CARD_VALUES, rules: Rules = DEFAULT_RULES,
+                 segment_records: int = 1 << 20, buffer_records: int = 4096):
+        """
+        Initializes an instance of HandHistoryWriter. Every segment of a directory
+        describes the same game, since they're all read with the first one's header
+
+        Parameters:
+            directory (str): The directory to write the segments to, created if needed
+            seed (int): The seed of the shuffles, None when it isn't known
+            decks (int): The amount of decks in the shoe
+            penetration (float): The share of the shoe dealt before it's reshuffled
+            encoding (int): CARD_VALUES or CARD_CODES
+            rules (Rules): The rules the rounds are dealt, played and settled by
+            segment_records (int): How many rounds a segment holds
+            buffer_records (int): How many rounds are buffered before writing them
+        """
+
+        if segment_records < 1 or buffer_records < 1:
+            raise ValueError("Segments and the buffer must hold at least one round")
+
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._header = (MAGIC, VERSION, encoding, decks, -1 if seed is None else seed, penetration)
+        self._rules = (rules.hits_soft_17, rules.blackjack_pays.numerator, rules.blackjack_pays.denominator,
+                       rules.tie_pays.numerator, rules.tie_pays.denominator)
+        self._segment_records = segment_records
+
+        # Rounds keep their numbers across writers, new segments are added after the last one
+        segments = segment_paths(directory)
+        self._index = len(segments)
+        self._round = 0
+        if segments:
+            with HandHistoryReader(directory) as reader:
+                # Rounds are decoded and replayed with the header of the first segment
+                if reader.segments:
+                    game = (encoding, decks, seed, penetration, rules)
+                    found = (reader.encoding, reader.decks, reader.seed, reader.penetration, reader.rules)
+                    if found != game:
+                        raise ValueError(f"{directory} holds rounds of another game: encoding {found[0]}, "
+                                         f"{found[1]} decks, seed {found[2]}, penetration {found[3]}, {found[4]}")
+                self._round = reader.end
+
+        self._buffer = bytearray(RECORD.size * buffer_records)
+        self._capacity = buffer_records
+        self._buffered = 0
+        self._pack = RECORD.pack_into
+
+        self._file = None
+        self._segment_left = 0
+
+    @property
+    def rounds(self) -> int:
+        """
+        Gets the number the next round will be written with
+
+        Returns:
+            The amount of rounds in the hand history, buffered ones included
+        """
+
+        return self._round
+
+    def write(self, shoe: int, position: int, outcome: int, bet: int, net: int, tokens: int,
+              player_count: int, cards: bytes, stood: bool, table: int = 0):
+        """
+        Adds a round to the hand history
+
+        Parameters:
+            shoe (int): The shoe the round started in, counting reshuffles
+            position (int): How many cards were dealt from the shoe before the round
+            outcome (int): The outcome of the round, as in blackjack.engine
+            bet (int): The tokens bet
+            net (int): The tokens won, negative when lost
+            tokens (int): The tokens the player had after the round
+            player_count (int): How many of the cards were dealt to the player
+            cards (bytes): The cards in the order they were dealt
+            stood (bool): Whether the player chose to stay
+            table (int): The table the round was played at
+        """
+
+        flags = STOOD if stood else 0
+        count = len(cards)
+        if count > MAX_CARDS:
+            flags |= TRUNCATED
+
+        self._pack(self._buffer, self._buffered * RECORD.size, self._round, shoe, position, outcome,
+                   flags, bet, net, tokens, player_count, count - player_count, cards, table)
+        self._round += 1
+        self._buffered += 1
+
+        if self._buffered == self._capacity:
+            self.flush()
+
+    def write_records(self, records):
+        """
+        Adds rounds that were already packed, numbered from rounds onwards,
+        so a simulation can pack a whole block of rounds at once
+
+        Parameters:
+            records: Whole records as a bytes-like object, like an array of record_dtype()
+        """
+
+        self.flush()
+        with memoryview(records) as view, view.cast("B") as data:
+            count = len(data) // RECORD.size
+            if count * RECORD.size != len(data):
+                raise ValueError("Records must be RECORD.size bytes each")
+
+            self._round += count
+            self._write(data, count)
+
+    def _open_segment(self, first_round: int):
+        """
+        Closes the current segment and starts a new one
+
+        Parameters:
+            first_round (int): The number of the first round the segment will hold
+        """
+
+        if self._file is not None:
+            self._file.close()
+
+        path = os.path.join(self._directory, SEGMENT_NAME.format(self._index))
+        # Segments are only ever created, never opened again for writing. A buffered
+        # file writes everything it's given or raises, a raw one may write part of it
+        self._file = open(path, "xb")
+        self._file.write(HEADER.pack(*self._header, first_round, *self._rules))
+        self._index += 1
+        self._segment_left = self._segment_records
+
+    def _write(self, view: memoryview, records: int):
+        """
+        Writes packed records to the segments, the last of them being the latest round
+
+        Parameters:
+            view (memoryview): The bytes of the records
+            records (int): How many records the view holds
+        """
+
+        size = RECORD.size
+        written = 0
+
+        while written < records:
+            if self._segment_left == 0:
+                self._open_segment(self._round - records + written)
+
+            count = min(records - written, self._segment_left)
+            self._file.write(view[written * size:(written + count) * size])
+            written += count
+            self._segment_left -= count
+
+        if self._file is not None:
+            # Readers see the rounds once they're flushed
+            self._file.flush()
+
+    def flush(self):
+        """
+        Writes the buffered rounds to the segments
+        """
+
+        with memoryview(self._buffer) as view:
+            self._write(view, self._buffered)
+        self._buffered = 0
+
+    def close(self):
+        """
+        Writes the buffered rounds and closes the current segment
+        """
+
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            # The next round goes to a new segment
+            self._segment_left = 0
+
+    def __enter__(self) -> "HandHistoryWriter":
+        """
+        Allows the writer to be used in a with statement
+
+        Returns:
+            The writer itself
+        """
+
+        return self
+
+    def __exit__(self, *exc_info):
+        """
+        Closes the writer when the with statement ends, even on an error,
+        so the buffered records reach the segment
+        """
+
+        self.close()
+
+
+class HandHistoryReader:
+    """
+    This class reads a hand history by memory-mapping its segments,
+    so records are unpacked straight from the files without reading them in.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Initializes an instance of HandHistoryReader
+
+        Parameters:
+            directory (str): The directory holding the hand history
+        """
+
+        self._headers: List[Tuple] = []
+        self._maps: List[mmap.mmap] = []
+        self._counts: List[int] = []
+        # The number of the first round of every segment, to find rounds by number
+        self._firsts: List[int] = []
+
+        for path in segment_paths(directory):
+            with open(path, "rb") as file:
+                size = os.fstat(file.fileno()).st_size
+                if size < HEADER.size:
+                    # The writer died before finishing the header
+                    continue
+
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            header = HEADER.unpack_from(mapped)
+            if header[0] != MAGIC or header[1] != VERSION:
+                mapped.close()
+                raise ValueError(f"{path} is not a version {VERSION} hand history segment")
+
+            self._headers.append(header)
+            self._maps.append(mapped)
+            # A record cut short by a crash is left out
+            self._counts.append((size - HEADER.size) // RECORD.size)
+            self._firsts.append(header[6])
+
+    @property
+    def segments(self) -> int:
+        """
+        Gets how many segments the hand history has
+
+        Returns:
+            The amount of segments
+        """
+
+        return len(self._maps)
+
+    @property
+    def encoding(self) -> int:
+        """
+        Gets how the cards are encoded
+
+        Returns:
+            CARD_VALUES or CARD_CODES
+        """
+
+        return self._headers[0][2] if self._headers else CARD_VALUES
+
+    @property
+    def decks(self) -> int:
+        """
+        Gets the amount of decks in the shoe
+
+        Returns:
+            The amount of decks
+        """
+
+        return self._headers[0][3] if self._headers else 0
+
+    @property
+    def seed(self) -> Optional[int]:
+        """
+        Gets the seed of the shuffles
+
+        Returns:
+            The seed, None when it isn't known
+        """
+
+        if not self._headers or self._headers[0][4] == -1:
+            return None
+
+        return self._headers[0][4]
+
+    @property
+    def penetration(self) -> float:
+        """
+        Gets the share of the shoe dealt before it's reshuffled
+
+        Returns:
+            The penetration
+        """
+
+        return self._headers[0][5] if self._headers else 0.0
+
+    @property
+    def rules(self) -> Rules:
+        """
+        Gets the rules the rounds were dealt, played and settled by
+
+        Returns:
+            The rules, the default ones when there are no segments
+        """
+
+        if not self._headers:
+            return DEFAULT_RULES
+
+        hits_soft_17, blackjack_numerator, blackjack_denominator, tie_numerator, tie_denominator = self._headers[0][7:]
+        return Rules(bool(hits_soft_17), Fraction(blackjack_numerator, blackjack_denominator),
+                     Fraction(tie_numerator, tie_denominator))
+
+    @property
+    def end(self) -> int:
+        """
+        Gets the number the next round written to the hand history would get
+
+        Returns:
+            The number after the last round
+        """
+
+        if not self._maps:
+            return 0
+
+        return self._firsts[-1] + self._counts[-1]
+
+    def __len__(self) -> int:
+        """
+        Gets how many rounds the hand history holds
+
+        Returns:
+            The amount of rounds
+        """
+
+        return sum(self._counts)
+
+    def scan(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple]:
+        """
+        Goes through the rounds as plain tuples of the record's fields,
+        the quickest way to look at every round without NumPy
+
+        Parameters:
+            start (int): The number of the first round to go through
+            stop (int): The number after the last round to go through, None for every round
+
+        Returns:
+            An iterator over the fields of every record
+        """
+
+        if stop is None:
+            stop = self.end
+
+        for mapped, count, first in zip(self._maps, self._counts, self._firsts):
+            # Only the part of the segment between start and stop is unpacked
+            low = min(max(start - first, 0), count)
+            high = min(max(stop - first, 0), count)
+            if low == high:
+                continue
+
+            with memoryview(mapped) as view:
+                yield from RECORD.iter_unpack(view[HEADER.size + low * RECORD.size:HEADER.size + high * RECORD.size])
+
+    def __iter__(self) -> Iterator[HandRecord]:
+        """
+        Goes through every round
+
+        Returns:
+            An iterator over the records, oldest first
+        """
+
+        for fields in self.scan():
+            yield HandRecord(*fields)
+
+    def __getitem__(self, number: int) -> HandRecord:
+        """
+        Finds a round by its number
+
+        Parameters:
+            number (int): The number of the round
+
+        Returns:
+            The record of the round
+        """
+
+        segment = bisect_right(self._firsts, number) - 1
+        if segment < 0 or number - self._firsts[segment] >= self._counts[segment]:
+            raise IndexError(f"Round {number} is not in the hand history")
+
+        offset = HEADER.size + (number - self._firsts[segment]) * RECORD.size
+        return HandRecord(*RECORD.unpack_from(self._maps[segment], offset))
+
+    def arrays(self) -> list:
+        """
+        Views every segment as a NumPy structured array without copying it,
+        which scans millions of rounds per second. Needs NumPy to be installed.
+
+        Returns:
+            A read-only array of records for every segment
+        """
+
+        # NumPy is only needed for these views
+        import numpy as np
+
+        dtype = record_dtype()
+        return [np.frombuffer(mapped, dtype, count, HEADER.size)
+                for mapped, count in zip(self._maps, self._counts)]
+
+    def close(self):
+        """
+        Unmaps every segment, arrays from arrays() must not be used afterwards
+        """
+
+        for mapped in self._maps:
+            mapped.close()
+        self._maps.clear()
+        self._counts.clear()
+        self._firsts.clear()
+        self._headers.clear()
+
+    def __enter__(self) -> "HandHistoryReader":
+        """
+        Allows the reader to be used in a with statement
+
+        Returns:
+            The reader itself
+        """
+
+        return self
+
+    def __exit__(self, *exc_info):
+        """
+        Closes the reader's memory maps when the with statement ends
+        """
+
+        self.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Prints a summary of a hand history, or some of its rounds
+
+    Parameters:
+        argv (List[str]): The command line arguments, None to use sys.argv
+    """
+
+    parser = argparse.ArgumentParser(description="Reads a hand history written by the engine or the server.")
+    parser.add_argument("directory", help="directory holding the hand history")
+    parser.add_argument("--show", type=int, nargs=2, metavar=("FIRST", "COUNT"), default=None,
+                        help="print COUNT rounds starting at round FIRST")
+    args = parser.parse_args(argv)
+
+    from blackjack.engine import OUTCOME_NAMES
+
+    with HandHistoryReader(args.directory) as reader:
+        if args.show:
+            first, count = args.show
+            for number in range(first, min(first + count, reader.end)):
+                print(reader[number])
+            return
+
+        outcomes = [0] * len(OUTCOME_NAMES)
+        net = 0
+        for fields in reader.scan():
+            outcomes[fields[3]] += 1
+            net += fields[6]
+
+        print(f"Segments: {reader.segments}")
+        print(f"Seed: {reader.seed}, decks: {reader.decks}, penetration: {reader.penetration}")
+        print(f"Rules: {reader.rules}")
+        print(f"Rounds: {len(reader)}")
+        for name, count in zip(OUTCOME_NAMES, outcomes):
+            print(f"  {name}: {count}")
+        print(f"Net result: {net}")
+
+
+if __name__ == "__main__":
+    main()
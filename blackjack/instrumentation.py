@@ -0,0 +1,169 @@
+"""
+This module holds lightweight counters and phase timers for the game loop.
+
+Everything is off by default: hot paths check the enabled flag before recording
+anything, so keeping the hooks in place costs a single flag check when disabled.
+"""
+import cProfile
+import functools
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Callable, Dict
+
+# Whether counters and timers are being recorded
+enabled = False
+
+# How many times something happened, by name
+counters: Dict[str, int] = defaultdict(int)
+# The seconds spent in every phase, by name
+timers: Dict[str, float] = defaultdict(float)
+
+
+def enable():
+    """
+    Starts recording counters and timers
+    """
+
+    global enabled
+    enabled = True
+
+
+def disable():
+    """
+    Stops recording counters and timers, keeping what was recorded
+    """
+
+    global enabled
+    enabled = False
+
+
+def reset():
+    """
+    Forgets every counter and timer
+    """
+
+    counters.clear()
+    timers.clear()
+
+
+def count(name: str, amount: int = 1):
+    """
+    Adds to a counter, callers on hot paths check enabled first
+
+    Parameters:
+        name (str): The name of the counter
+        amount (int): How much to add
+    """
+
+    if enabled:
+        counters[name] += amount
+
+
+def timed(name: str) -> Callable:
+    """
+    Decorates a function so the time spent in it is added to a phase timer,
+    and every call is counted under the same name
+
+    Parameters:
+        name (str): The name of the phase
+
+    Returns:
+        The decorator
+    """
+
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timers[name] += time.perf_counter() - start
+                counters[name] += 1
+
+        return wrapper
+
+    return decorator
+
+
+def snapshot() -> Dict[str, Dict[str, float]]:
+    """
+    Copies the current counters and timers
+
+    Returns:
+        The counters and the timers, by name
+    """
+
+    return {"counters": dict(counters), "timers": dict(timers)}
+
+
+def report(elapsed: float) -> str:
+    """
+    Describes the counters and timers, with rates over the elapsed time
+
+    Parameters:
+        elapsed (float): The seconds the recorded run took
+
+    Returns:
+        A string with a line for every counter and timer
+    """
+
+    lines = ["Counters:"]
+    for name, value in sorted(counters.items()):
+        rate = f" ({value / elapsed:.0f}/s)" if elapsed else ""
+        lines.append(f"  {name}: {value}{rate}")
+
+    lines.append("Timers:")
+    for name, seconds in sorted(timers.items()):
+        lines.append(f"  {name}: {seconds:.4f} s")
+
+    return '\n'.join(lines)
+
+
+def profile(function: Callable, path: str, top: int = 15) -> object:
+    """
+    Runs a function under cProfile and tracemalloc with the counters enabled,
+    saving the profile to path + ".prof" and the top allocations to path + ".alloc.txt"
+
+    Parameters:
+        function (Callable): The function to run, without arguments
+        path (str): The path of the files to write, without extension
+        top (int): How many allocation sites to report
+
+    Returns:
+        Whatever the function returned
+    """
+
+    reset()
+    enable()
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+
+    start = time.perf_counter()
+    try:
+        result = profiler.runcall(function)
+    finally:
+        elapsed = time.perf_counter() - start
+        allocations = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        disable()
+
+    profiler.dump_stats(path + ".prof")
+
+    with open(path + ".alloc.txt", "w") as file:
+        file.write(f"Peak traced memory: {peak / 1024:.1f} KiB\n")
+        rounds = counters.get("rounds", 0)
+        blocks = sum(stat.count for stat in allocations.statistics("filename"))
+        if rounds:
+            file.write(f"Live blocks per round: {blocks / rounds:.4f}\n")
+        file.write(f"Top {top} allocation sites:\n")
+        for stat in allocations.statistics("lineno")[:top]:
+            file.write(f"  {stat}\n")
+        file.write(report(elapsed) + "\n")
+
+    return result
@@ -0,0 +1,496 @@
+"""
+This module holds a registry of metrics about the games being played (rounds, outcomes,
+reshuffles, tokens wagered and how long every action takes) and serves them over HTTP
+in the Prometheus text format, so a long-running server can be watched.
+
+Like the instrumentation module, everything is off by default and the game only
+records metrics after checking the enabled flag. Recording never takes a lock: every
+thread adds to its own cells, and the cells of all threads are only added up when the
+metrics are read.
+"""
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Whether the game records metrics
+enabled = False
+
+# Upper bounds of the latency buckets, in seconds, from 10 microseconds to a second
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                   0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 1.0)
+
+
+def enable():
+    """
+    Starts recording metrics
+    """
+
+    global enabled
+    enabled = True
+
+
+def disable():
+    """
+    Stops recording metrics, keeping what was recorded
+    """
+
+    global enabled
+    enabled = False
+
+
+def _escape(value: str) -> str:
+    """
+    Escapes a label value for the text format
+
+    Parameters:
+        value (str): The label value
+
+    Returns:
+        The value with backslashes, quotes and line breaks escaped
+    """
+
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value: float) -> str:
+    """
+    Writes a sample value for the text format
+
+    Parameters:
+        value (float): The value
+
+    Returns:
+        The value, without a fractional part for whole numbers
+    """
+
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+
+    return repr(value)
+
+
+class _Cells:
+    """
+    This class keeps a list of values for every thread that records them,
+    so recording only ever touches the current thread's list.
+    """
+
+    def __init__(self, size: int):
+        """
+        Initializes an instance of _Cells
+
+        Parameters:
+            size (int): How many values every thread keeps
+        """
+
+        self._size = size
+        self._local = threading.local()
+        # Every thread's cells, kept after the thread ends so totals never go down
+        self._cells: List[list] = []
+        self._lock = threading.Lock()
+
+    def cell(self) -> list:
+        """
+        Gets the current thread's values, only the first call of a thread takes the lock
+
+        Returns:
+            The values of the current thread
+        """
+
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = [0] * self._size
+            with self._lock:
+                self._cells.append(cell)
+            self._local.cell = cell
+            return cell
+
+    def totals(self) -> List[float]:
+        """
+        Adds up the values of every thread
+
+        Returns:
+            The totals, one for every value
+        """
+
+        with self._lock:
+            cells = list(self._cells)
+
+        return [sum(cell[index] for cell in cells) for index in range(self._size)]
+
+
+class Metric(ABC):
+    """
+    This class is the base of the metrics: it has a name, a description, and
+    either records values itself or has a child for every set of label values.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), labels: Tuple[str, ...] = (),
+                 parent_labelnames: Sequence[str] = ()):
+        """
+        Initializes an instance of Metric
+
+        Parameters:
+            name (str): The name of the metric, e.g. blackjack_rounds_settled_total
+            help (str): What the metric measures
+            labelnames (Sequence[str]): The names of the labels, empty for a metric without children
+            labels (Tuple[str, ...]): The label values of a child
+            parent_labelnames (Sequence[str]): The label names of a child's parent
+        """
+
+        self._name = name
+        self._help = help
+        self._labelnames = tuple(labelnames)
+        self._labels = labels
+        self._parent_labelnames = tuple(parent_labelnames)
+        self._children: Dict[Tuple[str, ...], "Metric"] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        """
+        Gets the name of the metric
+
+        Returns:
+            The name
+        """
+
+        return self._name
+
+    def labels(self, *values: str) -> "Metric":
+        """
+        Gets the child of the metric for some label values, making it the first time
+
+        Parameters:
+            values (str): A value for every label name
+
+        Returns:
+            The child, which records like a metric without labels
+        """
+
+        if len(values) != len(self._labelnames):
+            raise ValueError(f"{self._name} has labels {self._labelnames}")
+
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._child(values)
+
+        return child
+
+    @abstractmethod
+    def _child(self, values: Tuple[str, ...]) -> "Metric":
+        """
+        Makes the child for some label values
+
+        Parameters:
+            values (Tuple[str, ...]): The label values
+
+        Returns:
+            The new child
+        """
+
+    def _label_text(self, extra: str = "") -> str:
+        """
+        Writes the labels of a sample
+
+        Parameters:
+            extra (str): Another label to add at the end, e.g. le="0.5"
+
+        Returns:
+            The labels in braces, empty when there are none
+        """
+
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self._parent_labelnames, self._labels)]
+        if extra:
+            pairs.append(extra)
+
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """
+        Writes the samples of a metric that records values itself
+
+        Returns:
+            A line for every sample
+        """
+
+    def render(self) -> str:
+        """
+        Writes the metric in the Prometheus text format
+
+        Returns:
+            The help and type lines followed by every sample
+        """
+
+        lines = [f"# HELP {self._name} {self._help}", f"# TYPE {self._name} {self.kind}"]
+        if self._labelnames:
+            with self._lock:
+                children = list(self._children.values())
+            for child in children:
+                lines += child._samples()
+        else:
+            lines += self._samples()
+
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """
+    This class counts something that only goes up.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), labels: Tuple[str, ...] = (),
+                 parent_labelnames: Sequence[str] = ()):
+        """
+        Initializes an instance of Counter
+
+        Parameters:
+            name (str): The name of the counter, ending in _total
+            help (str): What the counter counts
+            labelnames (Sequence[str]): The names of the labels, empty for a counter without children
+            labels (Tuple[str, ...]): The label values of a child
+            parent_labelnames (Sequence[str]): The label names of a child's parent
+        """
+
+        super().__init__(name, help, labelnames, labels, parent_labelnames)
+        self._cells = _Cells(1)
+
+    def _child(self, values: Tuple[str, ...]) -> "Counter":
+        return Counter(self._name, self._help, (), values, self._labelnames)
+
+    @property
+    def value(self) -> float:
+        """
+        Gets the count, added up from every thread
+
+        Returns:
+            The count
+        """
+
+        return self._cells.totals()[0]
+
+    def inc(self, amount: float = 1):
+        """
+        Adds to the count
+
+        Parameters:
+            amount (float): How much to add, never negative
+        """
+
+        self._cells.cell()[0] += amount
+
+    def _samples(self) -> List[str]:
+        return [f"{self._name}{self._label_text()} {_number(self.value)}"]
+
+
+class Histogram(Metric):
+    """
+    This class counts observations, like latencies, in buckets.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                 labelnames: Sequence[str] = (), labels: Tuple[str, ...] = (), parent_labelnames: Sequence[str] = ()):
+        """
+        Initializes an instance of Histogram
+
+        Parameters:
+            name (str): The name of the histogram
+            help (str): What the histogram observes
+            buckets (Sequence[float]): The upper bounds of the buckets, in increasing order
+            labelnames (Sequence[str]): The names of the labels, empty for a histogram without children
+            labels (Tuple[str, ...]): The label values of a child
+            parent_labelnames (Sequence[str]): The label names of a child's parent
+        """
+
+        super().__init__(name, help, labelnames, labels, parent_labelnames)
+        self._buckets = tuple(buckets)
+        # A count for every bucket, one for everything above the last bucket and the sum
+        self._cells = _Cells(len(self._buckets) + 2)
+
+    def _child(self, values: Tuple[str, ...]) -> "Histogram":
+        return Histogram(self._name, self._help, self._buckets, (), values, self._labelnames)
+
+    def observe(self, value: float):
+        """
+        Counts an observation in its bucket
+
+        Parameters:
+            value (float): The observed value, e.g. seconds
+        """
+
+        cell = self._cells.cell()
+        cell[bisect_left(self._buckets, value)] += 1
+        cell[-1] += value
+
+    def _samples(self) -> List[str]:
+        totals = self._cells.totals()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self._buckets, totals):
+            cumulative += count
+            bucket = self._label_text(f'le="{bound}"')
+            lines.append(f"{self._name}_bucket{bucket} {cumulative}")
+
+        cumulative += totals[-2]
+        bucket = self._label_text('le="+Inf"')
+        lines.append(f"{self._name}_bucket{bucket} {cumulative}")
+        lines.append(f"{self._name}_sum{self._label_text()} {_number(totals[-1])}")
+        lines.append(f"{self._name}_count{self._label_text()} {cumulative}")
+        return lines
+
+
+class Gauge(Metric):
+    """
+    This class reports a value that goes up and down, read when the metrics are.
+    A gauge reads a single value, so it has no labels.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        """
+        Initializes an instance of Gauge
+
+        Parameters:
+            name (str): The name of the gauge
+            help (str): What the gauge reports
+            read (Callable[[], float]): Gets the current value
+        """
+
+        super().__init__(name, help)
+        self._read = read
+
+    def _child(self, values: Tuple[str, ...]) -> "Gauge":
+        raise ValueError(f"{self._name} is a gauge, which has no labels")
+
+    def _samples(self) -> List[str]:
+        return [f"{self._name} {_number(self._read())}"]
+
+
+class Registry:
+    """
+    This class holds every metric that's served.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty Registry
+        """
+
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Adds a metric, replacing any other one with the same name
+
+        Parameters:
+            metric (Metric): The metric to serve
+
+        Returns:
+            The metric
+        """
+
+        with self._lock:
+            self._metrics[metric.name] = metric
+
+        return metric
+
+    def unregister(self, name: str):
+        """
+        Stops serving a metric
+
+        Parameters:
+            name (str): The name of the metric
+        """
+
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def render(self) -> str:
+        """
+        Writes every metric in the Prometheus text format
+
+        Returns:
+            The exposition, ending with a line break
+        """
+
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        return ''.join(metric.render() + '\n' for metric in metrics)
+
+
+# The registry the game records to
+REGISTRY = Registry()
+
+ROUNDS_STARTED = REGISTRY.register(Counter("blackjack_rounds_started_total", "Rounds whose bet was placed"))
+ROUNDS_SETTLED = REGISTRY.register(Counter("blackjack_rounds_settled_total", "Rounds settled"))
+OUTCOMES = REGISTRY.register(Counter("blackjack_outcomes_total", "Settled hands by outcome", ("outcome",)))
+RESHUFFLES = REGISTRY.register(Counter("blackjack_reshuffles_total", "Times a deck or shoe was reshuffled"))
+TOKENS_WAGERED = REGISTRY.register(Counter("blackjack_tokens_wagered_total", "Tokens bet"))
+ACTION_SECONDS = REGISTRY.register(Histogram("blackjack_action_seconds", "Seconds taken to run a player's action",
+                                             labelnames=("action",)))
+
+
+async def _answer(registry: Registry, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """
+    Answers an HTTP request, with the metrics for GET /metrics
+
+    Parameters:
+        registry (Registry): The metrics to serve
+        reader (asyncio.StreamReader): The incoming side of the connection
+        writer (asyncio.StreamWriter): The outgoing side of the connection
+    """
+
+    try:
+        request = (await reader.readline()).decode(errors="replace").split()
+        # The headers aren't needed
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+
+        if len(request) >= 2 and request[0] == "GET" and request[1].split("?")[0] == "/metrics":
+            status = "200 OK"
+            body = registry.render().encode()
+        else:
+            status = "404 Not Found"
+            body = b"Only /metrics is served\n"
+
+        writer.write(f"HTTP/1.0 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+    except (ConnectionError, ValueError, asyncio.LimitOverrunError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str = "127.0.0.1", port: int = 9100,
+                registry: Optional[Registry] = None) -> asyncio.AbstractServer:
+    """
+    Starts serving the metrics over HTTP at /metrics
+
+    Parameters:
+        host (str): The address to listen on
+        port (int): The port to listen on
+        registry (Registry): The metrics to serve, REGISTRY when None
+
+    Returns:
+        The running server
+    """
+
+    registry = registry if registry is not None else REGISTRY
+    return await asyncio.start_server(lambda reader, writer: _answer(registry, reader, writer), host, port)
@@ -0,0 +1,264 @@
+"""
+This module splits a simulation into shards played by a pool of processes.
+
+Every shard gets its own seed derived from one master seed, plays its rounds with
+the scalar Engine and sends back a Summary of integer sums and histograms, which
+are merged in shard order so the same master seed and amount of shards always
+give exactly the same result. shard_tasks and run_shards split and run any other
+kind of shard the same way, like the statistics of blackjack.stats.
+"""
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from blackjack.count import CountSystem
+from blackjack.currency import Currency
+from blackjack.engine import OUTCOME_NAMES, Engine, Policy, SimulationResult, dealer_policy
+from blackjack.rules import DEFAULT_RULES, Rules
+
+# The amount of rounds, seed, policy, bet, starting tokens, decks, penetration,
+# counting system and rules of a shard
+Task = Tuple[int, int, Policy, int, int, int, float, Optional[CountSystem], Rules]
+
+# What playing a shard gives back
+Result = TypeVar("Result")
+
+# Sizes of the histograms, large enough for the highest totals a hand can reach
+PLAYER_TOTALS = 31
+DEALER_TOTALS = 27
+
+
+class Summary(SimulationResult):
+    """
+    This class holds the summary of a shard of simulated rounds
+    and can be merged with the summaries of other shards.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty Summary
+        """
+
+        super().__init__(0, [0] * len(OUTCOME_NAMES), 0, 0, 0, 0.0)
+
+        # The sum of the squared net result of every round
+        self.net_squares = 0
+        # How many rounds ended with each final total
+        self.player_totals = [0] * PLAYER_TOTALS
+        self.dealer_totals = [0] * DEALER_TOTALS
+
+    @property
+    def mean(self) -> float:
+        """
+        Gets the average tokens won or lost every round
+
+        Returns:
+            The mean net result of a round
+        """
+
+        return self.net / self.rounds if self.rounds else 0.0
+
+    @property
+    def variance(self) -> float:
+        """
+        Gets the variance of the tokens won or lost every round
+
+        Returns:
+            The sample variance of the net result of a round
+        """
+
+        if self.rounds < 2:
+            return 0.0
+
+        return (self.net_squares - self.net * self.net / self.rounds) / (self.rounds - 1)
+
+    def merge(self, other: "Summary"):
+        """
+        Adds the rounds of another summary to this one
+
+        Parameters:
+            other (Summary): The summary to add
+        """
+
+        self.rounds += other.rounds
+        self.outcomes = [mine + theirs for mine, theirs in zip(self.outcomes, other.outcomes)]
+        self.wagered += other.wagered
+        self.net += other.net
+        self.net_squares += other.net_squares
+        self.rebuys += other.rebuys
+        self.player_totals = [mine + theirs for mine, theirs in zip(self.player_totals, other.player_totals)]
+        self.dealer_totals = [mine + theirs for mine, theirs in zip(self.dealer_totals, other.dealer_totals)]
+
+    def __str__(self) -> str:
+        """
+        Allows to print out the summary of a simulation
+
+        Returns:
+            A string with the counts of every outcome, the house edge and the spread of results
+        """
+
+        return (f"{super().__str__()}\n"
+                f"Mean net per round: {self.mean:.4f}\n"
+                f"Variance per round: {self.variance:.4f}")
+
+
+def shard_seeds(master_seed: int, shards: int) -> List[int]:
+    """
+    Derives an independent seed for every shard from the master seed
+
+    Parameters:
+        master_seed (int): The seed of the whole simulation
+        shards (int): The amount of shards
+
+    Returns:
+        The seed for every shard
+    """
+
+    return [int.from_bytes(hashlib.blake2b(f"{master_seed}/{shard}".encode(), digest_size=8).digest(), "big")
+            for shard in range(shards)]
+
+
+def shard_tasks(n_rounds: int, seed: Optional[int], shards: int, policy: Policy = dealer_policy,
+                bet: int = 100, starting_tokens: int = 1000, decks: int = 1, penetration: float = 0.75,
+                count_system: Optional[CountSystem] = None, rules: Rules = DEFAULT_RULES) -> List[Task]:
+    """
+    Splits a simulation into shards with their own seeds and as even an amount of rounds as possible
+
+    Parameters:
+        n_rounds (int): The amount of rounds to play
+        seed (int): The master seed, None for a random one
+        shards (int): The amount of shards
+        policy (Policy): Decides whether the player hits or stays (and how much they bet,
+        see Engine.play), it must be picklable so it can be sent to the workers
+        bet (int): The amount of tokens bet every round
+        starting_tokens (int): The amount of tokens the player starts with in every shard
+        decks (int): The amount of decks in the shoe
+        penetration (float): The share of the shoe dealt before it's reshuffled
+        count_system (CountSystem): The counting system read by the policy's bets
+        rules (Rules): The rules the dealer plays and the bets are settled by
+
+    Returns:
+        The task of every shard
+    """
+
+    if seed is None:
+        seed = int.from_bytes(os.urandom(8), "big")
+
+    base, extra = divmod(n_rounds, shards)
+    return [(base + (1 if shard < extra else 0), shard_seed, policy, bet, starting_tokens, decks, penetration,
+             count_system, rules)
+            for shard, shard_seed in enumerate(shard_seeds(seed, shards))]
+
+
+def run_shards(play: Callable[[Task], Result], tasks: Sequence[Task],
+               workers: int = 1) -> Iterator[Tuple[int, Result]]:
+    """
+    Plays shards across a pool of processes, giving back every one as soon as it's done
+
+    Parameters:
+        play (Callable[[Task], Result]): Plays a shard, a module level function
+        so it can be sent to the workers
+        tasks (Sequence[Task]): The shards, from shard_tasks
+        workers (int): The amount of processes, 1 to play the shards in this one
+
+    Returns:
+        An iterator over the index of every shard and what playing it gave,
+        in the order they finish
+    """
+
+    if workers == 1:
+        for index, task in enumerate(tasks):
+            yield index, play(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(play, task): index for index, task in enumerate(tasks)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def play_shard(task: Task) -> Summary:
+    """
+    Plays the rounds of one shard, this runs in a worker process
+
+    Parameters:
+        task (Task): The shard, from shard_tasks
+
+    Returns:
+        The summary of the shard
+    """
+
+    n_rounds, seed, policy, bet, starting_tokens, decks, penetration, count_system, rules = task
+    engine = Engine(Currency(starting_tokens), policy, seed, decks, penetration, count_system, rules)
+
+    summary = Summary()
+    outcomes = summary.outcomes
+    player_totals = summary.player_totals
+    dealer_totals = summary.dealer_totals
+    wagered = 0
+    net = 0
+    net_squares = 0
+    rebuys = 0
+
+    for outcome, placed, result, after in engine.play(n_rounds, bet, starting_tokens):
+        outcomes[outcome] += 1
+        player_totals[engine.player_total] += 1
+        dealer_totals[engine.dealer_total] += 1
+        wagered += placed
+        net += result
+        net_squares += result * result
+
+        if after <= 0:
+            rebuys += 1
+
+    summary.rounds = n_rounds
+    summary.wagered = wagered
+    summary.net = net
+    summary.net_squares = net_squares
+    summary.rebuys = rebuys
+    return summary
+
+
+def simulate(n_rounds: int, seed: Optional[int] = None, workers: Optional[int] = None,
+             shards: Optional[int] = None, policy: Policy = dealer_policy, bet: int = 100,
+             starting_tokens: int = 1000, decks: int = 1, penetration: float = 0.75,
+             count_system: Optional[CountSystem] = None, rules: Rules = DEFAULT_RULES) -> Summary:
+    """
+    Plays the given amount of rounds split across a pool of processes
+
+    Parameters:
+        n_rounds (int): The amount of rounds to play
+        seed (int): The master seed, None for a random one
+        workers (int): The amount of processes, None for one per CPU
+        shards (int): The amount of shards, None for one per worker
+        policy (Policy): Decides whether the player hits or stays (and how much they bet,
+        see Engine.play), it must be picklable so it can be sent to the workers
+        bet (int): The amount of tokens bet every round
+        starting_tokens (int): The amount of tokens the player starts with in every shard
+        decks (int): The amount of decks in the shoe
+        penetration (float): The share of the shoe dealt before it's reshuffled
+        count_system (CountSystem): The counting system read by the policy's bets
+        rules (Rules): The rules the dealer plays and the bets are settled by
+
+    Returns:
+        The merged summary of every shard
+    """
+
+    workers = workers or os.cpu_count() or 1
+    tasks = shard_tasks(n_rounds, seed, shards or workers, policy, bet, starting_tokens, decks, penetration,
+                        count_system, rules)
+
+    start = time.perf_counter()
+    results: List[Optional[Summary]] = [None] * len(tasks)
+    for index, result in run_shards(play_shard, tasks, workers):
+        results[index] = result
+
+    # Merging always happens in shard order
+    summary = Summary()
+    for result in results:
+        summary.merge(result)
+    summary.elapsed = time.perf_counter() - start
+
+    return summary
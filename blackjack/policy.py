@@ -0,0 +1,268 @@
+"""
+This module holds the player policies, which decide how much the player bets before
+a round and whether they hit or stay during it, given their total, whether the hand
+is soft, the dealer's upcard and the true count of the shoe.
+
+Policies that only depend on the hand are compiled into a flat table indexed by
+(total * 2 + soft) * UPCARDS + upcard, so every decision is a single lookup, and the
+Engine uses that table as it is. The interactive game is one more policy that asks
+the user instead.
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Type
+
+from blackjack import blackjack
+from blackjack.engine import BetRamp, Policy, compile_table, dealer_policy, stand_policy
+from blackjack.probability import shoe_composition
+from blackjack.rules import DEFAULT_RULES, Rules
+from blackjack.session import MINIMUM_BET
+from blackjack.strategy import UPCARDS, StrategyTable, generate
+
+
+class PlayerPolicy(ABC):
+    """
+    This class is the base of the player policies: it bets the minimum
+    and leaves the hit or stay decision to the subclasses. Calling a policy
+    decides whether to hit, so it can be given to the Engine as a Policy,
+    and engine.simulate asks it for every bet.
+    """
+
+    def bet(self, tokens: int, true_count: float = 0.0) -> int:
+        """
+        Sizes the bet for the next round
+
+        Parameters:
+            tokens (int): The tokens the player has
+            true_count (float): The true count of the shoe before the round
+
+        Returns:
+            The amount of tokens to bet
+        """
+
+        return MINIMUM_BET
+
+    @abstractmethod
+    def hit(self, total: int, soft: bool, upcard: int) -> bool:
+        """
+        Decides whether the player hits
+
+        Parameters:
+            total (int): The player's current total
+            soft (bool): Whether an ace is being counted as 11
+            upcard (int): The value of the dealer's upcard, aces are 1
+
+        Returns:
+            True to hit, False to stay
+        """
+
+    def __call__(self, total: int, soft: bool, upcard: int) -> bool:
+        """
+        Decides whether the player hits, like hit
+
+        Parameters:
+            total (int): The player's current total
+            soft (bool): Whether an ace is being counted as 11
+            upcard (int): The value of the dealer's upcard, aces are 1
+
+        Returns:
+            True to hit, False to stay
+        """
+
+        return self.hit(total, soft, upcard)
+
+
+class TablePolicy(PlayerPolicy):
+    """
+    This class is a policy whose decisions are compiled into a table.
+    """
+
+    def __init__(self, table: bytes):
+        """
+        Initializes an instance of TablePolicy
+
+        Parameters:
+            table (bytes): The decisions, as made by engine.compile_table
+        """
+
+        self._table = table
+
+    @classmethod
+    def compile(cls, policy: Policy) -> "TablePolicy":
+        """
+        Compiles any policy that only depends on the hand
+
+        Parameters:
+            policy (Policy): Decides whether the player hits or stays
+
+        Returns:
+            A policy that looks up the same decisions
+        """
+
+        return TablePolicy(compile_table(policy))
+
+    @property
+    def table(self) -> bytes:
+        """
+        Gets the compiled decisions
+
+        Returns:
+            The decisions indexed by (total * 2 + soft) * UPCARDS + upcard, 1 to hit
+        """
+
+        return self._table
+
+    def hit(self, total: int, soft: bool, upcard: int) -> bool:
+        """
+        Looks up whether the player hits
+
+        Parameters:
+            total (int): The player's current total
+            soft (bool): Whether an ace is being counted as 11
+            upcard (int): The value of the dealer's upcard, aces are 1
+
+        Returns:
+            True to hit, False to stay
+        """
+
+        return self._table[(total * 2 + soft) * UPCARDS + upcard] == 1
+
+
+class AlwaysStand(TablePolicy):
+    """
+    This class always stays on the first two cards.
+    """
+
+    def __init__(self):
+        """
+        Initializes an instance of AlwaysStand
+        """
+
+        super().__init__(compile_table(stand_policy))
+
+
+class MimicDealer(TablePolicy):
+    """
+    This class plays like the dealer, hitting until the total is 17 or higher.
+    """
+
+    def __init__(self):
+        """
+        Initializes an instance of MimicDealer
+        """
+
+        super().__init__(compile_table(dealer_policy))
+
+
+class BasicStrategy(TablePolicy):
+    """
+    This class hits or stays following the strategy table of a shoe.
+    """
+
+    def __init__(self, decks: int = 6, strategy: Optional[StrategyTable] = None,
+                 rules: Rules = DEFAULT_RULES):
+        """
+        Initializes an instance of BasicStrategy
+
+        Parameters:
+            decks (int): The amount of decks in the shoe
+            strategy (StrategyTable): The table to follow, generated
+            for a full shoe of decks when None
+            rules (Rules): The rules the table is generated for
+        """
+
+        if strategy is None:
+            strategy = generate(shoe_composition(decks), decks=decks, rules=rules)
+
+        super().__init__(compile_table(strategy))
+        self._strategy = strategy
+
+    @property
+    def strategy(self) -> StrategyTable:
+        """
+        Gets the table the policy follows
+
+        Returns:
+            The strategy table
+        """
+
+        return self._strategy
+
+
+class CountBetting(TablePolicy):
+    """
+    This class plays like another table policy but sizes its bets from the true count,
+    like engine.BetRamp.
+    """
+
+    def __init__(self, unit: int = MINIMUM_BET, spread: int = 8, play: Optional[TablePolicy] = None):
+        """
+        Initializes an instance of CountBetting
+
+        Parameters:
+            unit (int): The smallest bet
+            spread (int): The largest bet, in units
+            play (TablePolicy): Decides whether to hit, basic strategy for 6 decks when None
+        """
+
+        if play is None:
+            play = BasicStrategy()
+
+        super().__init__(play.table)
+        self._ramp = BetRamp(unit, spread)
+
+    def bet(self, tokens: int, true_count: float = 0.0) -> int:
+        """
+        Sizes the bet from the true count
+
+        Parameters:
+            tokens (int): The tokens the player has
+            true_count (float): The true count of the shoe before the round
+
+        Returns:
+            The amount of tokens to bet
+        """
+
+        return self._ramp(true_count)
+
+
+class InteractivePolicy(PlayerPolicy):
+    """
+    This class asks the user for every bet and every decision, with the prompts of blackjack.
+    """
+
+    def bet(self, tokens: int, true_count: float = 0.0) -> int:
+        """
+        Asks the user how much they want to bet with blackjack.ask_bet
+
+        Parameters:
+            tokens (int): The tokens the player has
+            true_count (float): The true count of the shoe, not shown to the user
+
+        Returns:
+            The amount of tokens to bet
+        """
+
+        return blackjack.ask_bet(tokens, MINIMUM_BET)
+
+    def hit(self, total: int, soft: bool, upcard: int) -> bool:
+        """
+        Asks the user whether they want to be hit or stay with blackjack.ask_hit_or_stay
+
+        Parameters:
+            total (int): The player's current total
+            soft (bool): Whether an ace is being counted as 11
+            upcard (int): The value of the dealer's upcard, aces are 1
+
+        Returns:
+            True if the user wants to be hit, false if they stay
+        """
+
+        return blackjack.ask_hit_or_stay()
+
+
+# Policies that can be selected by name from the command line
+PLAYER_POLICIES: Dict[str, Type[PlayerPolicy]] = {"basic": BasicStrategy,
+                                                  "count": CountBetting,
+                                                  "dealer": MimicDealer,
+                                                  "interactive": InteractivePolicy,
+                                                  "stand": AlwaysStand}
@@ -0,0 +1,221 @@
+"""
+This module calculates the exact probabilities of the dealer's final total,
+following the same rule as blackjack.dealer_hit_or_stay: the dealer deals
+themselves cards until they reach a score of 17 or higher, or past a soft 17
+when the rules say so.
+
+A shoe is described by its composition: a tuple with how many cards are left
+of every value, from aces (index 0) to ten-valued cards (index 9).
+"""
+import argparse
+import time
+from typing import Dict, Iterable, Tuple
+
+from blackjack.card import CARDS, Card
+from blackjack.rules import DEFAULT_RULES, Rules
+
+# Composition of a single deck, indexed by card value - 1
+DECK_COMPOSITION = tuple(sum(1 for card in CARDS if card.value == value) for value in range(1, 11))
+
+# What every position of a dealer distribution stands for
+DEALER_OUTCOMES = ("17", "18", "19", "20", "21", "bust")
+
+# A distribution is the probability of every dealer outcome
+Distribution = Tuple[float, float, float, float, float, float]
+
+
+def shoe_composition(decks: int = 1) -> Tuple[int, ...]:
+    """
+    Gets the composition of a full shoe
+
+    Parameters:
+        decks (int): The amount of decks in the shoe
+
+    Returns:
+        How many cards of every value are in the shoe
+    """
+
+    return tuple(count * decks for count in DECK_COMPOSITION)
+
+
+def composition(cards: Iterable[Card]) -> Tuple[int, ...]:
+    """
+    Counts the cards of every value in a group of cards
+
+    Parameters:
+        cards (Iterable[Card]): The cards to count, e.g. Deck.cards
+
+    Returns:
+        How many cards of every value there are
+    """
+
+    counts = [0] * 10
+    for card in cards:
+        counts[card.value - 1] += 1
+
+    return tuple(counts)
+
+
+def remove(counts: Tuple[int, ...], value: int) -> Tuple[int, ...]:
+    """
+    Takes one card out of a composition
+
+    Parameters:
+        counts (Tuple[int, ...]): The composition
+        value (int): The value of the card taken out, aces are valued at 1
+
+    Returns:
+        The composition without that card
+    """
+
+    index = value - 1
+    return counts[:index] + (counts[index] - 1,) + counts[index + 1:]
+
+
+class DealerProbabilities:
+    """
+    This class calculates the distribution of the dealer's final total for an upcard
+    and the cards left in the shoe, by going through every card the dealer can draw.
+
+    Every result is cached by the dealer's hand and the composition of the shoe, so
+    repeated queries for the same shoe, and hands reached through different draws,
+    are only calculated once.
+    """
+
+    def __init__(self, rules: Rules = DEFAULT_RULES):
+        """
+        Initializes an instance of DealerProbabilities with an empty cache
+
+        Parameters:
+            rules (Rules): The rules the dealer plays by, only whether they
+            hit a soft 17 matters so the cache can be shared by any rules that agree on it
+        """
+
+        self._hits_soft_17 = rules.hits_soft_17
+        self._cache: Dict[Tuple[int, bool, Tuple[int, ...]], Distribution] = {}
+
+    @property
+    def hits_soft_17(self) -> bool:
+        """
+        Gets whether the dealer hits a soft 17
+
+        Returns:
+            True if the dealer hits a soft 17, false if they stay
+        """
+
+        return self._hits_soft_17
+
+    @property
+    def cache_size(self) -> int:
+        """
+        Gets how many distributions are cached
+
+        Returns:
+            The amount of cached distributions
+        """
+
+        return len(self._cache)
+
+    def clear_cache(self):
+        """
+        Forgets every cached distribution
+        """
+
+        self._cache.clear()
+
+    def final_totals(self, upcard: int, counts: Tuple[int, ...]) -> Distribution:
+        """
+        Calculates the distribution of the dealer's final total
+
+        Parameters:
+            upcard (int): The value of the dealer's upcard, aces are valued at 1
+            counts (Tuple[int, ...]): The composition of the shoe, not counting the upcard
+
+        Returns:
+            The probability of every outcome in DEALER_OUTCOMES
+        """
+
+        return self._play(upcard, upcard == 1, tuple(counts))
+
+    def table(self, counts: Tuple[int, ...]) -> Dict[int, Distribution]:
+        """
+        Calculates the distribution of the dealer's final total for every upcard,
+        each one being taken out of the shoe before the dealer plays
+
+        Parameters:
+            counts (Tuple[int, ...]): The composition of the shoe
+
+        Returns:
+            The distribution for every upcard value that's left in the shoe
+        """
+
+        return {upcard: self.final_totals(upcard, remove(counts, upcard))
+                for upcard in range(1, 11) if counts[upcard - 1] > 0}
+
+    def _play(self, hard: int, ace: bool, counts: Tuple[int, ...]) -> Distribution:
+        """
+        Calculates the distribution from a hand of the dealer
+
+        Parameters:
+            hard (int): The dealer's total with every ace valued at 1
+            ace (bool): Whether the dealer holds an ace
+            counts (Tuple[int, ...]): The composition of the shoe
+
+        Returns:
+            The probability of every outcome in DEALER_OUTCOMES
+        """
+
+        key = (hard, ace, counts)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        total = hard + 10 if (ace and hard <= 11) else hard
+        if total >= 17 and not (total == 17 and self._hits_soft_17 and ace and hard == 7):
+            # The dealer stays, or has busted
+            result = [0.0] * 6
+            result[min(total, 22) - 17] = 1.0
+        else:
+            result = [0.0] * 6
+            left = sum(counts)
+            for index, count in enumerate(counts):
+                if count == 0:
+                    continue
+
+                # Draws a card of this value and adds up what follows, weighted by its chance
+                value = index + 1
+                drawn = counts[:index] + (count - 1,) + counts[index + 1:]
+                chance = count / left
+                following = self._play(hard + value, ace or value == 1, drawn)
+                for outcome in range(6):
+                    result[outcome] += chance * following[outcome]
+
+        distribution = tuple(result)
+        self._cache[key] = distribution
+        return distribution
+
+
+def main():
+    """
+    Runs the dealer probability tables from the command line and prints them
+    """
+
+    parser = argparse.ArgumentParser(description="Prints the dealer's final total odds for every upcard.")
+    parser.add_argument("-d", "--decks", type=int, default=8, help="decks in the shoe")
+    parser.add_argument("--hit-soft-17", action="store_true", help="the dealer hits a soft 17")
+    args = parser.parse_args()
+
+    calculator = DealerProbabilities(Rules(hits_soft_17=args.hit_soft_17))
+    start = time.perf_counter()
+    table = calculator.table(shoe_composition(args.decks))
+    elapsed = time.perf_counter() - start
+
+    print("upcard " + ' '.join(f"{outcome:>7}" for outcome in DEALER_OUTCOMES))
+    for upcard, distribution in table.items():
+        name = "A" if upcard == 1 else str(upcard)
+        print(f"{name:>6} " + ' '.join(f"{chance:7.4f}" for chance in distribution))
+    print(f"Calculated in {elapsed:.3f} s, {calculator.cache_size} cached distributions")
+
+
+if __name__ == "__main__":
+    main()
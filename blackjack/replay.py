@@ -0,0 +1,477 @@
+"""
+This module replays the rounds of a hand history through the game's own logic,
+and reports every round whose replay doesn't match what was recorded.
+
+Records hold the cards in the order they were dealt and how many times the player
+hit, so a round is replayed by loading its card values into a ReplayEngine that
+hits as many times, at the speed of a simulation. A slower replay loads the cards
+into a deck and plays a GameSession with the same actions instead, through the
+Deck, Hand, count_points and Currency of the interactive game, without any input
+or output.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import List, Optional, Sequence, Tuple
+
+from blackjack.card import CARDS, RANK_VALUES, Card
+from blackjack.currency import Currency
+from blackjack.deck import Deck
+from blackjack.engine import HARD_VALUES, OUTCOME_NAMES, Engine, stand_policy
+from blackjack.history import CARD_CODES, STOOD, TRUNCATED, HandHistoryReader
+from blackjack.rules import Rules
+from blackjack.session import DEALING, PLAYER_TURN, GameSession
+
+# The card dealt for every value of a history that only records values,
+# suits don't change a round so the first suit is used
+VALUE_CARDS = tuple(CARDS[RANK_VALUES.index(value)] if value else None for value in range(11))
+
+# The value of every byte of a history, for bytes.translate, 0 for the bytes that aren't a card
+CODE_VALUES = bytes(HARD_VALUES) + bytes(256 - len(HARD_VALUES))
+VALUE_VALUES = bytes(range(11)) + bytes(256 - 11)
+
+
+class ReplayDeck(Deck):
+    """
+    This class is a deck that deals the cards of a recorded round instead of a shuffled deck.
+    """
+
+    def __init__(self):
+        """
+        Initializes an instance of ReplayDeck, it doesn't keep any count
+        """
+
+        super().__init__(count_systems=())
+
+    def load(self, cards: Sequence[Card]):
+        """
+        Replaces the cards left with the ones of a recorded round
+
+        Parameters:
+            cards (Sequence[Card]): The cards in the order they were dealt
+        """
+
+        # Cards are dealt from the end of the list
+        self._cards[:] = cards
+        self._cards.reverse()
+
+    def reshuffle(self):
+        """
+        Keeps the cards of the recorded round, which are dealt as they were
+        even though there are fewer of them than a round is given room for
+        """
+
+    def _count(self, card: Card):
+        """
+        Ignores the dealt card, a recorded round isn't dealt from a
+        full deck so there's nothing to count
+
+        Parameters:
+            card (Card): The dealt card
+        """
+
+
+class ReplayEngine(Engine):
+    """
+    This class is an engine that deals the card values of a recorded round
+    and hits as many times as the player did.
+    """
+
+    def __init__(self, rules: Rules):
+        """
+        Initializes an instance of ReplayEngine
+
+        Parameters:
+            rules (Rules): The rules the dealer plays and the bets are settled by
+        """
+
+        # A whole shoe is dealt, so the loaded cards are never reshuffled away
+        super().__init__(Currency(0), stand_policy, decks=1, penetration=1.0, rules=rules)
+        # The player's decisions are answered by __getitem__ instead of a compiled table
+        self._table = self
+        # The hits left to take in the round
+        self.hits = 0
+
+    def load(self, values: bytes, hits: int):
+        """
+        Replaces the cards left with the ones of a recorded round
+
+        Parameters:
+            values (bytes): The card values in the order they were dealt
+            hits (int): How many times the player hits
+        """
+
+        # Cards are dealt from the end of the list
+        self._cards[:] = values[::-1]
+        self.hits = hits
+
+    def __getitem__(self, index: int) -> bool:
+        """
+        Decides whether the player hits, in place of a lookup in a compiled table
+
+        Parameters:
+            index (int): The index of the hand in a table, which doesn't matter
+
+        Returns:
+            True while there are hits left to take
+        """
+
+        if self.hits:
+            self.hits -= 1
+            return True
+
+        return False
+
+    def _draw(self) -> int:
+        """
+        Refuses to deal past the recorded cards
+
+        Raises:
+            IndexError: Always, the recorded cards ran out
+        """
+
+        raise IndexError("The recorded cards ran out")
+
+
+class Divergence:
+    """
+    This class describes a difference between a recorded round and its replay.
+    """
+
+    __slots__ = ("round", "field", "recorded", "replayed")
+
+    def __init__(self, round: int, field: str, recorded: object, replayed: object):
+        """
+        Initializes an instance of Divergence
+
+        Parameters:
+            round (int): The number of the round
+            field (str): What differs
+            recorded (object): What the hand history says
+            replayed (object): What the replay did
+        """
+
+        self.round = round
+        self.field = field
+        self.recorded = recorded
+        self.replayed = replayed
+
+    def __str__(self) -> str:
+        """
+        Allows to print out the divergence
+
+        Returns:
+            A string with the round and both values
+        """
+
+        return f"Round {self.round}: {self.field} was recorded as {self.recorded}, replayed as {self.replayed}"
+
+
+class ReplayResult:
+    """
+    This class holds the summary of a replay.
+    """
+
+    def __init__(self, rounds: int = 0, skipped: int = 0, diverged: int = 0,
+                 divergences: Optional[List[Divergence]] = None, elapsed: float = 0.0):
+        """
+        Initializes an instance of ReplayResult
+
+        Parameters:
+            rounds (int): The amount of rounds replayed
+            skipped (int): The amount of rounds that couldn't be replayed
+            because their record is missing cards
+            diverged (int): The amount of rounds whose replay didn't match
+            divergences (List[Divergence]): The first divergences found
+            elapsed (float): The seconds it took to replay the rounds
+        """
+
+        self.rounds = rounds
+        self.skipped = skipped
+        self.diverged = diverged
+        self.divergences = divergences if divergences is not None else []
+        self.elapsed = elapsed
+
+    @property
+    def rounds_per_second(self) -> float:
+        """
+        Gets the throughput of the replay
+
+        Returns:
+            The amount of rounds replayed every second
+        """
+
+        return self.rounds / self.elapsed if self.elapsed else 0.0
+
+    def merge(self, other: "ReplayResult", max_divergences: int = 1000):
+        """
+        Adds the rounds of another replay to this one
+
+        Parameters:
+            other (ReplayResult): The replay to add
+            max_divergences (int): How many divergences are kept at most
+        """
+
+        self.rounds += other.rounds
+        self.skipped += other.skipped
+        self.diverged += other.diverged
+        self.divergences += other.divergences[:max_divergences - len(self.divergences)]
+
+    def __str__(self) -> str:
+        """
+        Allows to print out the summary of a replay
+
+        Returns:
+            A string with the amount of rounds replayed and the ones that diverged
+        """
+
+        lines = [f"Rounds replayed: {self.rounds}",
+                 f"Rounds skipped: {self.skipped}",
+                 f"Rounds diverged: {self.diverged}"]
+        lines += [f"  {divergence}" for divergence in self.divergences]
+        lines.append(f"Rounds per second: {self.rounds_per_second:.0f}")
+        return '\n'.join(lines)
+
+
+def replay_round(session: GameSession, deck: ReplayDeck, fields: Tuple,
+                 decode: Sequence[Card]) -> List[Divergence]:
+    """
+    Replays a recorded round and compares it with the record
+
+    Parameters:
+        session (GameSession): The session to replay the round in, it must be
+        betting and dealing from deck
+        deck (ReplayDeck): The deck of the session
+        fields (Tuple): The fields of the record, as given by HandHistoryReader.scan
+        decode (Sequence[Card]): The card for every byte of the record
+
+    Returns:
+        The ways the replay differs from the record, empty when it matches
+    """
+
+    number, _, _, outcome, flags, bet, net, tokens, player_count, dealer_count, cards, _ = fields
+    dealt = [decode[card] if card < len(decode) else None for card in cards[:player_count + dealer_count]]
+    if player_count < 2 or dealer_count < 2 or any(card is None for card in dealt):
+        # A round can't be dealt without two cards for each hand
+        return [Divergence(number, "actions", f"{player_count - 2} hits",
+                           f"a short or malformed record of {player_count} and {dealer_count} cards")]
+    deck.load(dealt)
+
+    currency = session.tokens
+    currency.reset(tokens - net)
+    divergences = []
+
+    # The record holds the bet placed, which was capped to the player's tokens and may
+    # be under the session's minimum, so it's put back on the tokens as it was
+    currency.bet(bet)
+    if currency.tokens_bet != bet:
+        divergences.append(Divergence(number, "bet", bet, currency.tokens_bet))
+    session.restore([], [], currency.total_tokens, currency.tokens_bet, DEALING, session.outcome)
+
+    try:
+        session.deal()
+        for _ in range(player_count - 2):
+            session.hit()
+
+        stood = session.state == PLAYER_TURN
+        if stood:
+            session.stay()
+        if stood != bool(flags & STOOD):
+            divergences.append(Divergence(number, "stood", bool(flags & STOOD), stood))
+
+        replayed = session.finish()
+    except (RuntimeError, ValueError) as error:
+        # The recorded actions can't be taken, the session starts over
+        session.reset(0)
+        divergences.append(Divergence(number, "actions", f"{player_count - 2} hits", error))
+        return divergences
+
+    if replayed != outcome:
+        divergences.append(Divergence(number, "outcome", OUTCOME_NAMES[outcome], OUTCOME_NAMES[replayed]))
+    if currency.total_tokens != tokens:
+        divergences.append(Divergence(number, "tokens", tokens, currency.total_tokens))
+
+    dealer_cards = len(session.d_hand.cards)
+    if deck.cards_left:
+        divergences.append(Divergence(number, "dealer cards", dealer_count, dealer_cards))
+    elif not session.p_has_busted and session.rules.dealer_hits(session.d_hand.total, session.d_hand.is_soft):
+        # The recorded cards ran out while the dealer was still drawing
+        divergences.append(Divergence(number, "dealer cards", dealer_count, f"more than {dealer_cards}"))
+
+    return divergences
+
+
+def replay_values(engine: ReplayEngine, fields: Tuple, decode: bytes) -> List[Divergence]:
+    """
+    Replays a recorded round through the engine and compares it with the record,
+    finding the same divergences as replay_round
+
+    Parameters:
+        engine (ReplayEngine): The engine to replay the round in
+        fields (Tuple): The fields of the record, as given by HandHistoryReader.scan
+        decode (bytes): The value for every byte of the record, like CODE_VALUES
+
+    Returns:
+        The ways the replay differs from the record, empty when it matches
+    """
+
+    number, _, _, outcome, flags, bet, net, tokens, player_count, dealer_count, cards, _ = fields
+    values = cards[:player_count + dealer_count].translate(decode)
+    if player_count < 2 or dealer_count < 2 or len(values) < player_count + dealer_count or 0 in values:
+        # A round can't be dealt without two cards for each hand
+        return [Divergence(number, "actions", f"{player_count - 2} hits",
+                           f"a short or malformed record of {player_count} and {dealer_count} cards")]
+
+    currency = engine.currency
+    currency.reset(tokens - net)
+    divergences = []
+
+    # The engine caps the bet to the player's tokens like Currency.bet,
+    # so a recorded bet over them wasn't placed as it was recorded
+    if bet > currency.total_tokens:
+        divergences.append(Divergence(number, "bet", bet, currency.total_tokens))
+
+    engine.load(values, player_count - 2)
+    try:
+        replayed = engine.play_round(bet)
+    except IndexError:
+        # The recorded cards ran out while the dealer was still drawing
+        divergences.append(Divergence(number, "dealer cards", dealer_count, f"more than {dealer_count}"))
+        return divergences
+
+    if engine.hits:
+        # The player reached 21 or busted before taking every recorded hit
+        divergences.append(Divergence(number, "actions", f"{player_count - 2} hits",
+                                      f"{player_count - 2 - engine.hits} hits"))
+        return divergences
+
+    stood = engine.player_total < 21
+    if stood != bool(flags & STOOD):
+        divergences.append(Divergence(number, "stood", bool(flags & STOOD), stood))
+    if replayed != outcome:
+        divergences.append(Divergence(number, "outcome", OUTCOME_NAMES[outcome], OUTCOME_NAMES[replayed]))
+    if currency.total_tokens != tokens:
+        divergences.append(Divergence(number, "tokens", tokens, currency.total_tokens))
+    if engine.cards:
+        divergences.append(Divergence(number, "dealer cards", dealer_count, dealer_count - len(engine.cards)))
+
+    return divergences
+
+
+def replay_range(task: Tuple[str, int, Optional[int], int, bool]) -> ReplayResult:
+    """
+    Replays a range of rounds, this can run in a worker process
+
+    Parameters:
+        task (tuple): The directory of the hand history, the number of the first round,
+        the number after the last round (None for every round), how many
+        divergences are kept at most and whether the rounds are replayed
+        through game sessions instead of the engine
+
+    Returns:
+        The summary of the replay
+    """
+
+    directory, start, stop, max_divergences, sessions = task
+    result = ReplayResult()
+
+    with HandHistoryReader(directory) as reader:
+        # The dealer plays and the bets are settled by the rules the rounds were recorded with
+        codes = reader.encoding == CARD_CODES
+        if sessions:
+            deck = ReplayDeck()
+            session = GameSession(deck, 0, rules=reader.rules)
+            replay_fields = partial(replay_round, session, deck)
+            decode = CARDS if codes else VALUE_CARDS
+        else:
+            replay_fields = partial(replay_values, ReplayEngine(reader.rules))
+            decode = CODE_VALUES if codes else VALUE_VALUES
+
+        for fields in reader.scan(start, stop):
+            if fields[4] & TRUNCATED:
+                result.skipped += 1
+                continue
+
+            result.rounds += 1
+            divergences = replay_fields(fields, decode)
+            if divergences:
+                result.diverged += 1
+                result.divergences += divergences[:max_divergences - len(result.divergences)]
+
+    return result
+
+
+def replay(directory: str, start: int = 0, stop: Optional[int] = None, workers: int = 1,
+           max_divergences: int = 1000, sessions: bool = False) -> ReplayResult:
+    """
+    Replays the rounds of a hand history, split across a pool of processes
+
+    Parameters:
+        directory (str): The directory holding the hand history
+        start (int): The number of the first round to replay
+        stop (int): The number after the last round to replay, None for every round
+        workers (int): The amount of processes, None for one per CPU
+        max_divergences (int): How many divergences are kept at most
+        sessions (bool): Whether the rounds are replayed through game sessions,
+        decks and hands instead of the engine, which is several times slower
+
+    Returns:
+        The summary of the replay
+    """
+
+    workers = workers or os.cpu_count() or 1
+    if stop is None:
+        with HandHistoryReader(directory) as reader:
+            stop = reader.end
+
+    # Rounds are split as evenly as possible across the workers
+    bounds = [start + (stop - start) * worker // workers for worker in range(workers + 1)]
+    tasks = [(directory, low, high, max_divergences, sessions) for low, high in zip(bounds, bounds[1:])]
+
+    begin = time.perf_counter()
+    if workers == 1:
+        results = [replay_range(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(replay_range, tasks))
+
+    # Merging always happens in round order
+    result = ReplayResult()
+    for part in results:
+        result.merge(part, max_divergences)
+    result.elapsed = time.perf_counter() - begin
+
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Runs a replay of a hand history from the command line and prints its divergences
+
+    Parameters:
+        argv (List[str]): The command line arguments, None to use sys.argv
+
+    Returns:
+        The exit status, 1 if any round diverged
+    """
+
+    parser = argparse.ArgumentParser(description="Replays a hand history and reports rounds that don't match it.")
+    parser.add_argument("directory", help="directory holding the hand history")
+    parser.add_argument("--start", type=int, default=0, help="number of the first round to replay")
+    parser.add_argument("--stop", type=int, default=None, help="number after the last round to replay")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="processes to split the replay across")
+    parser.add_argument("--max-divergences", type=int, default=20, help="divergences to print at most")
+    parser.add_argument("--sessions", action="store_true",
+                        help="replay through game sessions, decks and hands instead of the engine")
+    args = parser.parse_args(argv)
+
+    result = replay(args.directory, args.start, args.stop, args.workers, args.max_divergences, args.sessions)
+    print(result)
+    return 1 if result.diverged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,423 @@
+"""
+This module estimates the risk of ruin of a betting policy by simulating many
+bankrolls at once as NumPy arrays. It needs NumPy to be installed.
+
+Every bankroll follows the rules of Currency: a bet is at least the 100 tokens
+asked for by blackjack.ask_bet, capped to the tokens left like Currency.bet, a win
+cashes the bet in, a loss cashes it out and a draw cashes in half of it. A bankroll
+is ruined once it has no tokens left, like the game saying "You're out of tokens!".
+
+Rounds are drawn independently from the chances of losing, drawing and winning,
+which come from playing the player's policy with the vectorized engine.
+"""
+import argparse
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from blackjack import vectorized
+from blackjack.engine import (BLACKJACK, BLACKJACK_DRAW, DEALER_BUST, DRAW, LOSE, PLAYER_BUST,
+                              POLICIES, WIN, Policy, dealer_policy)
+
+# The smallest bet allowed, like blackjack.ask_bet
+MINIMUM_BET = 100
+
+# Sizes the next bet of every bankroll from the bankrolls, their last bets and their last results
+BetPolicy = Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray]
+
+# Results are picked from 16-bit random numbers, so chances are
+# rounded to multiples of 1 / RESOLUTION
+RESOLUTION = 1 << 16
+
+# What a result does to the bet, in halves: losing takes all of it, drawing
+# cashes in half of it (rounded down like Currency.cash_in_half) and winning cashes all of it in
+LOSS_HALVES = -2
+DRAW_HALVES = 1
+WIN_HALVES = 2
+
+
+def result_chances(policy: Policy = dealer_policy, decks: int = 1, rounds: int = 2_000_000,
+                   seed: Optional[int] = None) -> Tuple[float, float, float]:
+    """
+    Works out how often a policy loses, draws and wins a round
+
+    Parameters:
+        policy (Policy): Decides whether the player hits or stays
+        decks (int): The amount of decks in the shoe
+        rounds (int): The amount of rounds to play to estimate the chances
+        seed (int): The seed for the draws, None for a random one
+
+    Returns:
+        The chances of losing, drawing and winning a round
+    """
+
+    outcomes = vectorized.simulate(rounds, seed, policy, decks=decks).outcomes
+    losses = outcomes[PLAYER_BUST] + outcomes[LOSE]
+    draws = outcomes[DRAW] + outcomes[BLACKJACK_DRAW]
+    wins = outcomes[WIN] + outcomes[DEALER_BUST] + outcomes[BLACKJACK]
+    return losses / rounds, draws / rounds, wins / rounds
+
+
+class FlatBet:
+    """
+    This class bets the same amount every round.
+    """
+
+    def __init__(self, amount: int = MINIMUM_BET):
+        """
+        Initializes an instance of FlatBet
+
+        Parameters:
+            amount (int): The tokens to bet every round
+        """
+
+        self.amount = amount
+
+    def __call__(self, bankrolls: np.ndarray, bets: np.ndarray, results: np.ndarray) -> np.ndarray:
+        """
+        Sizes the next bet of every bankroll
+
+        Parameters:
+            bankrolls (np.ndarray): The tokens of every bankroll
+            bets (np.ndarray): The tokens every bankroll bet last round, 0 before the first one
+            results (np.ndarray): The tokens every bankroll won last round, negative when lost
+
+        Returns:
+            The tokens to bet, before the minimum and the cap are applied
+        """
+
+        # The same amount for every bankroll, NumPy spreads it over the array
+        return self.amount
+
+    def __str__(self) -> str:
+        """
+        Allows to print out the policy
+
+        Returns:
+            A string with the name of the policy and the amount it bets
+        """
+
+        return f"flat {self.amount}"
+
+
+class FractionBet:
+    """
+    This class bets a fixed share of the tokens left every round.
+    """
+
+    def __init__(self, fraction: float = 0.1):
+        """
+        Initializes an instance of FractionBet
+
+        Parameters:
+            fraction (float): The share of the tokens left to bet
+        """
+
+        self.fraction = fraction
+
+    def __call__(self, bankrolls: np.ndarray, bets: np.ndarray, results: np.ndarray) -> np.ndarray:
+        """
+        Bets the policy's share of the tokens every bankroll has left
+
+        Parameters:
+            bankrolls (np.ndarray): The tokens of every bankroll
+            bets (np.ndarray): The tokens every bankroll bet last round, 0 before the first one
+            results (np.ndarray): The tokens every bankroll won last round, negative when lost
+
+        Returns:
+            The tokens to bet, rounded down, before the minimum and the cap are applied
+        """
+
+        return (bankrolls * self.fraction).astype(bankrolls.dtype)
+
+    def __str__(self) -> str:
+        """
+        Allows to print out the policy
+
+        Returns:
+            A string with the name of the policy and the share it bets
+        """
+
+        return f"fraction {self.fraction}"
+
+
+class Martingale:
+    """
+    This class doubles the bet after every loss and goes back to the base bet after anything else.
+    """
+
+    def __init__(self, base: int = MINIMUM_BET):
+        """
+        Initializes an instance of Martingale
+
+        Parameters:
+            base (int): The tokens to bet at first and after every round that wasn't lost
+        """
+
+        self.base = base
+
+    def __call__(self, bankrolls: np.ndarray, bets: np.ndarray, results: np.ndarray) -> np.ndarray:
+        """
+        Doubles the last bet of every bankroll that lost it, the others go back to the base bet
+
+        Parameters:
+            bankrolls (np.ndarray): The tokens of every bankroll
+            bets (np.ndarray): The tokens every bankroll bet last round, 0 before the first one
+            results (np.ndarray): The tokens every bankroll won last round, negative when lost
+
+        Returns:
+            The tokens to bet, before the minimum and the cap are applied
+        """
+
+        return np.where(results < 0, bets * 2, self.base)
+
+    def __str__(self) -> str:
+        """
+        Allows to print out the policy
+
+        Returns:
+            A string with the name of the policy and its base bet
+        """
+
+        return f"martingale {self.base}"
+
+
+class RuinResult:
+    """
+    This class holds the summary of a risk-of-ruin simulation.
+    """
+
+    def __init__(self, rounds: int, ruin_rounds: np.ndarray, finals: np.ndarray, elapsed: float):
+        """
+        Initializes an instance of RuinResult
+
+        Parameters:
+            rounds (int): The amount of rounds every bankroll played at most
+            ruin_rounds (np.ndarray): The round every bankroll was ruined in, -1 when it wasn't
+            finals (np.ndarray): The tokens every bankroll ended with
+            elapsed (float): The seconds it took to simulate the bankrolls
+        """
+
+        self.rounds = rounds
+        self.ruin_rounds = ruin_rounds
+        self.finals = finals
+        self.elapsed = elapsed
+
+    @property
+    def paths(self) -> int:
+        """
+        Gets the amount of bankrolls simulated
+
+        Returns:
+            The amount of bankrolls
+        """
+
+        return len(self.finals)
+
+    @property
+    def ruin_probability(self) -> float:
+        """
+        Gets the share of bankrolls that were ruined
+
+        Returns:
+            The chance of running out of tokens within the rounds played
+        """
+
+        return float(np.count_nonzero(self.ruin_rounds >= 0)) / self.paths
+
+    def ruin_times(self, quantiles: Sequence[float] = (0.1, 0.5, 0.9)) -> List[float]:
+        """
+        Gets how many rounds the ruined bankrolls lasted
+
+        Parameters:
+            quantiles (Sequence[float]): The quantiles to work out
+
+        Returns:
+            The amount of rounds played before ruin at every quantile, empty
+            when no bankroll was ruined
+        """
+
+        ruined = self.ruin_rounds[self.ruin_rounds >= 0]
+        if not len(ruined):
+            return []
+
+        return [float(value) for value in np.quantile(ruined + 1, quantiles)]
+
+    def final_quantiles(self, quantiles: Sequence[float] = (0.05, 0.25, 0.5, 0.75, 0.95)) -> List[float]:
+        """
+        Gets the final tokens of the bankrolls at some quantiles
+
+        Parameters:
+            quantiles (Sequence[float]): The quantiles to work out
+
+        Returns:
+            The final tokens at every quantile
+        """
+
+        return [float(value) for value in np.quantile(self.finals, quantiles)]
+
+    def __str__(self) -> str:
+        """
+        Allows to print out the summary of the simulation
+
+        Returns:
+            A string with the chance of ruin, the time to ruin and the final bankrolls
+        """
+
+        lines = [f"Bankrolls: {self.paths}, rounds: {self.rounds}",
+                 f"Ruin probability: {self.ruin_probability:.4%}"]
+
+        times = self.ruin_times()
+        if times:
+            lines.append(f"Rounds until ruin (10%/50%/90%): {times[0]:.0f} / {times[1]:.0f} / {times[2]:.0f}")
+
+        quantiles = (0.05, 0.25, 0.5, 0.75, 0.95)
+        lines.append("Final tokens:")
+        lines += [f"  {quantile:.0%}: {value:.0f}"
+                  for quantile, value in zip(quantiles, self.final_quantiles(quantiles))]
+        lines.append(f"Mean final tokens: {self.finals.mean():.1f}")
+        lines.append(f"Seconds: {self.elapsed:.2f}")
+        return '\n'.join(lines)
+
+
+def simulate(paths: int, rounds: int, starting_tokens: int = 1000, bet_policy: Optional[BetPolicy] = None,
+             chances: Optional[Tuple[float, float, float]] = None, seed: Optional[int] = None,
+             block: int = 64) -> RuinResult:
+    """
+    Plays the given amount of rounds on many bankrolls at once
+
+    Parameters:
+        paths (int): The amount of bankrolls
+        rounds (int): The most rounds every bankroll plays
+        starting_tokens (int): The amount of tokens every bankroll starts with
+        bet_policy (BetPolicy): Sizes the bets from the bankrolls, their last bets and
+        their last results, e.g. FlatBet, FractionBet or Martingale. FlatBet() when None
+        chances (Tuple[float, float, float]): The chances of losing, drawing and winning
+        a round, from result_chances() with the dealer's policy when None
+        seed (int): The seed for the draws, None for a random one
+        block (int): How many rounds of random numbers are drawn at once
+
+    Returns:
+        The summary of the simulation
+    """
+
+    if bet_policy is None:
+        bet_policy = FlatBet()
+    if chances is None:
+        chances = result_chances(seed=seed)
+
+    # Random numbers are taken straight from the bit generator, 4 results for every 64 bits
+    bit_generator = np.random.default_rng(seed).bit_generator
+
+    # A 16-bit random number below not_lost is a loss, and one from won up is a win
+    lose, draw, _ = chances
+    not_lost = round(lose * RESOLUTION)
+    won = round((lose + draw) * RESOLUTION)
+
+    ruin_rounds = np.full(paths, -1, dtype=np.int64)
+    finals = np.zeros(paths, dtype=np.int64)
+
+    # Only the bankrolls that still have tokens are kept in the arrays
+    alive = np.arange(paths)
+    bankrolls = np.full(paths, starting_tokens, dtype=np.int64)
+    bets = np.zeros(paths, dtype=np.int64)
+    results = np.zeros(paths, dtype=np.int64)
+
+    start = time.perf_counter()
+    played = 0
+    while played < rounds and len(alive):
+        rows = min(block, rounds - played)
+        size = rows * len(alive)
+        draws = bit_generator.random_raw((size + 3) // 4).view(np.uint16)[:size].reshape(rows, len(alive))
+
+        # The result of every round in halves of the bet, worked out with small integers
+        # as LOSS_HALVES + 3 when not lost + 1 more when won
+        halves = (draws >= not_lost).view(np.int8) * (DRAW_HALVES - LOSS_HALVES)
+        halves += (draws >= won).view(np.int8) * (WIN_HALVES - DRAW_HALVES)
+        halves += LOSS_HALVES
+
+        for row in halves:
+            if not len(alive):
+                break
+            if len(row) != len(alive):
+                # Some bankrolls were ruined since the block was drawn
+                row = row[:len(alive)]
+
+            # At least the minimum is bet, capped to the tokens left like Currency.bet
+            np.minimum(np.maximum(bet_policy(bankrolls, bets, results), MINIMUM_BET), bankrolls, out=bets)
+            np.multiply(bets, row, out=results)
+            results >>= 1
+            bankrolls += results
+
+            if bankrolls.min() <= 0:
+                ruined = bankrolls <= 0
+                ruin_rounds[alive[ruined]] = played
+                kept = ~ruined
+                alive = alive[kept]
+                bankrolls = bankrolls[kept]
+                bets = bets[kept]
+                results = results[kept]
+
+            played += 1
+
+    finals[alive] = bankrolls
+    elapsed = time.perf_counter() - start
+
+    return RuinResult(rounds, ruin_rounds, finals, elapsed)
+
+
+def bet_policy_from(text: str):
+    """
+    Builds a betting policy from its command line description
+
+    Parameters:
+        text (str): flat:AMOUNT, fraction:SHARE or martingale:BASE
+
+    Returns:
+        The betting policy
+    """
+
+    name, _, value = text.partition(":")
+    if name == "flat":
+        return FlatBet(int(value or MINIMUM_BET))
+    if name == "fraction":
+        return FractionBet(float(value or 0.1))
+    if name == "martingale":
+        return Martingale(int(value or MINIMUM_BET))
+
+    raise ValueError(f"Unknown betting policy: {text}")
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Runs a risk-of-ruin simulation from the command line and prints its summary
+
+    Parameters:
+        argv (List[str]): The command line arguments, None to use sys.argv
+    """
+
+    parser = argparse.ArgumentParser(description="Simulates many bankrolls at once to estimate the risk of ruin.")
+    parser.add_argument("-P", "--paths", type=int, default=100_000, help="amount of bankrolls")
+    parser.add_argument("-n", "--rounds", type=int, default=10_000, help="most rounds every bankroll plays")
+    parser.add_argument("-t", "--tokens", type=int, default=1000, help="tokens every bankroll starts with")
+    parser.add_argument("-b", "--bet", default="flat:100",
+                        help="betting policy: flat:AMOUNT, fraction:SHARE or martingale:BASE")
+    parser.add_argument("-p", "--policy", choices=sorted(POLICIES), default="dealer",
+                        help="how the player decides to hit or stay")
+    parser.add_argument("-d", "--decks", type=int, default=1, help="decks in the shoe")
+    parser.add_argument("--chances", type=float, nargs=3, metavar=("LOSE", "DRAW", "WIN"), default=None,
+                        help="chances of losing, drawing and winning a round instead of simulating the policy")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="seed for the draws")
+    args = parser.parse_args(argv)
+
+    chances = args.chances or result_chances(POLICIES[args.policy], args.decks, seed=args.seed)
+    print(f"Chances of losing / drawing / winning: {chances[0]:.4f} / {chances[1]:.4f} / {chances[2]:.4f}")
+
+    bet_policy = bet_policy_from(args.bet)
+    print(f"Betting policy: {bet_policy}")
+    print(simulate(args.paths, args.rounds, args.tokens, bet_policy, chances, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+This module holds the Rules class, which describes the rules a table plays by: whether
+the dealer hits a soft 17, what a blackjack dealt on the first two cards pays and what
+a tie pays. The defaults are the rules the game has always been played with.
+"""
+from fractions import Fraction
+from typing import Union
+
+# A payout can be given as anything a Fraction can be made from, e.g. 1.5 or "6/5"
+Ratio = Union[Fraction, int, float, str]
+
+
+def ratio(text: str) -> Fraction:
+    """
+    Reads a payout from the command line, e.g. 3:2, 6/5, 1.5 or 0
+
+    Parameters:
+        text (str): The payout, as tokens won for every token bet
+
+    Returns:
+        The payout as a fraction of the bet
+    """
+
+    return Fraction(text.replace(':', '/'))
+
+
+def _format(payout: Fraction) -> str:
+    """
+    Writes a payout like the tables do
+
+    Parameters:
+        payout (Fraction): The payout as a fraction of the bet
+
+    Returns:
+        The payout as e.g. 3:2
+    """
+
+    return f"{payout.numerator}:{payout.denominator}"
+
+
+class Rules:
+    """
+    This class holds the rules a round is dealt, played and settled by. Rules can't
+    be changed once made, so they can be shared and used as dictionary keys.
+    """
+
+    __slots__ = ("_hits_soft_17", "_blackjack_pays", "_tie_pays")
+
+    def __init__(self, hits_soft_17: bool = False, blackjack_pays: Ratio = 1, tie_pays: Ratio = Fraction(1, 2)):
+        """
+        Initializes an instance of Rules
+
+        Parameters:
+            hits_soft_17 (bool): Whether the dealer hits a soft 17 instead of staying
+            blackjack_pays (Ratio): The tokens won for every token bet when the player's
+            first two cards score 21, other 21s pay the bet like any win
+            tie_pays (Ratio): The tokens won for every token bet on a tie,
+            0 to give back the bet like a normal push
+        """
+
+        object.__setattr__(self, "_hits_soft_17", bool(hits_soft_17))
+        # Floats like 1.2 are read as the payout they're written as
+        object.__setattr__(self, "_blackjack_pays", Fraction(blackjack_pays).limit_denominator(1000))
+        object.__setattr__(self, "_tie_pays", Fraction(tie_pays).limit_denominator(1000))
+
+    @property
+    def hits_soft_17(self) -> bool:
+        """
+        Gets whether the dealer hits a soft 17
+
+        Returns:
+            True if the dealer hits a soft 17, false if they stay
+        """
+
+        return self._hits_soft_17
+
+    @property
+    def blackjack_pays(self) -> Fraction:
+        """
+        Gets what a blackjack on the first two cards pays
+
+        Returns:
+            The tokens won for every token bet
+        """
+
+        return self._blackjack_pays
+
+    @property
+    def tie_pays(self) -> Fraction:
+        """
+        Gets what a tie pays
+
+        Returns:
+            The tokens won for every token bet
+        """
+
+        return self._tie_pays
+
+    def dealer_hits(self, total: int, soft: bool) -> bool:
+        """
+        Decides whether the dealer hits
+
+        Parameters:
+            total (int): The dealer's total
+            soft (bool): Whether an ace is being counted as 11
+
+        Returns:
+            True to hit, False to stay
+        """
+
+        return total < 17 or (total == 17 and soft and self._hits_soft_17)
+
+    def replace(self, **changes) -> "Rules":
+        """
+        Makes a copy of the rules with some of them changed
+
+        Parameters:
+            changes: The rules to change, named like the parameters of Rules
+
+        Returns:
+            The changed rules
+        """
+
+        values = {"hits_soft_17": self._hits_soft_17,
+                  "blackjack_pays": self._blackjack_pays,
+                  "tie_pays": self._tie_pays}
+        values.update(changes)
+        return Rules(**values)
+
+    def __setattr__(self, name, value):
+        """
+        Prevents the rules from being changed
+        """
+
+        raise AttributeError("Rules can't be changed, use replace instead")
+
+    def __eq__(self, other: object) -> bool:
+        """
+        Checks whether two sets of rules are the same
+
+        Parameters:
+            other (object): The rules to compare with
+
+        Returns:
+            True if every rule is the same, false otherwise
+        """
+
+        if not isinstance(other, Rules):
+            return NotImplemented
+
+        return (self._hits_soft_17, self._blackjack_pays, self._tie_pays) == \
+               (other._hits_soft_17, other._blackjack_pays, other._tie_pays)
+
+    def __hash__(self) -> int:
+        """
+        Allows rules to be used as dictionary keys
+
+        Returns:
+            The hash of every rule
+        """
+
+        return hash((self._hits_soft_17, self._blackjack_pays, self._tie_pays))
+
+    def __reduce__(self):
+        """
+        Allows rules to be sent to worker processes
+
+        Returns:
+            How to rebuild the rules
+        """
+
+        return Rules, (self._hits_soft_17, self._blackjack_pays, self._tie_pays)
+
+    def __repr__(self) -> str:
+        """
+        Allows to print out the rules in code form
+
+        Returns:
+            A string with every rule
+        """
+
+        return (f"Rules(hits_soft_17={self._hits_soft_17}, blackjack_pays='{self._blackjack_pays}', "
+                f"tie_pays='{self._tie_pays}')")
+
+    def __str__(self) -> str:
+        """
+        Allows to print out the rules like a table sign
+
+        Returns:
+            A string with every rule
+        """
+
+        dealer = "H17" if self._hits_soft_17 else "S17"
+        ties = "ties push" if self._tie_pays == 0 else f"ties pay {_format(self._tie_pays)}"
+        return f"{dealer}, blackjack pays {_format(self._blackjack_pays)}, {ties}"
+
+
+# The rules the game has always been played with: the dealer stays on every 17,
+# blackjacks pay the bet and ties pay half of it
+DEFAULT_RULES = Rules()
@@ -0,0 +1,307 @@
+"""
+This module contains an asyncio game server, so one process can host many players.
+
+Every connection gets its own session with its own shoe, hands and tokens, and plays
+over a plain TCP line protocol instead of input():
+
+    BET <tokens>    places a bet (at least 100) and deals a new round
+    HIT / H         deals a card to the player
+    STAY / S        ends the player's turn and lets the dealer play
+    AGAIN           starts over with the initial tokens after running out
+    QUIT            closes the connection
+
+The server answers with lines such as "HAND 10C AS 21", "UPCARD 9H", "DEALER 9H 7D KS 26",
+"RESULT win 100", "TOKENS 1100" or "ERROR <message>". A bet is answered with the bet, the
+player's hand and the dealer's upcard, and every answer that ends a round ends with TOKENS.
+
+The server can also serve metrics about the games in the Prometheus text format
+over HTTP, see the metrics module.
+"""
+import argparse
+import asyncio
+import time
+from typing import List, Optional
+
+from blackjack import metrics
+from blackjack.card import Card
+from blackjack.engine import OUTCOME_NAMES
+from blackjack.hand import Hand
+from blackjack.history import CARD_CODES, HandHistoryWriter
+from blackjack.session import DEALER_TURN, SETTLING, GameSession, SessionPool
+
+# Short names of the ranks and suits used by the protocol
+RANK_CODES = ("2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A")
+SUIT_CODES = "CDHS"
+
+# The action every command's latency is recorded as
+ACTIONS = {"bet": "bet", "hit": "hit", "h": "hit", "stay": "stay", "s": "stay", "again": "again"}
+
+
+def card_code(card: Card) -> str:
+    """
+    Gets the short name of a card used by the protocol
+
+    Parameters:
+        card (Card): The card to name
+
+    Returns:
+        The short name, e.g. 10C for the Ten of Clubs
+    """
+
+    return RANK_CODES[card.rank_index] + SUIT_CODES[card.code // 13]
+
+
+def hand_line(prefix: str, hand: Hand) -> str:
+    """
+    Describes a hand in one line of the protocol
+
+    Parameters:
+        prefix (str): The first word of the line
+        hand (Hand): The hand to describe
+
+    Returns:
+        The line with the cards and the total of the hand
+    """
+
+    return f"{prefix} {' '.join(card_code(card) for card in hand.cards)} {hand.total}"
+
+
+def handle(session: GameSession, line: str) -> List[str]:
+    """
+    Runs a command from the player on their session
+
+    Parameters:
+        session (GameSession): The player's session
+        line (str): The command, without the line break
+
+    Returns:
+        The lines to answer with
+    """
+
+    words = line.split()
+    if not words:
+        return ["ERROR empty command"]
+
+    command = words[0].lower()
+    try:
+        if command == "bet":
+            if len(words) != 2 or not words[1].isdigit():
+                return ["ERROR usage: BET <tokens>"]
+
+            session.bet(int(words[1]))
+            session.deal()
+            lines = [f"BETS {session.tokens.tokens_bet}", hand_line("HAND", session.p_hand),
+                     f"UPCARD {card_code(session.d_hand.cards[0])}"]
+        elif command in ("hit", "h"):
+            session.hit()
+            lines = [hand_line("HAND", session.p_hand)]
+        elif command in ("stay", "s"):
+            session.stay()
+            lines = []
+        elif command == "again":
+            if not session.is_out_of_tokens:
+                return ["ERROR you still have tokens"]
+
+            session.reset()
+            return [f"TOKENS {session.tokens.total_tokens}"]
+        else:
+            return ["ERROR unknown command"]
+    except (RuntimeError, ValueError) as error:
+        return [f"ERROR {error}"]
+
+    # The player's turn is over, the dealer plays and the round is settled
+    if session.state in (DEALER_TURN, SETTLING):
+        before = session.tokens.total_tokens
+        outcome = session.finish()
+        lines += [hand_line("DEALER", session.d_hand),
+                  f"RESULT {OUTCOME_NAMES[outcome]} {session.tokens.total_tokens - before}",
+                  f"TOKENS {session.tokens.total_tokens}"]
+
+    return lines
+
+
+class GameServer:
+    """
+    This class accepts connections and plays a session for each one of them,
+    recycling the sessions of closed connections through a SessionPool.
+    """
+
+    def __init__(self, decks: int = 6, penetration: float = 0.75, starting_tokens: int = 1000,
+                 idle_timeout: Optional[float] = 300.0, history: Optional[HandHistoryWriter] = None,
+                 seed: Optional[int] = None, lazy: bool = False):
+        """
+        Initializes an instance of GameServer
+
+        Parameters:
+            decks (int): The amount of decks in every session's shoe
+            penetration (float): The share of the shoe dealt before the cut card
+            starting_tokens (int): The amount of tokens every player starts with
+            idle_timeout (float): Seconds without a command before a session
+            is closed, None to never close idle sessions
+            history (HandHistoryWriter): Where every session records its rounds,
+            None to not record them
+            seed (int): The seed every session's shoe derives its own from, None for random shoes
+            lazy (bool): Whether the shoes pick every card when it's dealt instead of shuffling
+        """
+
+        self._pool = SessionPool(decks, penetration, starting_tokens, history=history, seed=seed, lazy=lazy)
+        self._idle_timeout = idle_timeout
+        self._sessions = 0
+
+    @property
+    def sessions(self) -> int:
+        """
+        Gets how many sessions are connected
+
+        Returns:
+            The amount of open sessions
+        """
+
+        return self._sessions
+
+    async def serve_metrics(self, host: str = "127.0.0.1", port: int = 9100) -> asyncio.AbstractServer:
+        """
+        Starts recording metrics and serving them over HTTP, along with how many sessions are open
+
+        Parameters:
+            host (str): The address to listen on
+            port (int): The port to listen on, 0 to pick a free one
+
+        Returns:
+            The running metrics server
+        """
+
+        metrics.REGISTRY.register(metrics.Gauge("blackjack_sessions", "Sessions connected",
+                                                lambda: self._sessions))
+        metrics.REGISTRY.register(metrics.Gauge("blackjack_idle_sessions", "Sessions waiting in the pool",
+                                                lambda: self._pool.idle))
+        metrics.enable()
+        return await metrics.serve(host, port)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Plays a session over a connection until the player quits, goes idle or disconnects
+
+        Parameters:
+            reader (asyncio.StreamReader): The incoming side of the connection
+            writer (asyncio.StreamWriter): The outgoing side of the connection
+        """
+
+        session = self._pool.acquire()
+        self._sessions += 1
+        try:
+            writer.write(f"WELCOME\nTOKENS {session.tokens.total_tokens}\n".encode())
+            await writer.drain()
+
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), self._idle_timeout)
+                except asyncio.TimeoutError:
+                    writer.write(b"BYE idle\n")
+                    break
+                except (ValueError, asyncio.LimitOverrunError):
+                    # The line is longer than the reader's limit
+                    writer.write(b"ERROR line too long\nBYE\n")
+                    break
+
+                if not line:
+                    # The player disconnected
+                    break
+
+                text = line.decode(errors="replace").strip()
+                if text.lower() == "quit":
+                    writer.write(b"BYE\n")
+                    break
+
+                if metrics.enabled:
+                    start = time.perf_counter()
+                    lines = handle(session, text)
+                    words = text.split(maxsplit=1)
+                    action = ACTIONS.get(words[0].lower(), "other") if words else "other"
+                    metrics.ACTION_SECONDS.labels(action).observe(time.perf_counter() - start)
+                else:
+                    lines = handle(session, text)
+
+                writer.write(('\n'.join(lines) + '\n').encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._sessions -= 1
+            self._pool.release(session)
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765) -> asyncio.AbstractServer:
+        """
+        Starts accepting connections
+
+        Parameters:
+            host (str): The address to listen on
+            port (int): The port to listen on, 0 to pick a free one
+
+        Returns:
+            The running server
+        """
+
+        return await asyncio.start_server(self.handle_connection, host, port, limit=1024, backlog=4096)
+
+
+async def _run(args: argparse.Namespace):
+    """
+    Runs the server until it's interrupted
+
+    Parameters:
+        args (argparse.Namespace): The command line arguments
+    """
+
+    history = None
+    if args.history:
+        history = HandHistoryWriter(args.history, args.seed, args.decks, args.penetration, CARD_CODES)
+
+    game_server = GameServer(args.decks, args.penetration, args.tokens, args.timeout or None, history,
+                             args.seed, args.lazy_shuffle)
+    server = await game_server.serve(args.host, args.port)
+    print(f"Serving blackjack on {', '.join(str(sock.getsockname()) for sock in server.sockets)}")
+    if args.metrics_port is not None:
+        metrics_server = await game_server.serve_metrics(args.host, args.metrics_port)
+        print(f"Serving metrics on {', '.join(str(sock.getsockname()) for sock in metrics_server.sockets)}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if history is not None:
+            history.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Runs the blackjack server from the command line until it is interrupted
+
+    Parameters:
+        argv (List[str]): The command line arguments, None to use sys.argv
+    """
+
+    parser = argparse.ArgumentParser(description="Hosts blackjack sessions over TCP.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+    parser.add_argument("-d", "--decks", type=int, default=6, help="decks in every session's shoe")
+    parser.add_argument("--penetration", type=float, default=0.75, help="share of the shoe dealt before reshuffling")
+    parser.add_argument("-t", "--tokens", type=int, default=1000, help="tokens every player starts with")
+    parser.add_argument("--timeout", type=float, default=300.0,
+                        help="seconds before idle sessions are closed, 0 for never")
+    parser.add_argument("--history", default=None, metavar="DIR", help="record every round to a hand history in DIR")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="seed every session's shoe derives its own from")
+    parser.add_argument("--lazy-shuffle", action="store_true",
+                        help="pick every card as it's dealt instead of shuffling")
+    parser.add_argument("--metrics-port", type=int, default=None, metavar="PORT",
+                        help="serve Prometheus metrics at http://HOST:PORT/metrics")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(_run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,530 @@
+"""
+This module holds the GameSession class, which keeps the whole state of one game
+(shoe, hands and tokens) and plays it one step at a time, and the SessionPool
+that recycles sessions instead of building new ones.
+"""
+from random import Random
+from typing import List, Optional
+
+from blackjack import blackjack, metrics
+from blackjack.card import CARDS, Card
+from blackjack.currency import Currency
+from blackjack.deck import Deck
+from blackjack.engine import (BLACKJACK, BLACKJACK_DRAW, DEALER_BUST, DRAW, LOSE, OUTCOME_NAMES,
+                              PLAYER_BUST, WIN)
+from blackjack.hand import Hand
+from blackjack.history import HandHistoryWriter
+from blackjack.rules import DEFAULT_RULES, Rules
+
+# The steps of a round, in the order they happen
+BETTING = 0
+DEALING = 1
+PLAYER_TURN = 2
+DEALER_TURN = 3
+SETTLING = 4
+
+# Names for the steps, indexed by the step itself
+STATE_NAMES = ("betting",
+               "dealing",
+               "player_turn",
+               "dealer_turn",
+               "settling")
+
+# The smallest bet allowed, like blackjack.ask_bet
+MINIMUM_BET = 100
+
+
+# The outcome counter of every outcome, by its number
+_OUTCOME_COUNTERS = tuple(metrics.OUTCOMES.labels(name) for name in OUTCOME_NAMES)
+# The code of every card, cards are shared so this is quicker than asking each one
+_CODES = {card: card.code for card in CARDS}
+
+
+def settle_hand(p_hand: Hand, d_hand: Hand, tokens: Currency, rules: Rules = DEFAULT_RULES) -> int:
+    """
+    Pays or takes the bet of a hand that's done playing: wins cash in the bet, losses
+    cash it out, and draws and blackjacks on the first two cards cash in what the rules
+    pay for them
+
+    Parameters:
+        p_hand (Hand): The player's hand
+        d_hand (Hand): The dealer's hand, whatever they drew if the player didn't bust
+        tokens (Currency): The player's tokens, holding the bet
+        rules (Rules): The rules of the table
+
+    Returns:
+        The outcome of the hand
+    """
+
+    if p_hand.is_bust:
+        outcome = PLAYER_BUST
+    elif p_hand.is_blackjack:
+        outcome = BLACKJACK_DRAW if d_hand.is_blackjack else BLACKJACK
+    elif d_hand.is_bust:
+        outcome = DEALER_BUST
+    elif p_hand.total > d_hand.total:
+        outcome = WIN
+    elif p_hand.total < d_hand.total:
+        outcome = LOSE
+    else:
+        outcome = DRAW
+
+    if outcome in (DRAW, BLACKJACK_DRAW):
+        tokens.cash_in_payout(rules.tie_pays)
+    elif outcome in (PLAYER_BUST, LOSE):
+        tokens.cash_out()
+    elif outcome == BLACKJACK and len(p_hand.cards) == 2:
+        tokens.cash_in_payout(rules.blackjack_pays)
+    else:
+        tokens.cash_in()
+
+    if metrics.enabled:
+        metrics.ROUNDS_SETTLED.inc()
+        _OUTCOME_COUNTERS[outcome].inc()
+
+    return outcome
+
+
+class GameSession:
+    """
+    This class plays a game of blackjack for one player as a state machine:
+    bet, deal, player's turn, dealer's turn and settlement.
+    """
+
+    __slots__ = ("_deck", "_p_hand", "_d_hand", "_tokens", "_starting_tokens", "_state", "_outcome",
+                 "_history", "_rules", "_table", "_start")
+
+    def __init__(self, deck: Optional[Deck] = None, starting_tokens: int = 1000,
+                 history: Optional[HandHistoryWriter] = None, rules: Rules = DEFAULT_RULES,
+                 table: int = 0):
+        """
+        Initializes an instance of GameSession
+
+        Parameters:
+            deck (Deck): The deck or shoe to play with, a 6-deck shoe when None
+            starting_tokens (int): The amount of tokens the player starts with
+            history (HandHistoryWriter): Where to record every round, with cards
+            encoded as CARD_CODES, None to not record them
+            rules (Rules): The rules the dealer plays and the bets are settled by
+            table (int): The number of the table, recorded with every round
+        """
+
+        self._deck = deck if deck is not None else blackjack.init_shoe()
+        self._p_hand = Hand([])
+        self._d_hand = Hand([])
+        self._tokens = Currency(starting_tokens)
+        self._starting_tokens = starting_tokens
+        self._state = BETTING
+        self._outcome: Optional[int] = None
+        self._history = history
+        self._rules = rules
+        self._table = table
+        # The shoe the current round started in and how many cards had been dealt from it
+        self._start = (0, 0)
+
+    @property
+    def deck(self) -> Deck:
+        """
+        Gets the deck of cards
+
+        Returns:
+            The deck or shoe being played
+        """
+
+        return self._deck
+
+    @property
+    def p_hand(self) -> Hand:
+        """
+        Gets the player's hand
+
+        Returns:
+            The player's hand
+        """
+
+        return self._p_hand
+
+    @property
+    def d_hand(self) -> Hand:
+        """
+        Gets the dealer's hand
+
+        Returns:
+            The dealer's hand
+        """
+
+        return self._d_hand
+
+    @property
+    def tokens(self) -> Currency:
+        """
+        Gets the player's tokens
+
+        Returns:
+            The player's Currency
+        """
+
+        return self._tokens
+
+    @property
+    def state(self) -> int:
+        """
+        Gets the step the round is at
+
+        Returns:
+            One of BETTING, DEALING, PLAYER_TURN, DEALER_TURN and SETTLING
+        """
+
+        return self._state
+
+    @property
+    def outcome(self) -> Optional[int]:
+        """
+        Gets the outcome of the last settled round
+
+        Returns:
+            One of the outcomes in blackjack.engine, None before the first settlement
+        """
+
+        return self._outcome
+
+    @property
+    def rules(self) -> Rules:
+        """
+        Gets the rules of the table
+
+        Returns:
+            The rules the session plays by
+        """
+
+        return self._rules
+
+    @property
+    def table(self) -> int:
+        """
+        Gets the number of the table
+
+        Returns:
+            The number recorded with every round
+        """
+
+        return self._table
+
+    @property
+    def starting_tokens(self) -> int:
+        """
+        Gets the amount of tokens the player starts a game with
+
+        Returns:
+            The starting tokens
+        """
+
+        return self._starting_tokens
+
+    @property
+    def p_has_busted(self) -> bool:
+        """
+        Checks whether the player busted this round
+
+        Returns:
+            True if the player busted, false otherwise
+        """
+
+        return self._p_hand.is_bust
+
+    @property
+    def p_has_blackjack(self) -> bool:
+        """
+        Checks whether the player has a blackjack this round
+
+        Returns:
+            True if the player has a blackjack, false otherwise
+        """
+
+        return self._p_hand.is_blackjack
+
+    @property
+    def both_have_blackjack(self) -> bool:
+        """
+        Checks whether both the player and the dealer have a blackjack this round
+
+        Returns:
+            True if both have a blackjack, false otherwise
+        """
+
+        return self._p_hand.is_blackjack and self._d_hand.is_blackjack
+
+    @property
+    def is_out_of_tokens(self) -> bool:
+        """
+        Checks whether the player can't bet anymore
+
+        Returns:
+            True if the player has no tokens left, false otherwise
+        """
+
+        return self._tokens.total_tokens <= 0
+
+    def _expect(self, state: int):
+        """
+        Makes sure the round is at the given step
+
+        Parameters:
+            state (int): The step the round should be at
+        """
+
+        if self._state != state:
+            raise RuntimeError(f"Can't do that during {STATE_NAMES[self._state]}, "
+                               f"only during {STATE_NAMES[state]}")
+
+    def bet(self, amount: int):
+        """
+        Places the bet for the next round
+
+        Parameters:
+            amount (int): The amount of tokens to bet, going all in
+            when it's more than the player has
+        """
+
+        self._expect(BETTING)
+        if self.is_out_of_tokens:
+            raise ValueError("You're out of tokens!")
+        if amount < MINIMUM_BET:
+            raise ValueError(f"The minimum bet is {MINIMUM_BET}!")
+
+        self._tokens.bet(amount)
+        self._state = DEALING
+
+    def deal(self):
+        """
+        Deals two cards to the player and two to the dealer. A player with a blackjack
+        has nothing to decide, so the round goes straight to the dealer's turn.
+        """
+
+        self._expect(DEALING)
+        if self._history is not None:
+            # Where the round starts, after the reshuffle reset_turn does once the cut card is out
+            deck = self._deck
+            self._start = (deck.reshuffles + 1, 0) if deck.needs_reshuffle else (deck.reshuffles, deck.dealt)
+
+        blackjack.reset_turn([self._p_hand, self._d_hand], self._deck)
+        self._state = DEALER_TURN if self._p_hand.is_blackjack else PLAYER_TURN
+
+    def hit(self) -> Card:
+        """
+        Deals a card to the player. Reaching 21 ends the player's turn
+        and busting skips the dealer's turn.
+
+        Returns:
+            The card dealt
+        """
+
+        self._expect(PLAYER_TURN)
+        card = self._deck.deal_card()
+        self._p_hand.hit(card)
+
+        if self._p_hand.is_bust:
+            self._state = SETTLING
+        elif self._p_hand.is_blackjack:
+            self._state = DEALER_TURN
+
+        return card
+
+    def stay(self):
+        """
+        Ends the player's turn
+        """
+
+        self._expect(PLAYER_TURN)
+        self._state = DEALER_TURN
+
+    def play_dealer(self):
+        """
+        Deals cards to the dealer until they reach a score of 17 or higher,
+        or past a soft 17 when the rules say so
+        """
+
+        self._expect(DEALER_TURN)
+        blackjack.dealer_hit_or_stay(self._d_hand, self._deck, self._rules)
+        self._state = SETTLING
+
+    def settle(self) -> int:
+        """
+        Pays or takes the bet like settle_hand
+
+        Returns:
+            The outcome of the round
+        """
+
+        self._expect(SETTLING)
+        # Settling clears the bet
+        bet = self._tokens.tokens_bet
+        before = self._tokens.total_tokens
+        outcome = settle_hand(self._p_hand, self._d_hand, self._tokens, self._rules)
+
+        if self._history is not None:
+            self._record(outcome, bet, before)
+
+        self._outcome = outcome
+        self._state = BETTING
+        return outcome
+
+    def _record(self, outcome: int, bet: int, before: int):
+        """
+        Writes the settled round to the hand history
+
+        Parameters:
+            outcome (int): The outcome of the round
+            bet (int): The tokens bet
+            before (int): The tokens the player had before the settlement
+        """
+
+        p_cards = self._p_hand.cards
+        d_cards = self._d_hand.cards
+        # In the order they were dealt, like the engine records them
+        cards = bytes(map(_CODES.__getitem__, p_cards[:2] + d_cards[:2] + p_cards[2:] + d_cards[2:]))
+        shoe, position = self._start
+
+        after = self._tokens.total_tokens
+        self._history.write(shoe, position, outcome, bet, after - before, after,
+                            len(p_cards), cards, self._p_hand.total < 21, self._table)
+
+    def finish(self) -> int:
+        """
+        Plays the rest of the round once the player's turn is over
+
+        Returns:
+            The outcome of the round
+        """
+
+        if self._state == DEALER_TURN:
+            self.play_dealer()
+
+        return self.settle()
+
+    def restore(self, p_cards: List[Card], d_cards: List[Card], total_tokens: int, tokens_bet: int,
+                state: int, outcome: Optional[int]):
+        """
+        Puts the session back to a step of a round saved before, the shoe is restored on its own
+
+        Parameters:
+            p_cards (List[Card]): The cards in the player's hand
+            d_cards (List[Card]): The cards in the dealer's hand
+            total_tokens (int): The amount of tokens the player owns
+            tokens_bet (int): The amount of tokens bet on the round
+            state (int): The step the round is at
+            outcome (int): The outcome of the last settled round, None before the first one
+        """
+
+        if not BETTING <= state <= SETTLING:
+            raise ValueError(f"Unknown step {state}")
+
+        self._p_hand.clear()
+        for card in p_cards:
+            self._p_hand.hit(card)
+        self._d_hand.clear()
+        for card in d_cards:
+            self._d_hand.hit(card)
+
+        self._tokens.restore(total_tokens, tokens_bet)
+        self._state = state
+        self._outcome = outcome
+        # The cards on the table were the last ones dealt
+        self._start = (self._deck.reshuffles, max(self._deck.dealt - len(p_cards) - len(d_cards), 0))
+
+    def reset(self, starting_tokens: Optional[int] = None):
+        """
+        Puts the session back to the start of a game, reusing its shoe, hands and tokens
+
+        Parameters:
+            starting_tokens (int): The amount of tokens to start with,
+            the amount given when the session was created when None
+        """
+
+        if starting_tokens is not None:
+            self._starting_tokens = starting_tokens
+
+        self._tokens.reset(self._starting_tokens)
+        self._deck.reshuffle()
+        self._p_hand.clear()
+        self._d_hand.clear()
+        self._state = BETTING
+        self._outcome = None
+
+
+class SessionPool:
+    """
+    This class keeps finished sessions so they can be reset and handed out again
+    instead of building a new shoe, hands and tokens for every game.
+    """
+
+    def __init__(self, decks: int = 6, penetration: float = 0.75, starting_tokens: int = 1000,
+                 max_idle: int = 10_000, history: Optional[HandHistoryWriter] = None,
+                 rules: Rules = DEFAULT_RULES, seed: Optional[int] = None, lazy: bool = False):
+        """
+        Initializes an empty SessionPool
+
+        Parameters:
+            decks (int): The amount of decks in every session's shoe
+            penetration (float): The share of the shoe dealt before the cut card
+            starting_tokens (int): The amount of tokens every player starts with
+            max_idle (int): How many released sessions are kept at most
+            history (HandHistoryWriter): Where every session records its rounds
+            rules (Rules): The rules every session plays by
+            seed (int): The seed every table's shoe derives its own from,
+            so each table deals the same cards every time, None for random shoes
+            lazy (bool): Whether the shoes pick every card when it's dealt instead of shuffling
+        """
+
+        self._decks = decks
+        self._penetration = penetration
+        self._starting_tokens = starting_tokens
+        self._max_idle = max_idle
+        self._history = history
+        self._rules = rules
+        self._seed = seed
+        self._lazy = lazy
+        # How many sessions have been built, which numbers their tables
+        self._tables = 0
+        self._idle: List[GameSession] = []
+
+    @property
+    def idle(self) -> int:
+        """
+        Gets how many sessions are waiting to be reused
+
+        Returns:
+            The amount of idle sessions
+        """
+
+        return len(self._idle)
+
+    def acquire(self) -> GameSession:
+        """
+        Hands out a session at the start of a game
+
+        Returns:
+            A recycled session, or a new one when none are idle
+        """
+
+        if self._idle:
+            return self._idle.pop()
+
+        # Every table gets its own generator, seeded from the pool's seed and its number
+        table = self._tables
+        rng = Random(f"{self._seed}/{table}") if self._seed is not None else None
+        self._tables += 1
+        shoe = blackjack.init_shoe(self._decks, self._penetration, rng, self._lazy)
+        return GameSession(shoe, self._starting_tokens, self._history, self._rules, table)
+
+    def release(self, session: GameSession):
+        """
+        Takes back a session once its game is over
+
+        Parameters:
+            session (GameSession): The session to recycle
+        """
+
+        if len(self._idle) < self._max_idle:
+            session.reset(self._starting_tokens)
+            self._idle.append(session)
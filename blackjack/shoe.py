@@ -0,0 +1,302 @@
+"""
+This module holds the Shoe class.
+"""
+from random import Random
+from typing import List, Optional, Sequence, Tuple
+
+from blackjack import instrumentation, metrics
+from blackjack.card import CARDS, Card
+from blackjack.count import HI_LO, CountSystem
+from blackjack.deck import Deck
+
+
+class Shoe(Deck):
+    """
+    This class allows you to instantiate a shoe holding several decks of cards
+    with a cut card, which tells when the shoe has to be reshuffled.
+
+    All the cards stay in one preallocated list for the whole life of the shoe:
+    dealing moves a position towards the front of the list, so the cards that
+    were dealt are kept behind it and reshuffling only shuffles the list in place.
+    A lazy shoe doesn't even do that: reshuffling just moves the position back to the
+    end of the list, and every card is picked from the undealt ones as it's dealt.
+    Given the same random.Random it deals the same cards as an eager shoe until the
+    cut card comes out: the eager shoe drew a number for every card when it shuffled,
+    the lazy one only for the cards it dealt, so their next shoes differ.
+    """
+
+    def __init__(self, decks: int = 6, penetration: float = 0.75,
+                 count_systems: Sequence[CountSystem] = (HI_LO,), rng: Optional[Random] = None,
+                 lazy: bool = False):
+        """
+        Initializes an instance of a Shoe object.
+
+        Parameters:
+            decks (int): The amount of decks in the shoe
+            penetration (float): The share of the shoe dealt before the cut card
+            count_systems (Sequence[CountSystem]): The counting systems to keep track of
+            rng (Random): The source of the shuffles, a random.Random or a NumPy Generator,
+            the random module when None
+            lazy (bool): Whether to pick every card when it's dealt instead of shuffling
+        """
+
+        if decks < 1:
+            raise ValueError("A shoe needs at least one deck")
+        if not 0 < penetration <= 1:
+            raise ValueError("The penetration must be more than 0 and at most 1")
+
+        self._decks = decks
+        self._penetration = penetration
+
+        # Cards are dealt from the end of the list, the ones before
+        # this position haven't been dealt yet
+        self._remaining = 0
+        # How many of the dealt cards have been discarded
+        self._discarded = 0
+        # How many cards were still in play when the discards were last shuffled back in,
+        # they were dealt before that shuffle
+        self._carried = 0
+        # The shoe is due for a reshuffle once this few cards are left
+        self._cut_position = int(decks * 52 * (1 - penetration))
+
+        super().__init__(count_systems, rng, lazy)
+
+    @property
+    def decks(self) -> int:
+        """
+        Gets the amount of decks in the shoe.
+
+        Returns:
+            The amount of decks.
+        """
+
+        return self._decks
+
+    @property
+    def penetration(self) -> float:
+        """
+        Gets the share of the shoe dealt before the cut card comes out.
+
+        Returns:
+            The penetration of the shoe.
+        """
+
+        return self._penetration
+
+    @property
+    def cards(self) -> List[Card]:
+        """
+        Gets the cards that haven't been dealt yet.
+
+        Returns:
+            A copy of the undealt cards, the last one is dealt first.
+        """
+
+        return self._cards[:self._remaining]
+
+    @property
+    def cards_left(self) -> int:
+        """
+        Gets how many cards haven't been dealt yet.
+
+        Returns:
+            The amount of undealt cards.
+        """
+
+        return self._remaining
+
+    @property
+    def dealt(self) -> int:
+        """
+        Gets how many cards were dealt since the last reshuffle, or since the
+        discards were last shuffled back in.
+
+        Returns:
+            The amount of dealt cards.
+        """
+
+        return len(self._cards) - self._remaining - self._carried
+
+    @property
+    def discarded(self) -> int:
+        """
+        Gets how many of the dealt cards have been discarded.
+
+        Returns:
+            The amount of cards in the discard tray.
+        """
+
+        return self._discarded
+
+    @property
+    def in_play(self) -> int:
+        """
+        Gets how many of the dealt cards are still on the table.
+
+        Returns:
+            The amount of cards in play.
+        """
+
+        return len(self._cards) - self._remaining - self._discarded
+
+    @property
+    def needs_reshuffle(self) -> bool:
+        """
+        Checks whether the cut card has come out.
+
+        Returns:
+            True if the shoe has to be reshuffled before the next round, false otherwise.
+        """
+
+        return self._remaining <= self._cut_position
+
+    def get_state(self) -> Tuple[List[Card], int, int]:
+        """
+        Gets where every card is, to put the shoe back as it is with set_state.
+
+        Returns:
+            All the cards in the order they're kept, which must not be changed, how
+            many of them haven't been dealt yet and how many were discarded.
+        """
+
+        return self._cards, self._remaining, self._discarded
+
+    def set_state(self, cards: Sequence[Card], remaining: int, discarded: int,
+                  rank_counts: Sequence[int], running_counts: Sequence[int],
+                  reshuffles: int = 0, dealt: Optional[int] = None):
+        """
+        Puts the shoe back to a state given by get_state, with the counts it had.
+
+        Parameters:
+            cards (Sequence[Card]): All the cards in the order they're kept
+            remaining (int): How many of the cards haven't been dealt yet
+            discarded (int): How many of the dealt cards were discarded
+            rank_counts (Sequence[int]): The undealt cards of every rank, like rank_counts
+            running_counts (Sequence[int]): The running count of every counting system
+            reshuffles (int): How many times the cards were reshuffled, like reshuffles
+            dealt (int): How many cards were dealt since the last reshuffle, like dealt,
+            None when every card after the undealt ones was
+        """
+
+        if len(cards) != self._decks * 52:
+            raise ValueError(f"A shoe of {self._decks} decks holds {self._decks * 52} cards")
+        if remaining < 0 or discarded < 0 or remaining + discarded > len(cards):
+            raise ValueError("The undealt and discarded cards don't fit in the shoe")
+
+        # The cards that were in play when the discards were shuffled back in
+        carried = 0 if dealt is None else len(cards) - remaining - dealt
+        if not 0 <= carried <= len(cards) - remaining:
+            raise ValueError("The dealt cards don't fit in the shoe")
+
+        self._cards[:] = cards
+        self._remaining = remaining
+        self._discarded = discarded
+        self._carried = carried
+        self._reshuffles = reshuffles
+        self._set_counts(rank_counts, running_counts)
+
+    def init_deck(self):
+        """
+        Fills the shoe with all the cards of its decks in order.
+        """
+
+        # Slice assignment reuses the list once it has reached its full size
+        self._cards[:] = CARDS * self._decks
+        self._remaining = len(self._cards)
+        self._discarded = 0
+        self._carried = 0
+        self._reset_counts()
+
+    def shuffle(self):
+        """
+        Puts every card back in the shoe and shuffles it in place,
+        a lazy shoe only puts the cards back.
+        """
+
+        if not self._lazy:
+            self._shuffle(self._cards)
+        self._remaining = len(self._cards)
+        self._discarded = 0
+        self._carried = 0
+        self._reset_counts()
+
+    def reshuffle(self):
+        """
+        Reshuffles the shoe once the cut card has come out.
+        """
+
+        if instrumentation.enabled:
+            instrumentation.count("reshuffles")
+        if metrics.enabled:
+            metrics.RESHUFFLES.inc()
+
+        self._reshuffles += 1
+        self.shuffle()
+
+    def discard(self, cards: Sequence[Card]):
+        """
+        Moves cards that are no longer in play to the discard tray.
+
+        Parameters:
+            cards (Sequence[Card]): The cards being discarded
+        """
+
+        self._discarded += len(cards)
+
+    def _shuffle_discards(self):
+        """
+        Shuffles the discard tray back into the shoe, leaving the cards in play aside.
+        """
+
+        if instrumentation.enabled:
+            instrumentation.count("reshuffles")
+        if metrics.enabled:
+            metrics.RESHUFFLES.inc()
+
+        self._reshuffles += 1
+        # The cards in play are the most recently dealt ones, which sit right
+        # after the undealt cards, so they're moved to the end of the list
+        in_play = self.in_play
+        discards = self._cards[in_play:]
+        if not self._lazy:
+            self._shuffle(discards)
+        self._cards[:] = discards + self._cards[:in_play]
+        self._remaining = len(discards)
+        self._discarded = 0
+        self._carried = in_play
+
+        # Only the cards in play have been seen since the discards came back
+        self._reset_counts()
+        for card in self._cards[self._remaining:]:
+            self._count(card)
+
+    def deal_card(self) -> Optional[Card]:
+        """
+        Deals the next card in the shoe. When the shoe runs out in the middle of a round
+        the discards are shuffled back in, so a hit is never lost.
+
+        Returns:
+             The dealt card or None if every card is in play.
+        """
+
+        if self._remaining <= 0:
+            if self._discarded <= 0:
+                return None
+
+            self._shuffle_discards()
+
+        self._remaining -= 1
+        cards = self._cards
+        remaining = self._remaining
+        if self._lazy and remaining:
+            # A random undealt card swaps places with the next one to deal
+            index = self._randbelow(remaining + 1)
+            cards[index], cards[remaining] = cards[remaining], cards[index]
+
+        card = cards[remaining]
+        self._count(card)
+
+        if instrumentation.enabled:
+            instrumentation.count("cards_dealt")
+
+        return card
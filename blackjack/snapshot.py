@@ -0,0 +1,331 @@
+"""
+This module saves the whole state of game sessions as compact binary snapshots and
+restores them, so a game can go on in another process after the one playing it died:
+where every card of the shoe is, the counts, both hands, the tokens, the step the
+round is at and the state of the shoe's random generator.
+
+A snapshot is a fixed-size header (SNAPSHOT) followed by the names of the counting
+systems, the counts, one byte for every card (its code, see blackjack.card) and the
+state of the shoe's own generator: the words of a random.Random, or the state of a
+NumPy Generator's bit generator as JSON. A 6-deck shoe with a random.Random takes
+about 3 KB, most of it the generator's state. A shoe dealing from the random module
+itself goes on doing so once restored, as that state belongs to the whole process,
+and dump raises ValueError for any other generator rather than lose its state.
+
+A checkpoint holds the snapshots of many sessions, each one under a number, and is
+written with one write to a temporary file that then replaces the last checkpoint,
+so a crash in the middle of writing it never leaves a broken one behind.
+"""
+import argparse
+import json
+import os
+import struct
+import time
+from fractions import Fraction
+from random import Random
+from typing import Dict, List, Mapping, Optional
+
+from blackjack.card import CARDS
+from blackjack.count import COUNT_SYSTEMS
+from blackjack.deck import Deck
+from blackjack.history import HandHistoryWriter
+from blackjack.rules import Rules
+from blackjack.session import PLAYER_TURN, GameSession, SessionPool
+from blackjack.shoe import Shoe
+
+# Identifies the snapshots and checkpoints and the version of their layout
+MAGIC = b"BJSS"
+CHECKPOINT_MAGIC = b"BJCP"
+VERSION = 2
+
+# Bits of the flags field of a snapshot
+SHOE = 1        # The cards are in a Shoe, otherwise a single Deck
+LAZY = 2        # The shoe picks every card as it's dealt
+RNG = 4         # The state of the shoe's random.Random follows the cards
+GAUSS = 8       # The generator has a normal variate saved for its next call
+H17 = 16        # The dealer hits a soft 17
+NUMPY = 32      # The state of the shoe's NumPy Generator follows the cards
+
+# Stored instead of an outcome before the first round is settled
+NO_OUTCOME = 255
+
+# Magic, version, flags, step, outcome, decks, length of the counting system names,
+# penetration, tokens owned, tokens bet, starting tokens, cards kept, undealt cards,
+# discarded cards, player's card count, dealer's card count, blackjack payout and
+# tie payout as numerator and denominator, the generator's saved normal variate,
+# reshuffles, cards dealt since the last one and the session's table
+SNAPSHOT = struct.Struct("<4sHBBBBBdqqqHHHBBIIIIdIHI")
+# The counts of every rank
+RANK_COUNTS = struct.Struct("<13H")
+# The state of a random.Random: 624 words and the position in them
+RNG_STATE = struct.Struct("<625I")
+# The length of the JSON state of a NumPy bit generator
+NUMPY_STATE = struct.Struct("<I")
+# Magic, version and amount of sessions of a checkpoint
+CHECKPOINT = struct.Struct("<4sHI")
+# The number and the length of every snapshot in a checkpoint
+ENTRY = struct.Struct("<QI")
+
+# The version of the state random.Random.getstate() gives
+_RNG_VERSION = Random().getstate()[0]
+# The code of every card, cards are shared so this is quicker than asking each one
+_CODES = {card: card.code for card in CARDS}
+
+
+def _listed(array) -> list:
+    """
+    Turns the arrays of a NumPy bit generator's state into lists JSON can hold
+
+    Parameters:
+        array (numpy.ndarray): An array of the state
+
+    Returns:
+        The numbers of the array
+    """
+
+    return array.tolist()
+
+
+def dump(session: GameSession) -> bytes:
+    """
+    Takes a snapshot of a session
+
+    Parameters:
+        session (GameSession): The session to save
+
+    Returns:
+        The snapshot
+    """
+
+    deck = session.deck
+    cards, remaining, discarded = deck.get_state()
+    p_cards = session.p_hand.cards
+    d_cards = session.d_hand.cards
+    tokens = session.tokens
+    rules = session.rules
+    systems = deck.count_systems
+    names = ",".join(system.name for system in systems).encode()
+
+    rng = deck.rng
+    flags = (SHOE if isinstance(deck, Shoe) else 0) | (LAZY if deck.lazy else 0) | (H17 if rules.hits_soft_17 else 0)
+    gauss = 0.0
+    rng_state = b""
+    # Subclasses like random.SystemRandom may not have the same state, or any
+    if type(rng) is Random:
+        _, words, gauss_next = rng.getstate()
+        rng_state = RNG_STATE.pack(*words)
+        flags |= RNG
+        if gauss_next is not None:
+            flags |= GAUSS
+            gauss = gauss_next
+    elif rng is not None:
+        if not hasattr(rng, "bit_generator"):
+            raise ValueError(f"Can't save the state of a {type(rng).__name__}")
+
+        rng_state = json.dumps(rng.bit_generator.state, default=_listed).encode()
+        rng_state = NUMPY_STATE.pack(len(rng_state)) + rng_state
+        flags |= NUMPY
+
+    outcome = session.outcome
+    header = SNAPSHOT.pack(MAGIC, VERSION, flags, session.state, NO_OUTCOME if outcome is None else outcome,
+                           deck.decks, len(names), deck.penetration if flags & SHOE else 0.0,
+                           tokens.total_tokens, tokens.tokens_bet, session.starting_tokens,
+                           len(cards), remaining, discarded, len(p_cards), len(d_cards),
+                           rules.blackjack_pays.numerator, rules.blackjack_pays.denominator,
+                           rules.tie_pays.numerator, rules.tie_pays.denominator, gauss,
+                           deck.reshuffles, deck.dealt, session.table)
+
+    return b"".join((header, names, RANK_COUNTS.pack(*deck.rank_counts),
+                     struct.pack(f"<{len(systems)}i", *deck.running_counts.values()),
+                     bytes(map(_CODES.__getitem__, cards)), bytes(map(_CODES.__getitem__, p_cards)),
+                     bytes(map(_CODES.__getitem__, d_cards)), rng_state))
+
+
+def load(data: bytes, history: Optional[HandHistoryWriter] = None) -> GameSession:
+    """
+    Restores a session from a snapshot
+
+    Parameters:
+        data (bytes): The snapshot, from dump
+        history (HandHistoryWriter): Where the restored session records its rounds,
+        None to not record them
+
+    Returns:
+        A new session in the same state as the saved one
+    """
+
+    view = memoryview(data)
+    (magic, version, flags, state, outcome, decks, names_length, penetration, total_tokens, tokens_bet,
+     starting_tokens, card_count, remaining, discarded, p_count, d_count,
+     blackjack_numerator, blackjack_denominator, tie_numerator, tie_denominator, gauss,
+     reshuffles, dealt, table) = SNAPSHOT.unpack_from(view)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a game snapshot, or one of another version")
+
+    offset = SNAPSHOT.size
+    names = bytes(view[offset:offset + names_length]).decode().split(",")
+    offset += names_length
+    try:
+        systems = tuple(COUNT_SYSTEMS[name] for name in names)
+    except KeyError as error:
+        raise ValueError(f"Unknown counting system {error}") from None
+
+    rank_counts = RANK_COUNTS.unpack_from(view, offset)
+    offset += RANK_COUNTS.size
+    running_counts = struct.unpack_from(f"<{len(systems)}i", view, offset)
+    offset += 4 * len(systems)
+
+    # The shared cards are in the order of their codes
+    cards = [CARDS[code] for code in view[offset:offset + card_count]]
+    offset += card_count
+    p_cards = [CARDS[code] for code in view[offset:offset + p_count]]
+    offset += p_count
+    d_cards = [CARDS[code] for code in view[offset:offset + d_count]]
+    offset += d_count
+
+    rng = None
+    if flags & RNG:
+        rng = Random(0)
+        rng.setstate((_RNG_VERSION, RNG_STATE.unpack_from(view, offset), gauss if flags & GAUSS else None))
+    elif flags & NUMPY:
+        # NumPy is only needed by shoes that were dealing with it
+        import numpy as np
+
+        (length,) = NUMPY_STATE.unpack_from(view, offset)
+        offset += NUMPY_STATE.size
+        rng_state = json.loads(bytes(view[offset:offset + length]))
+        bit_generator = getattr(np.random, rng_state.get("bit_generator", ""), None)
+        if not (isinstance(bit_generator, type) and issubclass(bit_generator, np.random.BitGenerator)):
+            raise ValueError(f"Unknown bit generator {rng_state.get('bit_generator')}")
+
+        rng = np.random.Generator(bit_generator())
+        rng.bit_generator.state = rng_state
+
+    lazy = bool(flags & LAZY)
+    deck = Shoe(decks, penetration, systems, rng, lazy) if flags & SHOE else Deck(systems, rng, lazy)
+    deck.set_state(cards, remaining, discarded, rank_counts, running_counts, reshuffles, dealt)
+
+    rules = Rules(bool(flags & H17), Fraction(blackjack_numerator, blackjack_denominator),
+                  Fraction(tie_numerator, tie_denominator))
+    session = GameSession(deck, starting_tokens, history, rules, table)
+    session.restore(p_cards, d_cards, total_tokens, tokens_bet, state, None if outcome == NO_OUTCOME else outcome)
+    return session
+
+
+def write_checkpoint(path: str, sessions: Mapping[int, GameSession], sync: bool = True) -> int:
+    """
+    Saves many sessions to one file with a single write, replacing the file only once it's complete
+
+    Parameters:
+        path (str): Where to write the checkpoint
+        sessions (Mapping[int, GameSession]): The sessions to save, by a number of the caller's choosing
+        sync (bool): Whether to wait for the checkpoint to reach the disk
+
+    Returns:
+        The size of the checkpoint in bytes
+    """
+
+    parts = [CHECKPOINT.pack(CHECKPOINT_MAGIC, VERSION, len(sessions))]
+    for number, session in sessions.items():
+        snapshot = dump(session)
+        parts.append(ENTRY.pack(number, len(snapshot)))
+        parts.append(snapshot)
+    data = b"".join(parts)
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(data)
+        if sync:
+            file.flush()
+            os.fsync(file.fileno())
+    os.replace(temporary, path)
+    return len(data)
+
+
+def read_checkpoint(path: str, history: Optional[HandHistoryWriter] = None) -> Dict[int, GameSession]:
+    """
+    Restores every session saved to a checkpoint
+
+    Parameters:
+        path (str): Where the checkpoint was written
+        history (HandHistoryWriter): Where the restored sessions record their rounds,
+        None to not record them
+
+    Returns:
+        The restored sessions, by the numbers they were saved under
+    """
+
+    with open(path, "rb") as file:
+        data = file.read()
+
+    view = memoryview(data)
+    magic, version, count = CHECKPOINT.unpack_from(view)
+    if magic != CHECKPOINT_MAGIC or version != VERSION:
+        raise ValueError("Not a checkpoint, or one of another version")
+
+    sessions = {}
+    offset = CHECKPOINT.size
+    for _ in range(count):
+        number, length = ENTRY.unpack_from(view, offset)
+        offset += ENTRY.size
+        sessions[number] = load(view[offset:offset + length], history)
+        offset += length
+
+    return sessions
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Runs the snapshot and checkpoint timings from the command line and prints them
+
+    Parameters:
+        argv (List[str]): The command line arguments, None to use sys.argv
+    """
+
+    parser = argparse.ArgumentParser(description="Times snapshots and checkpoints of game sessions.")
+    parser.add_argument("-n", "--sessions", type=int, default=5000, help="sessions to save")
+    parser.add_argument("-d", "--decks", type=int, default=6, help="decks in every session's shoe")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed every session's shoe derives its own from")
+    parser.add_argument("-o", "--output", default="checkpoint.bjc", help="where to write the checkpoint")
+    parser.add_argument("--no-sync", action="store_true", help="don't wait for the checkpoint to reach the disk")
+    args = parser.parse_args(argv)
+
+    # Every session plays a round and is left in the middle of the next one
+    pool = SessionPool(args.decks, seed=args.seed)
+    sessions = {}
+    for number in range(args.sessions):
+        session = pool.acquire()
+        session.bet(100)
+        session.deal()
+        if session.state == PLAYER_TURN:
+            session.stay()
+        session.finish()
+        session.bet(100)
+        session.deal()
+        sessions[number] = session
+
+    start = time.perf_counter()
+    snapshots = [dump(session) for session in sessions.values()]
+    dumped = time.perf_counter() - start
+    print(f"dump: {args.sessions / dumped:,.0f} sessions/s, "
+          f"{sum(map(len, snapshots)) / len(snapshots):,.0f} bytes each")
+
+    start = time.perf_counter()
+    for snapshot in snapshots:
+        load(snapshot)
+    loaded = time.perf_counter() - start
+    print(f"load: {args.sessions / loaded:,.0f} sessions/s")
+
+    start = time.perf_counter()
+    size = write_checkpoint(args.output, sessions, not args.no_sync)
+    written = time.perf_counter() - start
+    print(f"checkpoint: {args.sessions} sessions, {size:,} bytes in {written:.3f} s")
+
+    start = time.perf_counter()
+    restored = read_checkpoint(args.output)
+    read = time.perf_counter() - start
+    print(f"restore: {len(restored)} sessions in {read:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""
+This module aggregates simulation results as they stream in, so long runs can be
+summarized without keeping their rounds in memory.
+
+RoundStats keeps a constant amount of state however many rounds it's given: the
+running mean and variance of the return of every round (Welford's method), the
+count of every outcome, dealer busts by upcard and the drawdown of the player's
+tokens, which starts over whenever they buy in again. Stats of separate shards can be merged into one.
+"""
+import argparse
+import math
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from blackjack.count import CountSystem
+from blackjack.currency import Currency
+from blackjack.engine import (BLACKJACK, BLACKJACK_DRAW, DEALER_BUST, DRAW, LOSE, OUTCOME_NAMES,
+                              PLAYER_BUST, POLICIES, WIN, Engine, Policy, dealer_policy)
+from blackjack.parallel import Task, run_shards, shard_tasks
+from blackjack.rules import DEFAULT_RULES, Rules
+
+# A round as streamed to RoundStats: outcome, tokens bet, tokens won (negative when lost),
+# tokens after the round, dealer's upcard (aces are 1) and dealer's total (0 when the
+# dealer didn't play)
+Round = Tuple[int, int, int, int, int, int]
+
+# The outcomes that make up every kind of result
+RESULTS = {"win": (WIN, DEALER_BUST),
+           "loss": (LOSE, PLAYER_BUST),
+           "push": (DRAW, BLACKJACK_DRAW),
+           "blackjack": (BLACKJACK,)}
+
+
+def play_rounds(n_rounds: int, seed: Optional[int] = None, policy: Policy = dealer_policy,
+                bet: int = 100, starting_tokens: int = 1000, decks: int = 1,
+                penetration: float = 0.75, count_system: Optional[CountSystem] = None,
+                rules: Rules = DEFAULT_RULES) -> Iterator[Round]:
+    """
+    Plays rounds with the engine and streams them one at a time, with
+    the same bets and rebuys as blackjack.engine.simulate (see Engine.play)
+
+    Parameters:
+        n_rounds (int): The amount of rounds to play
+        seed (int): The seed for the shuffles, None for a random one
+        policy (Policy): Decides whether the player hits or stays
+        bet (int): The amount of tokens bet every round
+        starting_tokens (int): The amount of tokens the player starts with
+        decks (int): The amount of decks in the shoe
+        penetration (float): The share of the shoe dealt before it's reshuffled
+        count_system (CountSystem): The counting system read by the policy's bets
+        rules (Rules): The rules the dealer plays and the bets are settled by
+
+    Returns:
+        An iterator over the rounds played
+    """
+
+    engine = Engine(Currency(starting_tokens), policy, seed, decks, penetration, count_system, rules)
+
+    for outcome, placed, net, after in engine.play(n_rounds, bet, starting_tokens):
+        yield outcome, placed, net, after, engine.upcard, engine.dealer_total
+
+
+class RoundStats:
+    """
+    This class keeps statistics of a stream of rounds in constant memory.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty instance of RoundStats
+        """
+
+        self.rounds = 0
+        self.wagered = 0
+        self.net = 0
+        self.outcomes = [0] * len(OUTCOME_NAMES)
+
+        # Running mean and sum of squared differences of the return of every round,
+        # the tokens won for every token bet
+        self._mean = 0.0
+        self._m2 = 0.0
+
+        # Rounds the dealer played and the ones they busted, by upcard
+        self.dealer_rounds = [0] * 11
+        self.dealer_busts = [0] * 11
+
+        # The most tokens the player has had since they last bought in,
+        # and how far and for how long they have been below it
+        self._peak: Optional[int] = None
+        self._tokens = 0
+        self._below = 0
+        self.max_drawdown = 0
+        self.longest_drawdown = 0
+
+    @property
+    def mean(self) -> float:
+        """
+        Gets the mean return of a round
+
+        Returns:
+            The tokens won for every token bet, negative when losing
+        """
+
+        return self._mean
+
+    @property
+    def variance(self) -> float:
+        """
+        Gets the sample variance of the return of a round
+
+        Returns:
+            The variance, 0 with fewer than two rounds
+        """
+
+        return self._m2 / (self.rounds - 1) if self.rounds > 1 else 0.0
+
+    @property
+    def house_edge(self) -> float:
+        """
+        Gets the share of every token bet that the house keeps
+
+        Returns:
+            The house edge, negative when the player is winning
+        """
+
+        return -self.net / self.wagered if self.wagered else 0.0
+
+    @property
+    def drawdown(self) -> int:
+        """
+        Gets how far the player's tokens are below the most they have had
+
+        Returns:
+            The current drawdown in tokens
+        """
+
+        return self._peak - self._tokens if self._peak is not None else 0
+
+    def confidence_interval(self, z: float = 1.96) -> Tuple[float, float]:
+        """
+        Gets a confidence interval of the mean return of a round
+
+        Parameters:
+            z (float): How many standard errors the interval spans on each
+            side, 1.96 for 95% confidence
+
+        Returns:
+            The lower and upper bounds of the interval
+        """
+
+        if self.rounds < 2:
+            return -math.inf, math.inf
+
+        margin = z * math.sqrt(self.variance / self.rounds)
+        return self._mean - margin, self._mean + margin
+
+    def frequencies(self) -> Dict[str, float]:
+        """
+        Gets how often the player won, lost, pushed and had a blackjack
+
+        Returns:
+            The share of rounds of every kind of result
+        """
+
+        rounds = self.rounds or 1
+        return {name: sum(self.outcomes[outcome] for outcome in outcomes) / rounds
+                for name, outcomes in RESULTS.items()}
+
+    def bust_rates(self) -> Dict[int, float]:
+        """
+        Gets how often the dealer busted for every upcard
+
+        Returns:
+            The share of the rounds the dealer played that they busted, by upcard
+        """
+
+        return {upcard: self.dealer_busts[upcard] / self.dealer_rounds[upcard]
+                for upcard in range(1, 11) if self.dealer_rounds[upcard]}
+
+    def add(self, outcome: int, bet: int, net: int, tokens: int, upcard: int, dealer_total: int):
+        """
+        Adds a round to the statistics
+
+        Parameters:
+            outcome (int): The outcome of the round
+            bet (int): The tokens bet
+            net (int): The tokens won, negative when lost
+            tokens (int): The tokens the player had after the round
+            upcard (int): The value of the dealer's upcard, aces are 1
+            dealer_total (int): The dealer's total, 0 when the dealer didn't play
+        """
+
+        self.rounds += 1
+        self.wagered += bet
+        self.net += net
+        self.outcomes[outcome] += 1
+
+        value = net / bet if bet else 0.0
+        delta = value - self._mean
+        self._mean += delta / self.rounds
+        self._m2 += delta * (value - self._mean)
+
+        if dealer_total:
+            self.dealer_rounds[upcard] += 1
+            if dealer_total > 21:
+                self.dealer_busts[upcard] += 1
+
+        before = tokens - net
+        if self._peak is None or before != self._tokens:
+            # The first peak is what the player had before the first round, and a rebuy
+            # starts a new bankroll whose drawdowns don't carry over from the old one
+            self._peak = before
+            self._below = 0
+
+        self._tokens = tokens
+        if tokens >= self._peak:
+            self._peak = tokens
+            self._below = 0
+        else:
+            self._below += 1
+            if self._peak - tokens > self.max_drawdown:
+                self.max_drawdown = self._peak - tokens
+            if self._below > self.longest_drawdown:
+                self.longest_drawdown = self._below
+
+    def consume(self, rounds: Iterable[Round], every: int = 0,
+                progress: Optional[Callable[[Dict[str, object]], None]] = None) -> "RoundStats":
+        """
+        Adds every round of a stream to the statistics
+
+        Parameters:
+            rounds (Iterable[Round]): The rounds, e.g. from play_rounds
+            every (int): How many rounds go by between progress snapshots, 0 for none
+            progress (Callable): Receives a snapshot every so many rounds
+
+        Returns:
+            The statistics themselves
+        """
+
+        add = self.add
+        for played in rounds:
+            add(*played)
+            if every and progress is not None and self.rounds % every == 0:
+                progress(self.snapshot())
+
+        return self
+
+    def merge(self, other: "RoundStats"):
+        """
+        Adds the statistics of another shard to these ones. Shards play separate
+        bankrolls, so the merged drawdowns are the worst of either shard's.
+
+        Parameters:
+            other (RoundStats): The statistics to add
+        """
+
+        rounds = self.rounds + other.rounds
+        if other.rounds:
+            # Chan's method for combining running means and variances
+            delta = other._mean - self._mean
+            self._m2 += other._m2 + delta * delta * self.rounds * other.rounds / rounds
+            self._mean += delta * other.rounds / rounds
+
+        self.rounds = rounds
+        self.wagered += other.wagered
+        self.net += other.net
+        for index, count in enumerate(other.outcomes):
+            self.outcomes[index] += count
+        for upcard in range(11):
+            self.dealer_rounds[upcard] += other.dealer_rounds[upcard]
+            self.dealer_busts[upcard] += other.dealer_busts[upcard]
+
+        self.max_drawdown = max(self.max_drawdown, other.max_drawdown)
+        self.longest_drawdown = max(self.longest_drawdown, other.longest_drawdown)
+
+    def snapshot(self) -> Dict[str, object]:
+        """
+        Copies the current statistics
+
+        Returns:
+            The statistics, by name
+        """
+
+        low, high = self.confidence_interval()
+        return {"rounds": self.rounds,
+                "mean": self._mean,
+                "stdev": math.sqrt(self.variance),
+                "ci_low": low,
+                "ci_high": high,
+                "house_edge": self.house_edge,
+                "frequencies": self.frequencies(),
+                "bust_rates": self.bust_rates(),
+                "max_drawdown": self.max_drawdown,
+                "longest_drawdown": self.longest_drawdown}
+
+    def __str__(self) -> str:
+        """
+        Allows to print out the statistics
+
+        Returns:
+            A string with every statistic
+        """
+
+        low, high = self.confidence_interval()
+        lines = [f"Rounds: {self.rounds}",
+                 f"Mean return: {self._mean:+.5f} (95% CI {low:+.5f} to {high:+.5f})",
+                 f"Standard deviation: {math.sqrt(self.variance):.5f}",
+                 f"House edge: {self.house_edge:.4%}"]
+        lines += [f"  {name}: {share:.4%}" for name, share in self.frequencies().items()]
+        lines.append("Dealer bust rate by upcard:")
+        lines += [f"  {'A' if upcard == 1 else upcard}: {rate:.4%}" for upcard, rate in self.bust_rates().items()]
+        lines.append(f"Max drawdown: {self.max_drawdown} tokens")
+        lines.append(f"Longest drawdown: {self.longest_drawdown} rounds")
+        return '\n'.join(lines)
+
+
+def play_shard(task: Task) -> RoundStats:
+    """
+    Plays the rounds of one shard into its own statistics, this runs in a worker process
+
+    Parameters:
+        task (Task): The shard, from parallel.shard_tasks
+
+    Returns:
+        The statistics of the shard
+    """
+
+    return RoundStats().consume(play_rounds(*task))
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Streams a simulation into RoundStats, printing progress while it runs
+
+    Parameters:
+        argv (List[str]): The command line arguments, None to use sys.argv
+    """
+
+    parser = argparse.ArgumentParser(description="Streams simulated rounds into running statistics.")
+    parser.add_argument("-n", "--rounds", type=int, default=1_000_000, help="amount of rounds to play")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="seed for the shuffles")
+    parser.add_argument("-b", "--bet", type=int, default=100, help="tokens bet every round")
+    parser.add_argument("-t", "--tokens", type=int, default=1000, help="tokens the player starts with")
+    parser.add_argument("-d", "--decks", type=int, default=1, help="decks in the shoe")
+    parser.add_argument("--penetration", type=float, default=0.75, help="share of the shoe dealt before reshuffling")
+    parser.add_argument("-p", "--policy", choices=sorted(POLICIES), default="dealer",
+                        help="how the player decides to hit or stay")
+    parser.add_argument("--every", type=int, default=100_000, help="rounds between progress lines, 0 for none")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="split the rounds into shards of --every rounds played by this many "
+                             "processes, merging their statistics as they finish")
+    args = parser.parse_args(argv)
+
+    policy = POLICIES[args.policy]
+    start = time.perf_counter()
+
+    def progress(snapshot: Dict[str, object]):
+        print(f"{snapshot['rounds']:>12} rounds  mean {snapshot['mean']:+.5f}  "
+              f"CI {snapshot['ci_low']:+.5f} to {snapshot['ci_high']:+.5f}  "
+              f"{time.perf_counter() - start:.1f} s")
+
+    if args.workers:
+        # Progress comes from the shards merged so far, so there's one shard for every progress line
+        shards = max(args.workers, -(-args.rounds // args.every)) if args.every else args.workers
+        tasks = shard_tasks(args.rounds, args.seed, shards, policy, args.bet, args.tokens,
+                            args.decks, args.penetration)
+
+        results: List[Optional[RoundStats]] = [None] * len(tasks)
+        finished = RoundStats()
+        for index, shard in run_shards(play_shard, tasks, args.workers):
+            results[index] = shard
+            if args.every:
+                finished.merge(shard)
+                progress(finished.snapshot())
+
+        # The final statistics are merged in shard order, so they don't depend on which shard finished first
+        stats = RoundStats()
+        for shard in results:
+            stats.merge(shard)
+    else:
+        rounds = play_rounds(args.rounds, args.seed, policy, args.bet, args.tokens,
+                             args.decks, args.penetration)
+        stats = RoundStats().consume(rounds, args.every, progress)
+
+    print(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+This module generates strategy tables, which tell a simulated player whether to hit
+or stay for every total against every dealer upcard, by comparing the exact expected
+value of both choices under the rules of the game: a win pays the bet, a loss takes it
+and a tie pays what the Rules say, half of it by default, like Currency.cash_in, cash_out
+and cash_in_payout.
+
+The tables depend on the player's total: the dealer's odds come from the shoe without
+the upcard, and the player's own cards aren't taken out of the shoe.
+"""
+import argparse
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+from blackjack.probability import DealerProbabilities, Distribution, remove, shoe_composition
+from blackjack.rules import DEFAULT_RULES, Rules, ratio
+
+# Sizes of the table, indexed by [total, soft, upcard]
+TOTALS = 22
+UPCARDS = 11
+
+
+def _index(total: int, soft: bool, upcard: int) -> int:
+    """
+    Finds the position of a hand in the flat lists of a StrategyTable
+
+    Parameters:
+        total (int): The player's total
+        soft (bool): Whether an ace is being counted as 11
+        upcard (int): The value of the dealer's upcard, aces are valued at 1
+
+    Returns:
+        The position in the table
+    """
+
+    return (total * 2 + soft) * UPCARDS + upcard
+
+
+class StrategyTable:
+    """
+    This class holds the decision and expected values for every player total and
+    dealer upcard in flat lists, so every decision is a single lookup. It can be
+    used as a policy by the simulation engine.
+    """
+
+    def __init__(self, hits: List[bool], stand_values: List[float], hit_values: List[float],
+                 decks: Optional[int] = None):
+        """
+        Initializes an instance of StrategyTable
+
+        Parameters:
+            hits (List[bool]): Whether to hit, for every position in the table
+            stand_values (List[float]): The expected value of staying
+            hit_values (List[float]): The expected value of hitting
+            decks (int): The amount of decks the table was generated for
+        """
+
+        self._hits = hits
+        self._stand_values = stand_values
+        self._hit_values = hit_values
+        self._decks = decks
+
+    @property
+    def decks(self) -> Optional[int]:
+        """
+        Gets the amount of decks the table was generated for
+
+        Returns:
+            The amount of decks, None if generated from a custom composition
+        """
+
+        return self._decks
+
+    def __call__(self, total: int, soft: bool, upcard: int) -> bool:
+        """
+        Decides whether the player hits, which makes the table a policy
+
+        Parameters:
+            total (int): The player's current total
+            soft (bool): Whether an ace is being counted as 11
+            upcard (int): The value of the dealer's upcard, aces are valued at 1
+
+        Returns:
+            True to hit, False to stay
+        """
+
+        return self._hits[(total * 2 + soft) * UPCARDS + upcard]
+
+    def expected_values(self, total: int, soft: bool, upcard: int) -> Tuple[float, float]:
+        """
+        Gets the expected value of staying and of hitting, per token bet
+
+        Parameters:
+            total (int): The player's current total
+            soft (bool): Whether an ace is being counted as 11
+            upcard (int): The value of the dealer's upcard, aces are valued at 1
+
+        Returns:
+            The expected values of staying and hitting
+        """
+
+        index = _index(total, soft, upcard)
+        return self._stand_values[index], self._hit_values[index]
+
+    def to_dict(self) -> Dict:
+        """
+        Turns the table into a dictionary that can be saved as JSON
+
+        Returns:
+            The table as a dictionary
+        """
+
+        return {"decks": self._decks,
+                "hits": [int(hit) for hit in self._hits],
+                "stand_values": self._stand_values,
+                "hit_values": self._hit_values}
+
+    @staticmethod
+    def from_dict(data: Dict) -> "StrategyTable":
+        """
+        Builds a table from a dictionary made by to_dict
+
+        Parameters:
+            data (Dict): The table as a dictionary
+
+        Returns:
+            The StrategyTable
+        """
+
+        return StrategyTable([bool(hit) for hit in data["hits"]], data["stand_values"],
+                             data["hit_values"], data["decks"])
+
+    def save(self, path: str):
+        """
+        Saves the table to a JSON file
+
+        Parameters:
+            path (str): The path of the file
+        """
+
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file)
+
+    @staticmethod
+    def load(path: str) -> "StrategyTable":
+        """
+        Loads a table saved with save
+
+        Parameters:
+            path (str): The path of the file
+
+        Returns:
+            The StrategyTable
+        """
+
+        with open(path) as file:
+            return StrategyTable.from_dict(json.load(file))
+
+    def __str__(self) -> str:
+        """
+        Allows to print out the table as a grid of H (hit) and S (stay)
+
+        Returns:
+            A string with a row for every total and a column for every upcard
+        """
+
+        lines = ["         " + ' '.join("A" if upcard == 1 else str(upcard) for upcard in range(1, UPCARDS))]
+        for soft in (False, True):
+            for total in range(12 if soft else 4, 21):
+                row = ' '.join("H" if self(total, soft, upcard) else "S" for upcard in range(1, UPCARDS))
+                lines.append(f"{'soft' if soft else 'hard'} {total:>2}  {row}")
+
+        return '\n'.join(lines)
+
+
+def stand_value(total: int, dealer: Distribution, tie_pays: float = 0.5) -> float:
+    """
+    Calculates the expected value of staying on a total
+
+    Parameters:
+        total (int): The player's total
+        dealer (Distribution): The distribution of the dealer's final total
+        tie_pays (float): The tokens won for every token bet on a tie
+
+    Returns:
+        The expected value per token bet
+    """
+
+    # The dealer busting is the last outcome
+    value = dealer[5]
+    for outcome, dealer_total in enumerate(range(17, 22)):
+        if total > dealer_total:
+            value += dealer[outcome]
+        elif total < dealer_total:
+            value -= dealer[outcome]
+        else:
+            value += tie_pays * dealer[outcome]
+
+    return value
+
+
+def hand_values(stands: List[float], chances: List[float],
+                decisions: Optional[Dict[Tuple[int, bool], bool]] = None) -> Tuple[Dict[Tuple[int, bool], float],
+                                                                                    Dict[Tuple[int, bool], float]]:
+    """
+    Calculates the expected values of every hand the player can still hit
+
+    Parameters:
+        stands (List[float]): The expected value of staying on every total
+        chances (List[float]): The chance of drawing every value, from aces to tens
+        decisions (Dict[Tuple[int, bool], bool]): Whether to hit every hand, keyed
+        like the results, None to play every hand the best way
+
+    Returns:
+        The expected values of playing the best way, or the given one, and of
+        hitting, both keyed by (hard total, holds an ace)
+    """
+
+    # Calculated from the highest totals down since hitting only adds points
+    best: Dict[Tuple[int, bool], float] = {}
+    hits: Dict[Tuple[int, bool], float] = {}
+
+    def best_value(hard: int, ace: bool) -> float:
+        total = hard + 10 if (ace and hard <= 11) else hard
+        if total > 21:
+            return -1.0
+        if total == 21:
+            return stands[21]
+
+        return best[(hard, ace)]
+
+    for hard in range(20, 1, -1):
+        for ace in (True, False):
+            total = hard + 10 if (ace and hard <= 11) else hard
+            if total >= 21:
+                continue
+
+            hit = sum(chance * best_value(hard + value, ace or value == 1)
+                      for value, chance in enumerate(chances, 1) if chance)
+            hits[(hard, ace)] = hit
+            if decisions is None:
+                best[(hard, ace)] = max(hit, stands[total])
+            else:
+                best[(hard, ace)] = hit if decisions[(hard, ace)] else stands[total]
+
+    return best, hits
+
+
+def generate(counts: Tuple[int, ...], dealer: Optional[DealerProbabilities] = None,
+             decks: Optional[int] = None, rules: Rules = DEFAULT_RULES) -> StrategyTable:
+    """
+    Generates the strategy table for a shoe
+
+    Parameters:
+        counts (Tuple[int, ...]): The composition of the shoe
+        dealer (DealerProbabilities): The calculator for the dealer's odds, a shared
+        one keeps its cache between tables, it must follow the same rules
+        decks (int): The amount of decks the composition stands for
+        rules (Rules): The rules the dealer plays and ties are paid by
+
+    Returns:
+        The StrategyTable
+    """
+
+    dealer = dealer or DealerProbabilities(rules)
+    tie_pays = float(rules.tie_pays)
+    size = TOTALS * 2 * UPCARDS
+    hits = [False] * size
+    stand_values = [0.0] * size
+    hit_values = [0.0] * size
+
+    for upcard in range(1, UPCARDS):
+        if counts[upcard - 1] == 0:
+            continue
+
+        left = remove(counts, upcard)
+        distribution = dealer.final_totals(upcard, left)
+        stands = [stand_value(total, distribution, tie_pays) for total in range(TOTALS)]
+        chances = [count / sum(left) for count in left]
+
+        _, hand_hits = hand_values(stands, chances)
+        for (hard, ace), hit in hand_hits.items():
+            total = hard + 10 if (ace and hard <= 11) else hard
+            stay = stands[total]
+
+            index = _index(total, ace and hard <= 11, upcard)
+            hits[index] = hit > stay
+            stand_values[index] = stay
+            hit_values[index] = hit
+
+        # Nothing can be gained by hitting a 21
+        for soft in (False, True):
+            stand_values[_index(21, soft, upcard)] = stands[21]
+            hit_values[_index(21, soft, upcard)] = -1.0
+
+    return StrategyTable(hits, stand_values, hit_values, decks)
+
+
+def main():
+    """
+    Runs the strategy generator from the command line and prints or saves its table
+    """
+
+    parser = argparse.ArgumentParser(description="Generates the strategy table for a shoe.")
+    parser.add_argument("-d", "--decks", type=int, default=8, help="decks in the shoe")
+    parser.add_argument("-o", "--output", default=None, help="JSON file to save the table to")
+    parser.add_argument("--hit-soft-17", action="store_true", help="the dealer hits a soft 17")
+    parser.add_argument("--tie-pays", type=ratio, default=DEFAULT_RULES.tie_pays, metavar="RATIO",
+                        help="what a tie pays, 0 for a normal push")
+    args = parser.parse_args()
+
+    rules = Rules(args.hit_soft_17, tie_pays=args.tie_pays)
+    start = time.perf_counter()
+    table = generate(shoe_composition(args.decks), decks=args.decks, rules=rules)
+    elapsed = time.perf_counter() - start
+
+    print(table)
+    print(f"Generated in {elapsed:.3f} s")
+    if args.output:
+        table.save(args.output)
+
+
+if __name__ == "__main__":
+    main()
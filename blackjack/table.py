@@ -0,0 +1,510 @@
+"""
+This module holds the Table class, which plays rounds for up to seven seats against
+one dealer from a single shared shoe, like a real table: every seat has its own hand and
+tokens, the cards are dealt in casino order, the dealer plays their hand once for every
+seat and all the seats are settled together at the end of the round.
+"""
+import argparse
+import time
+from typing import List, Optional, Sequence
+
+from blackjack import blackjack
+from blackjack.card import Card
+from blackjack.currency import Currency
+from blackjack.deck import Deck
+from blackjack.hand import Hand
+from blackjack.policy import PLAYER_POLICIES, PlayerPolicy
+from blackjack.rules import DEFAULT_RULES, Rules
+from blackjack.session import (BETTING, DEALER_TURN, MINIMUM_BET, PLAYER_TURN, SETTLING, STATE_NAMES,
+                               GameSession, settle_hand)
+
+# The most seats a table has
+MAX_SEATS = 7
+
+
+class Seat:
+    """
+    This class holds the hand and tokens of one seat at a table.
+    """
+
+    __slots__ = ("_hand", "_tokens", "_outcome")
+
+    def __init__(self, starting_tokens: int = 1000):
+        """
+        Initializes an instance of Seat
+
+        Parameters:
+            starting_tokens (int): The amount of tokens the player starts with
+        """
+
+        self._hand = Hand([])
+        self._tokens = Currency(starting_tokens)
+        self._outcome: Optional[int] = None
+
+    @property
+    def hand(self) -> Hand:
+        """
+        Gets the seat's hand
+
+        Returns:
+            The hand dealt to the seat this round
+        """
+
+        return self._hand
+
+    @property
+    def tokens(self) -> Currency:
+        """
+        Gets the seat's tokens
+
+        Returns:
+            The Currency of the seat
+        """
+
+        return self._tokens
+
+    @property
+    def outcome(self) -> Optional[int]:
+        """
+        Gets the outcome of the seat's hand in the last settled round
+
+        Returns:
+            One of the outcomes in blackjack.engine, None if the seat sat out
+        """
+
+        return self._outcome
+
+    @property
+    def is_playing(self) -> bool:
+        """
+        Checks whether the seat has bet this round
+
+        Returns:
+            True if the seat has a bet, false if it sits out
+        """
+
+        return self._tokens.tokens_bet > 0
+
+    def settle(self, d_hand: Hand, rules: Rules = DEFAULT_RULES) -> Optional[int]:
+        """
+        Pays or takes the seat's bet like session.settle_hand, a seat that sat out has no outcome
+
+        Parameters:
+            d_hand (Hand): The dealer's hand
+            rules (Rules): The rules the bet is settled by
+
+        Returns:
+            The outcome of the seat's hand, None if the seat sat out
+        """
+
+        self._outcome = settle_hand(self._hand, d_hand, self._tokens, rules) if self.is_playing else None
+        return self._outcome
+
+    def reset(self, starting_tokens: int):
+        """
+        Puts the seat back to the start of a game
+
+        Parameters:
+            starting_tokens (int): The amount of tokens the player starts with
+        """
+
+        self._tokens.reset(starting_tokens)
+        self._hand.clear()
+        self._outcome = None
+
+
+class Table:
+    """
+    This class plays rounds of blackjack for several seats as a state machine, with the
+    same steps as GameSession: bet, deal, the players' turns one seat after the other,
+    the dealer's turn and settlement.
+    """
+
+    def __init__(self, deck: Optional[Deck] = None, seats: int = MAX_SEATS, starting_tokens: int = 1000,
+                 rules: Rules = DEFAULT_RULES):
+        """
+        Initializes an instance of Table
+
+        Parameters:
+            deck (Deck): The deck or shoe every seat is dealt from, a 6-deck shoe when None
+            seats (int): The amount of seats, from 1 to MAX_SEATS
+            starting_tokens (int): The amount of tokens every seat starts with
+            rules (Rules): The rules the dealer plays and the bets are settled by
+        """
+
+        if not 1 <= seats <= MAX_SEATS:
+            raise ValueError(f"A table has from 1 to {MAX_SEATS} seats")
+
+        self._deck = deck if deck is not None else blackjack.init_shoe()
+        self._seats = [Seat(starting_tokens) for _ in range(seats)]
+        self._d_hand = Hand([])
+        self._starting_tokens = starting_tokens
+        self._rules = rules
+        self._state = BETTING
+        # The seat whose turn it is, only meaningful during the players' turns
+        self._turn = 0
+
+    @property
+    def deck(self) -> Deck:
+        """
+        Gets the deck of cards
+
+        Returns:
+            The deck or shoe shared by every seat
+        """
+
+        return self._deck
+
+    @property
+    def seats(self) -> List[Seat]:
+        """
+        Gets the seats, from the dealer's left
+
+        Returns:
+            Every seat of the table
+        """
+
+        return self._seats
+
+    @property
+    def d_hand(self) -> Hand:
+        """
+        Gets the dealer's hand
+
+        Returns:
+            The dealer's hand
+        """
+
+        return self._d_hand
+
+    @property
+    def rules(self) -> Rules:
+        """
+        Gets the rules of the table
+
+        Returns:
+            The rules the table plays by
+        """
+
+        return self._rules
+
+    @property
+    def state(self) -> int:
+        """
+        Gets the step the round is at
+
+        Returns:
+            One of BETTING, DEALING, PLAYER_TURN, DEALER_TURN and SETTLING
+        """
+
+        return self._state
+
+    @property
+    def turn(self) -> Optional[int]:
+        """
+        Gets the seat that's playing
+
+        Returns:
+            The number of the seat, None outside of the players' turns
+        """
+
+        return self._turn if self._state == PLAYER_TURN else None
+
+    def _expect(self, state: int):
+        """
+        Makes sure the round is at the given step
+
+        Parameters:
+            state (int): The step the round should be at
+        """
+
+        if self._state != state:
+            raise RuntimeError(f"Can't do that during {STATE_NAMES[self._state]}, "
+                               f"only during {STATE_NAMES[state]}")
+
+    def bet(self, seat: int, amount: int):
+        """
+        Places the bet of a seat for the next round, seats that don't bet sit it out
+
+        Parameters:
+            seat (int): The number of the seat
+            amount (int): The amount of tokens to bet, going all in
+            when it's more than the seat has
+        """
+
+        self._expect(BETTING)
+        tokens = self._seats[seat].tokens
+        if tokens.total_tokens <= 0:
+            raise ValueError("You're out of tokens!")
+        if amount < MINIMUM_BET:
+            raise ValueError(f"The minimum bet is {MINIMUM_BET}!")
+
+        tokens.bet(amount)
+
+    def _deal_card(self) -> Card:
+        """
+        Deals a card from the shared deck
+
+        Returns:
+            The card dealt
+        """
+
+        card = self._deck.deal_card()
+        if card is None:
+            raise RuntimeError("The deck ran out of cards")
+
+        return card
+
+    def deal(self):
+        """
+        Deals in casino order: a card to every seat that bet from the dealer's left,
+        the dealer's upcard, a second card to every seat and the dealer's hole card
+        """
+
+        self._expect(BETTING)
+        playing = [seat.hand for seat in self._seats if seat.is_playing]
+        if not playing:
+            raise RuntimeError("Nobody has bet")
+
+        # Cards in hand go to the discard tray
+        deck = self._deck
+        for seat in self._seats:
+            deck.discard(seat.hand.cards)
+            seat.hand.clear()
+        deck.discard(self._d_hand.cards)
+        self._d_hand.clear()
+
+        # The deck is reshuffled between rounds once it's due, or when it
+        # may not have enough cards left to play every hand
+        if deck.needs_reshuffle or deck.cards_left < blackjack.CARDS_PER_HAND * (len(playing) + 1):
+            deck.reshuffle()
+
+        for _ in range(2):
+            for hand in playing:
+                hand.hit(self._deal_card())
+            self._d_hand.hit(self._deal_card())
+
+        self._state = PLAYER_TURN
+        self._next_turn(0)
+
+    def _next_turn(self, seat: int):
+        """
+        Moves on to the next seat that has something to decide, or to the dealer's
+        turn once every seat has played. The dealer doesn't play when every seat busted.
+
+        Parameters:
+            seat (int): The first seat that can play
+        """
+
+        seats = self._seats
+        for turn in range(seat, len(seats)):
+            # Seats with a blackjack have nothing to decide
+            if seats[turn].is_playing and seats[turn].hand.total < 21:
+                self._turn = turn
+                return
+
+        busted = all(seat.hand.is_bust for seat in seats if seat.is_playing)
+        self._state = SETTLING if busted else DEALER_TURN
+
+    def hit(self) -> Card:
+        """
+        Deals a card to the seat whose turn it is. Reaching 21 or busting ends its turn.
+
+        Returns:
+            The card dealt
+        """
+
+        self._expect(PLAYER_TURN)
+        card = self._deal_card()
+        hand = self._seats[self._turn].hand
+        hand.hit(card)
+
+        if hand.total >= 21:
+            self._next_turn(self._turn + 1)
+
+        return card
+
+    def stay(self):
+        """
+        Ends the turn of the seat that's playing
+        """
+
+        self._expect(PLAYER_TURN)
+        self._next_turn(self._turn + 1)
+
+    def play_dealer(self):
+        """
+        Deals cards to the dealer until they reach a score of 17 or higher,
+        or past a soft 17 when the rules say so, once for every seat
+        """
+
+        self._expect(DEALER_TURN)
+        blackjack.dealer_hit_or_stay(self._d_hand, self._deck, self._rules)
+        self._state = SETTLING
+
+    def settle(self) -> List[Optional[int]]:
+        """
+        Pays or takes the bet of every seat like session.settle_hand
+
+        Returns:
+            The outcome of every seat, None for the ones that sat out
+        """
+
+        self._expect(SETTLING)
+        d_hand = self._d_hand
+        rules = self._rules
+
+        outcomes = [seat.settle(d_hand, rules) for seat in self._seats]
+
+        self._state = BETTING
+        return outcomes
+
+    def play_round(self, policies: Sequence[PlayerPolicy]) -> List[Optional[int]]:
+        """
+        Plays a whole round without any input, seats that are out of tokens sit it out
+
+        Parameters:
+            policies (Sequence[PlayerPolicy]): What every seat bets and whether it hits,
+            in the order of the seats
+
+        Returns:
+            The outcome of every seat, None for the ones that sat out
+        """
+
+        true_count = self._deck.true_count
+        playing = []
+        for seat, policy in enumerate(policies):
+            tokens = self._seats[seat].tokens.total_tokens
+            if tokens > 0:
+                self.bet(seat, policy.bet(tokens, true_count))
+                playing.append((self._seats[seat].hand, policy.hit))
+
+        self.deal()
+
+        # Every seat plays its whole turn at once instead of going through hit and stay
+        upcard = self._d_hand.cards[0].value
+        deal_card = self._deal_card
+        busted = 0
+        for hand, hit in playing:
+            total = hand.total
+            while total < 21 and hit(total, hand.is_soft, upcard):
+                hand.hit(deal_card())
+                total = hand.total
+            busted += total > 21
+
+        # The dealer doesn't play when every seat busted
+        if busted < len(playing):
+            blackjack.dealer_hit_or_stay(self._d_hand, self._deck, self._rules)
+        self._state = SETTLING
+
+        return self.settle()
+
+    def reset(self, starting_tokens: Optional[int] = None):
+        """
+        Puts the table back to the start of a game, reusing its shoe, hands and tokens
+
+        Parameters:
+            starting_tokens (int): The amount of tokens every seat starts with,
+            the amount given when the table was created when None
+        """
+
+        if starting_tokens is not None:
+            self._starting_tokens = starting_tokens
+
+        for seat in self._seats:
+            seat.reset(self._starting_tokens)
+
+        self._deck.reshuffle()
+        self._d_hand.clear()
+        self._state = BETTING
+
+
+def play_sessions(rounds: int, seats: int, policy: PlayerPolicy, decks: int, starting_tokens: int) -> int:
+    """
+    Plays the same rounds as a table with one separate game for every seat, to compare with it
+
+    Parameters:
+        rounds (int): The amount of rounds every game plays
+        seats (int): The amount of games
+        policy (PlayerPolicy): What every player bets and whether they hit
+        decks (int): The amount of decks in every game's shoe
+        starting_tokens (int): The amount of tokens every player starts with
+
+    Returns:
+        The tokens won by every player together
+    """
+
+    sessions = [GameSession(blackjack.init_shoe(decks), starting_tokens) for _ in range(seats)]
+    net = 0
+    for _ in range(rounds):
+        for session in sessions:
+            if session.is_out_of_tokens:
+                session.reset()
+
+            before = session.tokens.total_tokens
+            session.bet(policy.bet(before, session.deck.true_count))
+            session.deal()
+            upcard = session.d_hand.cards[0].value
+            while session.state == PLAYER_TURN:
+                hand = session.p_hand
+                if policy(hand.total, hand.is_soft, upcard):
+                    session.hit()
+                else:
+                    session.stay()
+
+            session.finish()
+            net += session.tokens.total_tokens - before
+
+    return net
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Runs rounds at a table from the command line and prints how fast they were played
+
+    Parameters:
+        argv (List[str]): The command line arguments, None to use sys.argv
+    """
+
+    parser = argparse.ArgumentParser(description="Plays rounds at a table of several seats without any input.")
+    parser.add_argument("-n", "--rounds", type=int, default=100_000, help="amount of rounds to play")
+    parser.add_argument("--seats", type=int, default=MAX_SEATS, help="seats at the table")
+    parser.add_argument("-d", "--decks", type=int, default=6, help="decks in the shoe")
+    parser.add_argument("-t", "--tokens", type=int, default=1000, help="tokens every seat starts with")
+    parser.add_argument("-p", "--policy", choices=sorted(set(PLAYER_POLICIES) - {"interactive"}), default="basic",
+                        help="how every seat bets and decides to hit or stay")
+    parser.add_argument("--compare", action="store_true",
+                        help="also play the same rounds as separate single-player games")
+    args = parser.parse_args(argv)
+
+    policy = PLAYER_POLICIES[args.policy]()
+    policies = [policy] * args.seats
+    table = Table(blackjack.init_shoe(args.decks), args.seats, args.tokens)
+
+    net = 0
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        before = sum(seat.tokens.total_tokens for seat in table.seats)
+        table.play_round(policies)
+        net += sum(seat.tokens.total_tokens for seat in table.seats) - before
+
+        # Seats that ran out of tokens play again
+        for seat in table.seats:
+            if seat.tokens.total_tokens <= 0:
+                seat.tokens.reset(args.tokens)
+    elapsed = time.perf_counter() - start
+
+    hands = args.rounds * args.seats
+    print(f"Hands played: {hands}")
+    print(f"Net result: {net}")
+    print(f"Hands per second: {hands / elapsed:.0f}")
+
+    if args.compare:
+        start = time.perf_counter()
+        play_sessions(args.rounds, args.seats, policy, args.decks, args.tokens)
+        elapsed = time.perf_counter() - start
+        print(f"Hands per second as separate games: {hands / elapsed:.0f}")
+
+
+if __name__ == "__main__":
+    main()
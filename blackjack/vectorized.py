@@ -0,0 +1,278 @@
+"""
+This module contains a vectorized backend for the simulation engine, which plays
+many independent rounds at once as NumPy array operations. It follows the rules
+of blackjack.engine and needs NumPy to be installed.
+
+Every round is dealt from its own freshly shuffled shoe. The shoes are stored as
+counts of the cards left for each value, from ace (1) to ten-valued cards (10),
+and every card is drawn without replacement from those counts, which deals the
+same cards as shuffling the whole shoe while only touching the cards used.
+"""
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from blackjack.card import CARDS
+from blackjack.engine import (BLACKJACK, BLACKJACK_DRAW, DEALER_BUST, DRAW, LOSE, OUTCOME_NAMES,
+                              PLAYER_BUST, WIN, Engine, Policy, SimulationResult, dealer_policy)
+from blackjack.currency import Currency
+
+# How many cards of each value, from ace (1) to ten-valued cards (10), are in one deck
+DECK_COUNTS = np.bincount([card.value for card in CARDS], minlength=11)[1:].astype(np.int16)
+
+# The highest total a hand can be asked to play, used to size the policy tables
+MAX_TOTAL = 21
+
+
+def compile_policy(policy: Policy) -> np.ndarray:
+    """
+    Turns a policy into a table of decisions that can be looked up for a whole batch
+
+    Parameters:
+        policy (Policy): Decides whether the player hits or stays
+
+    Returns:
+        A boolean array indexed by [total, soft, upcard], True to hit
+    """
+
+    table = np.zeros((MAX_TOTAL + 1, 2, 11), dtype=bool)
+    for total in range(4, MAX_TOTAL):
+        for soft in (False, True):
+            for upcard in range(1, 11):
+                table[total, int(soft), upcard] = policy(total, soft, upcard)
+
+    return table
+
+
+class _Batch:
+    """
+    This class holds the shoes of a batch of rounds and deals from them.
+    """
+
+    def __init__(self, size: int, decks: int, rng: np.random.Generator, record: bool = False):
+        """
+        Initializes the shoes of a batch
+
+        Parameters:
+            size (int): The amount of rounds in the batch
+            decks (int): The amount of decks in every shoe
+            rng (np.random.Generator): The source of the draws
+            record (bool): Whether to keep the order the cards are dealt in
+        """
+
+        self._counts = np.tile(DECK_COUNTS * decks, (size, 1))
+        self._left = np.full(size, 52 * decks, dtype=np.int32)
+        self._rng = rng
+        self._draws: Optional[List[Tuple[np.ndarray, np.ndarray]]] = [] if record else None
+
+    def deal(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Deals the next card from the shoes of the given rounds
+
+        Parameters:
+            rows (np.ndarray): The indexes of the rounds to deal to
+
+        Returns:
+            The values of the cards dealt, one for each row
+        """
+
+        counts = self._counts[rows]
+        # Picks the position of the card in each shoe, the value is the
+        # first one whose running count goes past that position
+        position = (self._rng.random(len(rows)) * self._left[rows]).astype(np.int32)
+        index = (counts.cumsum(axis=1) <= position[:, None]).sum(axis=1)
+
+        self._counts[rows, index] -= 1
+        self._left[rows] -= 1
+
+        values = (index + 1).astype(np.int8)
+        if self._draws is not None:
+            self._draws.append((rows, values))
+
+        return values
+
+    def dealt_cards(self, size: int) -> List[List[int]]:
+        """
+        Gets the values dealt to every round, in the order they were dealt
+
+        Parameters:
+            size (int): The amount of rounds in the batch
+
+        Returns:
+            A list with the card values dealt in every round
+        """
+
+        dealt = [[] for _ in range(size)]
+        for rows, values in self._draws:
+            for row, value in zip(rows.tolist(), values.tolist()):
+                dealt[row].append(value)
+
+        return dealt
+
+
+def _totals(hard: np.ndarray, ace: np.ndarray) -> np.ndarray:
+    """
+    Counts the totals of many hands at once
+
+    Parameters:
+        hard (np.ndarray): The totals with every ace valued at 1
+        ace (np.ndarray): Whether every hand holds an ace
+
+    Returns:
+        The totals, valuing one ace at 11 when that doesn't go over 21
+    """
+
+    return hard + 10 * (ace & (hard <= 11))
+
+
+def play_batch(batch: _Batch, size: int, table: np.ndarray) -> np.ndarray:
+    """
+    Plays a batch of rounds, one for each shoe in the batch
+
+    Parameters:
+        batch (_Batch): The shoes to deal from
+        size (int): The amount of rounds in the batch
+        table (np.ndarray): The player's compiled policy
+
+    Returns:
+        The outcome of every round
+    """
+
+    rows = np.arange(size)
+
+    # Deals two cards to the player and then two to the dealer
+    # in the same order as blackjack.reset_turn
+    p_first = batch.deal(rows)
+    p_second = batch.deal(rows)
+    upcard = batch.deal(rows)
+    hole = batch.deal(rows)
+
+    p_hard = p_first.astype(np.int16) + p_second
+    p_ace = (p_first == 1) | (p_second == 1)
+    p_total = _totals(p_hard, p_ace)
+
+    # The player's moves, only the rounds still hitting are dealt to
+    soft = (p_ace & (p_hard <= 11)).astype(np.int8)
+    active = rows[(p_total < 21) & table[np.minimum(p_total, MAX_TOTAL), soft, upcard]]
+    while len(active):
+        card = batch.deal(active)
+        p_hard[active] += card
+        p_ace[active] |= card == 1
+        p_total[active] = _totals(p_hard[active], p_ace[active])
+
+        hard = p_hard[active]
+        total = p_total[active]
+        soft = (p_ace[active] & (hard <= 11)).astype(np.int8)
+        active = active[(total < 21) & table[np.minimum(total, MAX_TOTAL), soft, upcard[active]]]
+
+    # Dealer hits their hand unless the player has busted
+    d_hard = upcard.astype(np.int16) + hole
+    d_ace = (upcard == 1) | (hole == 1)
+    d_total = _totals(d_hard, d_ace)
+
+    active = rows[(p_total <= 21) & (d_total < 17)]
+    while len(active):
+        card = batch.deal(active)
+        d_hard[active] += card
+        d_ace[active] |= card == 1
+        d_total[active] = _totals(d_hard[active], d_ace[active])
+        active = active[d_total[active] < 17]
+
+    # Settles every round with the same checks as Engine.play_round
+    outcomes = np.full(size, DRAW, dtype=np.int8)
+    outcomes[p_total < d_total] = LOSE
+    outcomes[p_total > d_total] = WIN
+    outcomes[d_total > 21] = DEALER_BUST
+    outcomes[p_total == 21] = BLACKJACK
+    outcomes[(p_total == 21) & (d_total == 21)] = BLACKJACK_DRAW
+    outcomes[p_total > 21] = PLAYER_BUST
+
+    return outcomes
+
+
+def payouts(bet: int) -> np.ndarray:
+    """
+    Gets the tokens won or lost for every outcome with the given bet,
+    as paid by Currency.cash_in, cash_out and cash_in_half
+
+    Parameters:
+        bet (int): The amount of tokens bet
+
+    Returns:
+        An array of payouts indexed by outcome
+    """
+
+    table = np.zeros(len(OUTCOME_NAMES), dtype=np.int64)
+    table[[WIN, DEALER_BUST, BLACKJACK]] = bet
+    table[[LOSE, PLAYER_BUST]] = -bet
+    table[[DRAW, BLACKJACK_DRAW]] = bet // 2
+
+    return table
+
+
+def simulate(n_rounds: int, seed: Optional[int] = None, policy: Policy = dealer_policy,
+             bet: int = 100, decks: int = 1, batch_size: int = 1_000_000) -> SimulationResult:
+    """
+    Plays the given amount of rounds in batches of array operations
+
+    Every round is dealt from a freshly shuffled shoe and bets the same amount,
+    since rounds are played at the same time they can't depend on a bankroll.
+
+    Parameters:
+        n_rounds (int): The amount of rounds to play
+        seed (int): The seed for the draws, None for a random one
+        policy (Policy): Decides whether the player hits or stays
+        bet (int): The amount of tokens bet every round
+        decks (int): The amount of decks in every shoe
+        batch_size (int): The amount of rounds played at the same time
+
+    Returns:
+        The summary of the simulation
+    """
+
+    rng = np.random.default_rng(seed)
+    table = compile_policy(policy)
+    outcomes = np.zeros(len(OUTCOME_NAMES), dtype=np.int64)
+
+    start = time.perf_counter()
+    played = 0
+    while played < n_rounds:
+        size = min(batch_size, n_rounds - played)
+        outcomes += np.bincount(play_batch(_Batch(size, decks, rng), size, table), minlength=len(OUTCOME_NAMES))
+        played += size
+    elapsed = time.perf_counter() - start
+
+    net = int(outcomes @ payouts(bet))
+    return SimulationResult(n_rounds, outcomes.tolist(), n_rounds * bet, net, 0, elapsed)
+
+
+def cross_check(n_rounds: int, seed: Optional[int] = None, policy: Policy = dealer_policy,
+                decks: int = 1) -> List[int]:
+    """
+    Plays rounds with the vectorized backend and plays them again with the scalar
+    Engine on the same cards, to make sure both backends follow the same rules
+
+    Parameters:
+        n_rounds (int): The amount of rounds to compare
+        seed (int): The seed for the draws, None for a random one
+        policy (Policy): Decides whether the player hits or stays
+        decks (int): The amount of decks in every shoe
+
+    Returns:
+        The indexes of the rounds where the outcomes differ
+    """
+
+    batch = _Batch(n_rounds, decks, np.random.default_rng(seed), record=True)
+    outcomes = play_batch(batch, n_rounds, compile_policy(policy)).tolist()
+
+    # The Engine deals from the end of its list, so every shoe is reversed
+    engine = Engine(Currency(1000), policy, seed, decks, penetration=1.0)
+    mismatches = []
+    for index, dealt in enumerate(batch.dealt_cards(n_rounds)):
+        engine.cards[:] = dealt[::-1]
+        engine.currency.reset(1000)
+        if engine.play_round(100) != outcomes[index]:
+            mismatches.append(index)
+
+    return mismatches
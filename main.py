@@ -1,17 +1,12 @@
-from blackjack import blackjack
+import argparse
+import time
+from typing import Optional
 
-# Essential game components
-main_deck = blackjack.init_deck()
-tokens = blackjack.init_currency()
-p_hand = blackjack.init_hand(main_deck)
-d_hand = blackjack.init_hand(main_deck)
+from blackjack import blackjack, instrumentation
+from blackjack.engine import BLACKJACK, BLACKJACK_DRAW, DEALER_BUST, DRAW, LOSE, PLAYER_BUST, WIN
+from blackjack.policy import PLAYER_POLICIES, PlayerPolicy
+from blackjack.session import DEALER_TURN, PLAYER_TURN, GameSession
 
-# Flag to decide whether to play another round after a loss
-play_again = True
-
-p_has_busted = False
-p_has_blackjack = False
-both_have_blackjack = False
 
 def ask_play_again() -> bool:
     """Asks the user whether they want to play another round
@@ -36,222 +31,130 @@ def ask_play_again() -> bool:
         # This only gets here in case of the user entering an invalid choice
         # and gives them a suggestion regarding what to enter
         print("* You need to enter one of the following: y/yes, n/no *\n")
-        
 
-def check_for_blackjack(hand_of_cards) -> bool:
-    """Checks if a hand has a blackjack or not
 
-    Args:
-        hand_of_cards (Hand): The hand of cards to check
+def announce(session: GameSession, outcome: int):
+    """Prints the result of a settled round
 
-    Returns:
-        bool: True if there's a blackjack, false otherwise
+    Args:
+        session (GameSession): The session the round was played in
+        outcome (int): The outcome of the round
     """
     
-    return blackjack.count_points(hand_of_cards) == 21
+    # Get the player's and dealer's score
+    p_score = session.p_hand.total
+    d_score = session.d_hand.total
+    
+    if outcome == PLAYER_BUST:
+        print("You busted!\n")
+    elif outcome == BLACKJACK_DRAW:
+        print("You and the dealer both have a blackjack!")
+        print("It's a draw!\n")
+    elif outcome == BLACKJACK:
+        print("You have a blackjack!")
+        print("You won the turn!\n")
+    elif outcome == DEALER_BUST:
+        print("The dealer busted!")
+        print("You won the turn!\n")
+    elif outcome == WIN:
+        print(f"You won {p_score} to {d_score}!\n")
+    elif outcome == LOSE:
+        print(f"You lost {d_score} to {p_score}!\n")
+    elif outcome == DRAW:
+        print(f"You tied {p_score} to {d_score}!\n")
 
 
-def check_for_bust(hand_of_cards) -> bool:
-    """Checks if a hand has busted or not
+def play_round(session: GameSession, policy: PlayerPolicy):
+    """Plays a round from the bet to the settlement
 
     Args:
-        hand_of_cards (Hand): The hand of cards to check
-
-    Returns:
-        bool: True if busted, false otherwise
+        session (GameSession): The session to play the round in
+        policy (PlayerPolicy): Decides the bet and whether to hit or stay
     """
     
-    return blackjack.count_points(hand_of_cards) > 21
-
-
-def player_wins():
-    """Earns the tokens and resets the hands
-    """
-    
-    # Player cashes in the full bet
-    tokens.cash_in()
-    
-    # Both hands are reset to start next turn
-    blackjack.reset_turn([p_hand, d_hand], main_deck)
-    
-    
-def player_loses():
-    """Withdraws the tokens and resets the hands
-    """
-    
-    # Player loses their bet
-    tokens.cash_out()
-    
-    # Both hands are reset to start the next turn
-    blackjack.reset_turn([p_hand, d_hand], main_deck)
+    # The policy sizes the bet, which is placed before dealing the hands
+    session.bet(policy.bet(session.tokens.total_tokens, session.deck.true_count))
+    print(f"You bet {session.tokens.tokens_bet} tokens!\n")
+    session.deal()
+    
+    print("This is your hand:")
+    print(f"{session.p_hand}\n")
+    
+    # Keeps asking the policy if the player gets hit until it refuses,
+    # they reach 21 or bust
+    upcard = session.d_hand.cards[0].value
+    while session.state == PLAYER_TURN:
+        if policy.hit(session.p_hand.total, session.p_hand.is_soft, upcard):
+            # Shows the user what card they drew as well as their new hand
+            new_card = session.hit()
+            print(f"You got {new_card}!\n")
+            print("This is your hand:")
+            print(f"{session.p_hand}\n")
+        else:
+            session.stay()
     
+    # Dealer hits their hand unless the player busted
+    if session.state == DEALER_TURN:
+        session.play_dealer()
     
-def player_draws():
-    """Cashes in half of the initial bet and resets the hands
-    """
+    # Pays or takes the bet and shows the result
+    announce(session, session.settle())
 
-    # Splits the bet
-    tokens.cash_in_half()
-    
-    # Both hands are reset to start next turn
-    blackjack.reset_turn([p_hand, d_hand], main_deck)
 
+def play(session: GameSession, policy: PlayerPolicy, rounds: Optional[int] = None):
+    """Plays rounds until the user doesn't want to play anymore
 
-def handle_possible_blackjack_draw():
-    """Holds the logic that checks for a blackjack
-    in the current dealer's hand and if it finds it
-    then it will be a blackjack draw
+    Args:
+        session (GameSession): The session to play
+        policy (PlayerPolicy): Decides the bets and whether to hit or stay
+        rounds (Optional[int]): The amount of rounds to play, None to play until
+            the user stops. When it's given the player starts over without being asked
     """
     
-    # Use module scoped flags
-    global p_has_blackjack
-    global both_have_blackjack
-    
-    # Flags player blackjack
-    p_has_blackjack = True
-    
-    # Dealer can at least try to tie the score if they have a blackjack
-    blackjack.dealer_hit_or_stay(d_hand, main_deck)
-    
-    # Dealer's blackjack?
-    if check_for_blackjack(d_hand):
-        # Flags dealer's blackjack
-        both_have_blackjack = True
-        
-        # Prints message announcing it's a draw
-        print("You and the dealer both have a blackjack!")
-        print("It's a draw!\n")
+    # The game keeps running until the user doesn't want to play anymore
+    played = 0
+    while rounds is None or played < rounds:
+        play_round(session, policy)
+        played += 1
         
-        # Cashes in half the bet and resets the hands
-        player_draws()
+        # No more tokens left means the player
+        # has lost their game
+        if not session.is_out_of_tokens:
+            continue
         
-    else:
-        # Dealer didn't have a blackjack, therefore player wins
-        # Prints a message showing that
-        print("You have a blackjack!")
-        print("You won the turn!\n")
+        print("You're out of tokens!\n")
         
-        # Cashes in the price and resets hands
-        player_wins()
-
-
-def reset_flags():
-    """Resets all the game flags to default state
-    """
-    
-    # Use the variables declared in the scope of the module
-    global p_has_busted
-    global p_has_blackjack
-    global both_have_blackjack
-    
-    # Reset them
-    p_has_busted = False
-    p_has_blackjack = False
-    both_have_blackjack = False
-
-
-if __name__ == "__main__":    
-    # The game keeps running until the user doesn't want to play anymore
-    while play_again:
-        # Asks the user how many tokens to bet     
-        blackjack.ask_bet(tokens)
+        # Stops when the user doesn't want to play again
+        if rounds is None and not ask_play_again():
+            break
         
-        # The player might have a blackjack in their first hand
-        if check_for_blackjack(p_hand):
-            # The dealer might also have a blackjack
-            handle_possible_blackjack_draw()
-            
-            # Skips the remaining logic in the loop since the game has been decided already
-            continue
-        else:
-            # Keeps asking the player if they want to get hit until they refuse
-            while blackjack.ask_hit_or_stay(p_hand, main_deck):
-                # Player might have a blackjack
-                if check_for_blackjack(p_hand):
-                    # The dealer might also have a blackjack
-                    handle_possible_blackjack_draw()
-                    
-                    # Breaks out of the loop since somebody had a blackjack
-                    # No need to keep asking the player if they want to get hit
-                    break    
-                elif check_for_bust(p_hand):
-                    # Player might have busted
-                    
-                    # Flags the player has busted
-                    p_has_busted = True
-                    
-                    # Prints a message showing that
-                    print("You busted!\n")
-                    
-                    # Loses tokens and resets hands
-                    player_loses()
-                    
-                    # Breaks out of the loop since the player has busted
-                    break
-            
-            # Dealer will hit their hand if no blackjack or bust occurred
-            if not (p_has_blackjack or both_have_blackjack or p_has_busted):
-                # Dealer hits their hand
-                blackjack.dealer_hit_or_stay(d_hand, main_deck)
-                
-                # Dealer might have busted
-                if check_for_bust(d_hand):
-                    # Prints a message showing the dealer has busted
-                    print("The dealer busted!")
-                    print("You won the turn!\n")
-                    
-                    # Cashes in the price and resets the hands
-                    player_wins()
-                else:
-                    # Get the player's and dealer's score
-                    p_score = blackjack.count_points(p_hand)
-                    d_score = blackjack.count_points(d_hand)
-                    
-                    # Compares player's and dealer's score
-                    if p_score > d_score:
-                        # Player has a higher score
-                        print(f"You won {p_score} to {d_score}!\n")
-                        
-                        # Cashes in the price and resets hands
-                        player_wins()
-                    elif p_score < d_score:
-                        # Player has a lower score
-                        print(f"You lost {d_score} to {p_score}!\n")
-                        
-                        # Loses tokens and resets hands
-                        player_loses()
-                    else:
-                        # It's a draw
-                        print(f"You tied {p_score} to {d_score}!\n")
-                        
-                        # Cashes in half the bet and resets the hands
-                        player_draws()
-                        
-            # Resets all flags
-            reset_flags()
-                        
-            # No more tokens left means the player
-            # has lost their game
-            if tokens.total_tokens > 0:
-                continue
-            else:
-                print("You're out of tokens!\n")
-                
-            # When the deck of cards is empty, it gets refilled
-            if len(main_deck.cards) == 0:
-                main_deck.init_deck()
-                main_deck.shuffle()
-                
-        # Sets the flag to keep playing or not
-        play_again = ask_play_again()
+        # The game is reset to initial state
+        session.reset()
         
-        # The user wants to play again
-        if play_again:
-            # All game flags are reset
-            reset_flags()
-            
-            # The game is reset to initial state
-            blackjack.reset_game(main_deck, [p_hand, d_hand], tokens)
-            
-            # Introduces the user to the game
-            print("\n\n*** WELCOME TO BLACKJACK!! ***\n")
+        # Introduces the user to the game
+        print("\n\n*** WELCOME TO BLACKJACK!! ***\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plays blackjack in the terminal.")
+    parser.add_argument("-p", "--policy", choices=sorted(PLAYER_POLICIES), default="interactive",
+                        help="who plays the hands, the user by default")
+    parser.add_argument("-d", "--decks", type=int, default=1,
+                        help="decks to play with, a single deck by default")
+    parser.add_argument("-n", "--rounds", type=int, default=None,
+                        help="rounds to play, until the user stops by default")
+    parser.add_argument("--profile", default=None, metavar="PATH",
+                        help="profile the game, writing PATH.prof and PATH.alloc.txt")
+    args = parser.parse_args()
+    
+    # A single deck is played like it always was, more decks are dealt from a shoe
+    deck = blackjack.init_deck() if args.decks == 1 else blackjack.init_shoe(args.decks)
+    session = GameSession(deck, 1000)
+    policy = PLAYER_POLICIES[args.policy]()
+    if args.profile:
+        # The counters and timers of every phase are reported along with the profile
+        start = time.perf_counter()
+        instrumentation.profile(lambda: play(session, policy, args.rounds), args.profile)
+        print(instrumentation.report(time.perf_counter() - start))
+    else:
+        play(session, policy, args.rounds)
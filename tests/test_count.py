@@ -0,0 +1,86 @@
+"""
+Tests that decks, shoes and the Engine keep the running and true counts of the cards they deal.
+"""
+from random import Random
+
+import pytest
+
+from blackjack.card import CARDS, Card
+from blackjack.count import HI_LO, KO, OMEGA_II
+from blackjack.currency import Currency
+from blackjack.deck import Deck
+from blackjack.engine import HARD_VALUES, Engine, dealer_policy
+from blackjack.shoe import Shoe
+
+DEALT = ("Two", "Three", "Four", "Five", "Six", "King", "Ace", "Seven", "Eight", "Nine")
+
+
+def stacked_deck() -> Deck:
+    """
+    Makes a single deck that deals the cards of DEALT first, in that order
+
+    Returns:
+        The stacked deck, counting with Hi-Lo, KO and Omega II
+    """
+
+    first = [Card(rank, "Clubs") for rank in DEALT]
+    cards = [card for card in CARDS if card not in first] + first[::-1]
+    deck = Deck((HI_LO, KO, OMEGA_II))
+    deck.set_state(cards, len(cards), 0, [4] * 13, [0, 0, 0])
+    return deck
+
+
+def test_counts_after_known_deals():
+    """
+    Every system adds its weight for each card dealt, and the true count divides by the decks left
+    """
+
+    deck = stacked_deck()
+    for rank in DEALT:
+        assert deck.deal_card().rank == rank
+
+    # Two to Six are +1 in Hi-Lo and KO, King and Ace -1, Seven +1 in KO only,
+    # Omega II weighs Four to Six +2, Nine -1 and King -2
+    assert deck.running_counts == {"Hi-Lo": 3, "KO": 4, "Omega II": 6}
+    assert deck.running_count == 3
+    assert deck.true_count == pytest.approx(3 / (42 / 52))
+    assert deck.rank_counts == [3, 3, 3, 3, 3, 3, 3, 3, 4, 4, 4, 3, 3]
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_counts_of_a_whole_shoe(lazy):
+    """
+    Dealing out a whole shoe brings balanced counts back to 0, and a reshuffle resets them
+    """
+
+    shoe = Shoe(6, 1.0, (HI_LO, KO, OMEGA_II), rng=Random(3), lazy=lazy)
+    shoe.shuffle()
+    assert shoe.running_counts == {"Hi-Lo": 0, "KO": -20, "Omega II": 0}
+
+    running = 0
+    while shoe.cards_left:
+        running += HI_LO.weights[shoe.deal_card().value]
+        assert shoe.running_count == running
+
+    # KO is unbalanced, every deck adds 4 to it
+    assert shoe.running_counts == {"Hi-Lo": 0, "KO": 4, "Omega II": 0}
+    assert shoe.rank_counts == [0] * 13
+    assert shoe.true_count == 0.0
+
+    shoe.reshuffle()
+    assert shoe.running_counts == {"Hi-Lo": 0, "KO": -20, "Omega II": 0}
+    assert shoe.rank_counts == [24] * 13
+
+
+def test_engine_count_follows_the_cards_dealt():
+    """
+    The Engine's precomputed count matches the cards missing from its shoe after every round
+    """
+
+    engine = Engine(Currency(1000), dealer_policy, 4, 2, 0.75, KO)
+    full = sum(KO.weights[value] for value in HARD_VALUES * 2)
+
+    for _ in engine.play(500):
+        left = sum(KO.weights[value] for value in engine.cards)
+        assert engine.running_count == KO.initial_count(2) + full - left
+        assert engine.true_count == pytest.approx(engine.running_count * 52 / len(engine.cards))
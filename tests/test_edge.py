@@ -0,0 +1,21 @@
+"""
+Tests that the house edge worked out for a rule variant agrees with simulating it.
+"""
+from blackjack.edge import EdgeAnalyzer
+from blackjack.engine import simulate
+from blackjack.probability import shoe_composition
+from blackjack.rules import DEFAULT_RULES
+from blackjack.strategy import generate
+
+
+def test_house_edge_agrees_with_a_simulation():
+    """
+    A seeded simulation of the player following the variant's strategy table lands within
+    about two and a half standard errors of the edge, a round's result varying by 1.15 bets
+    """
+
+    edge = EdgeAnalyzer().house_edge(1, DEFAULT_RULES)
+    table = generate(shoe_composition(1), decks=1, rules=DEFAULT_RULES)
+    result = simulate(300_000, 1, table, 100, 10 ** 9, 1, 0.75, rules=DEFAULT_RULES)
+
+    assert abs(result.house_edge - edge) < 0.005
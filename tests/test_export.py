@@ -0,0 +1,61 @@
+"""
+Tests that exported rounds read back from their memory-mapped columns exactly as they were written.
+"""
+import os
+
+import pytest
+
+from blackjack.engine import OUTCOME_NAMES, dealer_policy, simulate
+from blackjack.stats import play_rounds
+
+np = pytest.importorskip("numpy")
+columnar = pytest.importorskip("blackjack.export")
+
+
+def test_round_trip_through_growing_files(tmp_path):
+    """
+    Rounds written over several flushes and file growths read back in order, and the files are cut to them
+    """
+
+    rng = np.random.default_rng(1)
+    rows = [(int(rng.integers(4, 31)), int(rng.integers(1, 11)), int(rng.integers(0, 27)),
+             int(rng.integers(0, len(OUTCOME_NAMES))), int(rng.integers(100, 10_000)),
+             int(rng.integers(-(1 << 40), 1 << 40))) for _ in range(10_007)]
+
+    directory = str(tmp_path / "export")
+    with columnar.RoundExporter(directory, chunk_rounds=1000, capacity=1500) as export:
+        for row in rows:
+            export.write(*row)
+        assert export.rounds == len(rows)
+        # Until it's closed, the export says it's empty
+        assert all(len(column) == 0 for column in columnar.open_rounds(directory).values())
+
+    columns = columnar.open_rounds(directory)
+    assert list(columns) == [name for name, _ in columnar.COLUMNS]
+    for index, (name, dtype) in enumerate(columnar.COLUMNS):
+        assert isinstance(columns[name], np.memmap)
+        assert columns[name].dtype == np.dtype(dtype)
+        assert columns[name].tolist() == [row[index] for row in rows]
+        assert os.path.getsize(os.path.join(directory, f"{name}.npy")) == \
+            columns[name].offset + len(rows) * np.dtype(dtype).itemsize
+
+
+def test_simulation_export_matches_its_rounds(tmp_path):
+    """
+    The columns exported by a simulation hold the same rounds as the engine streams
+    """
+
+    directory = str(tmp_path / "export")
+    with columnar.RoundExporter(directory, chunk_rounds=4096) as export:
+        result = simulate(20_000, 6, dealer_policy, 100, 500, 6, export=export)
+
+    columns = columnar.open_rounds(directory, ["outcome", "bet", "bankroll", "upcard", "dealer_total"])
+    assert len(columns["outcome"]) == result.rounds
+    assert np.bincount(columns["outcome"], minlength=len(OUTCOME_NAMES)).tolist() == result.outcomes
+    assert int(columns["bet"].sum()) == result.wagered
+
+    streamed = list(play_rounds(20_000, 6, dealer_policy, 100, 500, 6))
+    assert columns["outcome"].tolist() == [outcome for outcome, _, _, _, _, _ in streamed]
+    assert columns["bankroll"].tolist() == [after for _, _, _, after, _, _ in streamed]
+    assert columns["upcard"].tolist() == [upcard for _, _, _, _, upcard, _ in streamed]
+    assert columns["dealer_total"].tolist() == [total for _, _, _, _, _, total in streamed]
@@ -0,0 +1,87 @@
+"""
+Tests that hands keep their score right as cards are added, however many aces they hold.
+"""
+from random import Random
+
+import pytest
+
+from blackjack import blackjack
+from blackjack.card import Card
+from blackjack.deck import Deck
+from blackjack.hand import Hand
+
+
+def cards(*ranks: str) -> list:
+    """
+    Gets a card of every given rank
+
+    Parameters:
+        ranks (str): The ranks of the cards
+
+    Returns:
+        The cards, all of them hearts
+    """
+
+    return [Card(rank, "Hearts") for rank in ranks]
+
+
+@pytest.mark.parametrize("ranks, total, soft", [(("Ace", "Ace", "King"), 12, False),
+                                                (("Ace", "Ace"), 12, True),
+                                                (("Ace", "Ace", "Ace", "Eight"), 21, True),
+                                                (("Ace", "Ace", "Ace", "Ace", "Seven"), 21, True),
+                                                (("Ace", "King"), 21, True),
+                                                (("Ace", "Six", "King"), 17, False),
+                                                (("Ace", "Ace", "Nine", "King"), 21, False),
+                                                (("Two", "Three"), 5, False)])
+def test_aces_are_valued_without_busting(ranks, total, soft):
+    """
+    One ace is valued at 11 only while that doesn't go over 21, however many there are
+    """
+
+    hand = Hand(cards(*ranks))
+
+    assert hand.total == total
+    assert blackjack.count_points(hand) == total
+    assert hand.is_soft == soft
+    assert not hand.is_bust
+    assert hand.is_blackjack == (total == 21)
+
+
+def test_running_score_follows_hits_and_clear():
+    """
+    The score is the same whether the cards were dealt at once or one at a time
+    """
+
+    hand = Hand(cards("Ace", "Ace"))
+    hand.hit(Card("King", "Spades"))
+    assert hand.total == 12
+
+    hand.hit(Card("Queen", "Spades"))
+    assert hand.total == 22
+    assert hand.is_bust
+
+    hand.clear()
+    assert (hand.total, hand.hard_total, hand.aces, hand.cards) == (0, 0, 0, [])
+    for card in cards("Ace", "Ace", "King"):
+        hand.hit(card)
+    assert hand.total == Hand(cards("Ace", "Ace", "King")).total == 12
+
+
+def test_reset_turn_reshuffles_a_short_deck():
+    """
+    A single deck is reshuffled before a turn that may not have enough cards, so dealing never runs out
+    """
+
+    deck = Deck(rng=Random(1))
+    deck.shuffle()
+    hands = [Hand([]), Hand([])]
+    turns = 0
+    while deck.reshuffles < 3:
+        left = deck.cards_left
+        reshuffles = deck.reshuffles
+        blackjack.reset_turn(hands, deck)
+        turns += 1
+        assert deck.reshuffles == reshuffles + (left < blackjack.CARDS_PER_HAND * 2)
+        assert all(len(hand.cards) == 2 for hand in hands)
+
+    assert turns > 3
@@ -0,0 +1,74 @@
+"""
+Tests that hand histories read back every round written to them, across writers and segments.
+"""
+from fractions import Fraction
+
+import pytest
+
+from blackjack.currency import Currency
+from blackjack.engine import Engine, dealer_policy, simulate
+from blackjack.history import CARD_CODES, CARD_VALUES, HandHistoryReader, HandHistoryWriter, segment_paths
+from blackjack.rules import Rules
+
+
+def test_appends_keep_numbering_rounds(tmp_path):
+    """
+    A new writer of the same game adds a segment and numbers its rounds after the last one
+    """
+
+    directory = str(tmp_path)
+    with HandHistoryWriter(directory, 1, 1, 0.75, CARD_VALUES, segment_records=300, buffer_records=64) as history:
+        simulate(1000, 1, dealer_policy, history=history)
+    with HandHistoryWriter(directory, 1, 1, 0.75, CARD_VALUES) as history:
+        simulate(10, 1, dealer_policy, history=history)
+
+    assert len(segment_paths(directory)) == 5
+    with HandHistoryReader(directory) as reader:
+        assert (len(reader), reader.end) == (1010, 1010)
+        assert [record.round for record in reader] == list(range(1010))
+        assert reader[999].round == 999 and reader[1000].round == 1000
+
+
+@pytest.mark.parametrize("decks, penetration, tokens", [(1, 0.75, 1000), (1, 1.0, 300), (6, 0.99, 100_000)])
+def test_simulations_record_rounds_like_single_writes(tmp_path, decks, penetration, tokens):
+    """
+    Rounds recorded in blocks by simulate match writing every round on its own, across
+    reshuffles in the middle of rounds, rebuys and more rounds than a block holds
+    """
+
+    with HandHistoryWriter(str(tmp_path / "simulated"), 3, decks, penetration, buffer_records=100) as history:
+        simulate(5000, 3, dealer_policy, 50, tokens, decks, penetration, history=history)
+
+    engine = Engine(Currency(tokens), dealer_policy, 3, decks, penetration)
+    with HandHistoryWriter(str(tmp_path / "written"), 3, decks, penetration, buffer_records=100) as history:
+        for outcome, placed, net, after in engine.play(5000, 50, tokens):
+            shoe, position, cards = engine.last_round()
+            history.write(shoe, position, outcome, placed, net, after,
+                          engine.player_cards, cards, engine.player_total < 21)
+
+    with HandHistoryReader(str(tmp_path / "simulated")) as simulated, \
+            HandHistoryReader(str(tmp_path / "written")) as written:
+        assert list(simulated.scan()) == list(written.scan())
+
+
+@pytest.mark.parametrize("seed, decks, penetration, encoding, rules",
+                         [(7, 1, 0.75, CARD_VALUES, Rules()),
+                          (1, 2, 0.75, CARD_VALUES, Rules()),
+                          (1, 1, 0.5, CARD_VALUES, Rules()),
+                          (1, 1, 0.75, CARD_CODES, Rules()),
+                          (None, 1, 0.75, CARD_VALUES, Rules()),
+                          (1, 1, 0.75, CARD_VALUES, Rules(True)),
+                          (1, 1, 0.75, CARD_VALUES, Rules(blackjack_pays=Fraction(3, 2)))])
+def test_appending_another_game_is_refused(tmp_path, seed, decks, penetration, encoding, rules):
+    """
+    Segments are all decoded with the first one's header, so a writer of another game can't add to them
+    """
+
+    directory = str(tmp_path)
+    with HandHistoryWriter(directory, 1, 1, 0.75, CARD_VALUES) as history:
+        simulate(100, 1, dealer_policy, history=history)
+
+    with pytest.raises(ValueError):
+        HandHistoryWriter(directory, seed, decks, penetration, encoding, rules)
+
+    assert len(segment_paths(directory)) == 1
@@ -0,0 +1,76 @@
+"""
+Tests that lazily shuffled decks and shoes deal the same cards as ones shuffled up front.
+"""
+from random import Random
+
+import pytest
+
+from blackjack.deck import Deck
+from blackjack.shoe import Shoe
+
+
+def deal(deck: Deck, amount: int) -> list:
+    """
+    Deals cards, reshuffling whenever the deck is due like a game between rounds
+
+    Parameters:
+        deck (Deck): The deck to deal from
+        amount (int): The amount of cards to deal
+
+    Returns:
+        The codes of the cards dealt
+    """
+
+    deck.shuffle()
+    codes = []
+    for _ in range(amount):
+        if deck.needs_reshuffle:
+            deck.reshuffle()
+        codes.append(deck.deal_card().code)
+    return codes
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_lazy_deck_deals_like_a_shuffled_one(seed):
+    """
+    A single deck is always dealt out before it's reshuffled, so the orders match over every reshuffle
+    """
+
+    eager = deal(Deck(rng=Random(seed)), 52 * 5)
+    lazy = deal(Deck(rng=Random(seed), lazy=True), 52 * 5)
+
+    assert lazy == eager
+    assert sorted(lazy[:52]) == list(range(52))
+
+
+@pytest.mark.parametrize("decks, penetration", [(1, 1.0), (6, 1.0), (8, 0.75), (2, 0.5)])
+def test_lazy_shoe_deals_like_a_shuffled_one(decks, penetration):
+    """
+    A shoe deals the same cards until its cut card, and over every reshuffle when it's dealt out
+    """
+
+    cut = decks * 52 - int(decks * 52 * (1 - penetration))
+    amount = decks * 52 * 3 if penetration == 1.0 else cut
+
+    eager = deal(Shoe(decks, penetration, rng=Random(decks)), amount)
+    lazy = deal(Shoe(decks, penetration, rng=Random(decks), lazy=True), amount)
+
+    assert lazy == eager
+
+
+def test_lazy_shoe_deals_like_a_shuffled_one_through_its_discards():
+    """
+    Shuffling the discards back in the middle of a round keeps both shoes dealing the same cards
+    """
+
+    shoes = [Shoe(1, 1.0, rng=Random(5)), Shoe(1, 1.0, rng=Random(5), lazy=True)]
+    dealt = [[], []]
+    for shoe, codes in zip(shoes, dealt):
+        shoe.shuffle()
+        for _ in range(30):
+            hand = [shoe.deal_card() for _ in range(5)]
+            codes.extend(card.code for card in hand)
+            shoe.discard(hand)
+
+    assert shoes[0].reshuffles == shoes[1].reshuffles > 0
+    assert dealt[1] == dealt[0]
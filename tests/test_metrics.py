@@ -0,0 +1,116 @@
+"""
+Tests that metrics recorded from any thread render in the Prometheus text format.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from blackjack.metrics import Counter, Gauge, Histogram, Registry, serve
+
+
+def test_render_format():
+    """
+    Every kind of metric renders its help, type and samples, with labels escaped
+    """
+
+    registry = Registry()
+    rounds = registry.register(Counter("rounds_total", "Rounds settled"))
+    outcomes = registry.register(Counter("outcomes_total", "Hands by outcome", ("outcome",)))
+    seconds = registry.register(Histogram("action_seconds", "Seconds per action", (0.1, 1.0), ("action",)))
+    registry.register(Gauge("sessions", "Open sessions", lambda: 3))
+
+    rounds.inc()
+    rounds.inc(2)
+    outcomes.labels("win").inc()
+    outcomes.labels('say "hi"\\\n').inc(0.5)
+    hit = seconds.labels("hit")
+    for value in (0.05, 0.1, 0.5, 2.0):
+        hit.observe(value)
+
+    assert registry.render() == (
+        "# HELP rounds_total Rounds settled\n"
+        "# TYPE rounds_total counter\n"
+        "rounds_total 3\n"
+        "# HELP outcomes_total Hands by outcome\n"
+        "# TYPE outcomes_total counter\n"
+        'outcomes_total{outcome="win"} 1\n'
+        'outcomes_total{outcome="say \\"hi\\"\\\\\\n"} 0.5\n'
+        "# HELP action_seconds Seconds per action\n"
+        "# TYPE action_seconds histogram\n"
+        'action_seconds_bucket{action="hit",le="0.1"} 2\n'
+        'action_seconds_bucket{action="hit",le="1.0"} 3\n'
+        'action_seconds_bucket{action="hit",le="+Inf"} 4\n'
+        'action_seconds_sum{action="hit"} 2.65\n'
+        'action_seconds_count{action="hit"} 4\n'
+        "# HELP sessions Open sessions\n"
+        "# TYPE sessions gauge\n"
+        "sessions 3\n")
+
+
+def test_threads_add_up():
+    """
+    Every thread records to its own cells, which all count once the metrics are read
+    """
+
+    counter = Counter("hits_total", "Hits")
+    histogram = Histogram("seconds", "Seconds", (1.0,))
+
+    def record():
+        for _ in range(10_000):
+            counter.inc()
+            histogram.observe(0.5)
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.value == 80_000
+    assert 'seconds_bucket{le="1.0"} 80000' in histogram.render()
+
+
+def test_labels_are_checked():
+    """
+    Children need a value for every label name, and gauges have no labels at all
+    """
+
+    counter = Counter("outcomes_total", "Hands by outcome", ("outcome",))
+    assert counter.labels("win") is counter.labels("win")
+    with pytest.raises(ValueError):
+        counter.labels("win", "extra")
+    with pytest.raises(ValueError):
+        Gauge("sessions", "Open sessions", lambda: 0).labels()
+
+
+def test_serves_metrics_over_http():
+    """
+    GET /metrics answers with the rendered registry, anything else isn't found
+    """
+
+    registry = Registry()
+    registry.register(Counter("rounds_total", "Rounds settled")).inc(7)
+
+    async def get(port: int, path: str) -> bytes:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.0\r\nHost: localhost\r\n\r\n".encode())
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        return response
+
+    async def run():
+        server = await serve("127.0.0.1", 0, registry)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return await get(port, "/metrics"), await get(port, "/")
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    found, missing = asyncio.run(run())
+    assert found.startswith(b"HTTP/1.0 200 OK\r\n")
+    assert found.endswith(b"\r\n\r\n" + registry.render().encode())
+    assert b"rounds_total 7\n" in found
+    assert missing.startswith(b"HTTP/1.0 404 Not Found\r\n")
@@ -0,0 +1,50 @@
+"""
+Tests that sharded simulations give the same result whatever the amount of processes playing them.
+"""
+from fractions import Fraction
+
+import pytest
+
+from blackjack.count import HI_LO
+from blackjack.engine import dealer_policy
+from blackjack.parallel import Summary, shard_seeds, simulate
+from blackjack.rules import Rules
+
+
+def fields(summary: Summary) -> tuple:
+    """
+    Gets everything a summary holds except how long it took
+
+    Parameters:
+        summary (Summary): The summary of a simulation
+
+    Returns:
+        The sums and histograms of the summary
+    """
+
+    return (summary.rounds, summary.outcomes, summary.wagered, summary.net, summary.net_squares,
+            summary.rebuys, summary.player_totals, summary.dealer_totals)
+
+
+@pytest.mark.parametrize("decks, count_system, rules", [(1, None, Rules()),
+                                                        (6, HI_LO, Rules(True, Fraction(3, 2), Fraction(0)))])
+def test_workers_give_identical_results(decks, count_system, rules):
+    """
+    The same master seed and amount of shards give a bit-identical summary with 1, 2 or 3 workers
+    """
+
+    results = [fields(simulate(30_001, 9, workers, 6, dealer_policy, 100, 500, decks, 0.75, count_system, rules))
+               for workers in (1, 2, 3)]
+
+    assert results[0] == results[1] == results[2]
+    assert results[0][0] == 30_001
+
+
+def test_seeds_change_the_result():
+    """
+    Shards get different seeds, and a different master seed gives a different result
+    """
+
+    assert len(set(shard_seeds(9, 8))) == 8
+    assert shard_seeds(9, 8) == shard_seeds(9, 8)
+    assert fields(simulate(5000, 9, 1, 2)) != fields(simulate(5000, 10, 1, 2))
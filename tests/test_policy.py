@@ -0,0 +1,26 @@
+"""
+Tests that the interactive policy asks with the prompts of blackjack, timing every answer.
+"""
+from blackjack import instrumentation
+from blackjack.policy import InteractivePolicy
+
+
+def test_interactive_policy_times_its_prompts(monkeypatch):
+    """
+    Invalid answers are asked again, and the bet and hit prompts each record one call
+    """
+
+    answers = iter(["ten", "50", "150", "x", "h", "stay"])
+    monkeypatch.setattr("builtins.input", lambda prompt: next(answers))
+    monkeypatch.setattr(instrumentation, "enabled", True)
+    instrumentation.reset()
+
+    policy = InteractivePolicy()
+    try:
+        assert policy.bet(1000) == 150
+        assert policy.hit(12, False, 10)
+        assert not policy.hit(15, False, 10)
+        assert instrumentation.counters == {"bet": 1, "player": 2}
+        assert set(instrumentation.timers) == {"bet", "player"}
+    finally:
+        instrumentation.reset()
@@ -0,0 +1,111 @@
+"""
+Tests that hand histories recorded by the engine and by game sessions replay without divergences.
+"""
+from fractions import Fraction
+from random import Random
+
+import pytest
+
+from blackjack import blackjack
+from blackjack.count import HI_LO
+from blackjack.engine import dealer_policy, simulate, stand_policy
+from blackjack.history import CARD_CODES, CARD_VALUES, HandHistoryWriter
+from blackjack.replay import VALUE_CARDS, VALUE_VALUES, ReplayDeck, ReplayEngine, replay, replay_round, replay_values
+from blackjack.rules import DEFAULT_RULES, Rules
+from blackjack.session import PLAYER_TURN, GameSession
+
+H17_3_TO_2 = Rules(True, Fraction(3, 2), Fraction(0))
+
+
+@pytest.mark.parametrize("bet, decks, rules", [(100, 1, DEFAULT_RULES),
+                                               (50, 6, DEFAULT_RULES),
+                                               (100, 6, H17_3_TO_2),
+                                               (25, 2, Rules(False, Fraction(6, 5), Fraction(1)))])
+def test_engine_history_replays(tmp_path, bet, decks, rules):
+    """
+    Rounds recorded by engine.simulate replay exactly, whatever the bet and rules
+    """
+
+    with HandHistoryWriter(str(tmp_path), 7, decks, 0.75, CARD_VALUES, rules) as history:
+        simulate(5000, 7, dealer_policy, bet, 300, decks, history=history, rules=rules)
+
+    for sessions in (False, True):
+        result = replay(str(tmp_path), sessions=sessions)
+        assert result.rounds == 5000
+        assert result.diverged == 0, result.divergences[:5]
+
+
+def test_count_betting_history_replays(tmp_path):
+    """
+    Bets sized from the true count are replayed as they were placed
+    """
+
+    from blackjack.policy import CountBetting, TablePolicy
+
+    policy = CountBetting(10, 8, TablePolicy.compile(stand_policy))
+    with HandHistoryWriter(str(tmp_path), 3, 6, 0.75) as history:
+        simulate(5000, 3, policy, decks=6, count_system=HI_LO, history=history)
+
+    assert replay(str(tmp_path)).diverged == 0
+
+
+def test_session_history_replays(tmp_path):
+    """
+    Rounds recorded by a game session, with its shoe and reshuffles, replay exactly
+    """
+
+    with HandHistoryWriter(str(tmp_path), 1, 2, 1.0, CARD_CODES, H17_3_TO_2) as history:
+        session = GameSession(blackjack.init_shoe(2, 1.0, Random(1)), 10_000, history, H17_3_TO_2, table=3)
+        for _ in range(3000):
+            session.bet(100)
+            session.deal()
+            while session.state == PLAYER_TURN and session.p_hand.total < 15:
+                session.hit()
+            if session.state == PLAYER_TURN:
+                session.stay()
+            session.finish()
+            if session.is_out_of_tokens:
+                session.reset()
+
+    for sessions in (False, True):
+        result = replay(str(tmp_path), sessions=sessions)
+        assert result.rounds == 3000
+        assert result.diverged == 0, result.divergences[:5]
+
+
+def test_short_record_is_a_divergence():
+    """
+    A record without enough cards is reported instead of crashing the replay
+    """
+
+    deck = ReplayDeck()
+    session = GameSession(deck, 0)
+    fields = (0, 0, 0, 1, 0, 100, -100, 900, 2, 1, bytes([10, 10, 10]), 0)
+
+    divergences = replay_round(session, deck, fields, VALUE_CARDS)
+    assert [divergence.field for divergence in divergences] == ["actions"]
+    divergences = replay_values(ReplayEngine(DEFAULT_RULES), fields, VALUE_VALUES)
+    assert [divergence.field for divergence in divergences] == ["actions"]
+
+
+@pytest.mark.parametrize("fields, expected", [
+    # A 20 against a 19 is a win, not a loss
+    ((0, 0, 0, 1, 1, 100, -100, 900, 2, 2, bytes([10, 10, 10, 9]), 0), ["outcome", "tokens"]),
+    # A hit on 20 can't be taken once it reaches 21
+    ((0, 0, 0, 5, 0, 100, 100, 1100, 4, 2, bytes([10, 9, 10, 7, 2, 3]), 0), ["actions"]),
+    # The dealer's 16 has to draw past the recorded cards
+    ((0, 0, 0, 1, 1, 100, -100, 900, 2, 2, bytes([10, 7, 10, 6]), 0), ["dealer cards"]),
+    # The dealer's 17 doesn't draw the last recorded card
+    ((0, 0, 0, 3, 1, 100, 100, 1100, 2, 3, bytes([10, 8, 10, 7, 4]), 0), ["dealer cards"]),
+])
+def test_engine_replay_finds_divergences(fields, expected):
+    """
+    The engine reports divergences a game session also finds, though only
+    a session settles a round whose dealer ran out of recorded cards
+    """
+
+    deck = ReplayDeck()
+    session = GameSession(deck, 0)
+    divergences = replay_values(ReplayEngine(DEFAULT_RULES), fields, VALUE_VALUES)
+    assert [divergence.field for divergence in divergences] == expected
+    assert set(expected) <= {divergence.field for divergence in replay_round(session, deck, fields, VALUE_CARDS)}
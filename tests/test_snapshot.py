@@ -0,0 +1,117 @@
+"""
+Tests that sessions restored from snapshots and checkpoints play on exactly like the saved ones.
+"""
+from random import Random, SystemRandom
+
+import pytest
+
+from blackjack.deck import Deck
+from blackjack.session import BETTING, PLAYER_TURN, GameSession
+from blackjack.shoe import Shoe
+from blackjack.snapshot import dump, load, read_checkpoint, write_checkpoint
+
+
+def play(session: GameSession, rounds: int) -> list:
+    """
+    Plays rounds hitting below 17, finishing a round already dealt and leaving the last one dealt
+
+    Parameters:
+        session (GameSession): The session to play
+        rounds (int): The amount of rounds to finish
+
+    Returns:
+        What happened in every round
+    """
+
+    played = []
+    for _ in range(rounds):
+        if session.state == BETTING:
+            session.bet(100)
+            session.deal()
+        while session.state == PLAYER_TURN and session.p_hand.total < 17:
+            session.hit()
+        if session.state == PLAYER_TURN:
+            session.stay()
+        played.append((session.finish(), session.tokens.total_tokens,
+                       [card.code for card in session.p_hand.cards], [card.code for card in session.d_hand.cards],
+                       session.deck.reshuffles, session.deck.dealt))
+        if session.is_out_of_tokens:
+            session.reset()
+
+    session.bet(100)
+    session.deal()
+    return played
+
+
+def shoes():
+    """
+    Makes every kind of shoe a snapshot can hold
+    """
+
+    yield Shoe(6, 0.75, rng=Random(1))
+    yield Shoe(2, 1.0, rng=Random(2), lazy=True)
+    numpy = pytest.importorskip("numpy")
+    yield Shoe(6, 0.75, rng=numpy.random.default_rng(3))
+    yield Shoe(6, 0.75, rng=numpy.random.Generator(numpy.random.MT19937(4)), lazy=True)
+
+
+@pytest.mark.parametrize("index", range(4))
+def test_snapshot_deals_the_same_rounds(index):
+    """
+    A restored session deals the same later rounds as the saved one
+    """
+
+    shoe = list(shoes())[index]
+    shoe.shuffle()
+    session = GameSession(shoe, 5000, table=4)
+    play(session, 150)
+
+    restored = load(dump(session))
+    assert restored.table == 4
+    assert restored.state == session.state
+    assert play(restored, 300) == play(session, 300)
+
+
+def test_single_deck_snapshot():
+    """
+    A session dealing from a single deck is restored in the middle of a round
+    """
+
+    deck = Deck(rng=Random(5))
+    deck.shuffle()
+    session = GameSession(deck, 1000)
+    play(session, 2)
+
+    restored = load(dump(session))
+    assert [card.code for card in restored.deck.cards] == [card.code for card in deck.cards]
+    assert restored.p_hand.cards == session.p_hand.cards
+
+
+def test_checkpoint_round_trip(tmp_path):
+    """
+    Every session of a checkpoint is restored under its number
+    """
+
+    sessions = {}
+    for number in range(5):
+        shoe = Shoe(6, 0.75, rng=Random(number))
+        shoe.shuffle()
+        sessions[number * 10] = GameSession(shoe, 1000)
+        play(sessions[number * 10], number)
+
+    path = str(tmp_path / "checkpoint.bjc")
+    write_checkpoint(path, sessions, sync=False)
+    restored = read_checkpoint(path)
+
+    assert sorted(restored) == sorted(sessions)
+    for number, session in sessions.items():
+        assert play(restored[number], 50) == play(session, 50)
+
+
+def test_unsaveable_generator_is_refused():
+    """
+    A generator whose state can't be saved raises instead of being lost
+    """
+
+    with pytest.raises(ValueError):
+        dump(GameSession(Shoe(1, rng=SystemRandom())))
@@ -0,0 +1,64 @@
+"""
+Tests that streamed statistics match the rounds they were given, whether they're kept in one pass or merged.
+"""
+import statistics
+
+import pytest
+
+from blackjack.engine import LOSE, WIN
+from blackjack.stats import RoundStats, play_rounds
+
+
+def test_merge_equals_a_single_pass():
+    """
+    Statistics of the two halves of a stream merge into the statistics of the whole stream
+    """
+
+    rounds = list(play_rounds(20_000, 3, decks=6, starting_tokens=100_000_000))
+    whole = RoundStats().consume(rounds)
+    merged = RoundStats().consume(rounds[:7_321])
+    merged.merge(RoundStats().consume(rounds[7_321:]))
+
+    assert (merged.rounds, merged.wagered, merged.net) == (whole.rounds, whole.wagered, whole.net)
+    assert merged.outcomes == whole.outcomes
+    assert merged.dealer_rounds == whole.dealer_rounds
+    assert merged.dealer_busts == whole.dealer_busts
+    assert merged.mean == pytest.approx(whole.mean, rel=1e-9)
+    assert merged.variance == pytest.approx(whole.variance, rel=1e-9)
+    assert merged.confidence_interval() == pytest.approx(whole.confidence_interval(), rel=1e-9)
+
+    returns = [net / bet for _, bet, net, _, _, _ in rounds]
+    assert whole.mean == pytest.approx(statistics.fmean(returns), rel=1e-9)
+    assert whole.variance == pytest.approx(statistics.variance(returns), rel=1e-9)
+    assert whole.house_edge == -sum(returns) * 100 / whole.wagered
+
+
+def test_merging_empty_statistics():
+    """
+    Empty statistics change nothing when merged either way
+    """
+
+    stats = RoundStats().consume(play_rounds(1000, 4))
+    mean, variance = stats.mean, stats.variance
+    stats.merge(RoundStats())
+    assert (stats.rounds, stats.mean, stats.variance) == (1000, mean, variance)
+
+    empty = RoundStats()
+    empty.merge(stats)
+    assert (empty.rounds, empty.mean, empty.variance) == (1000, mean, pytest.approx(variance))
+
+
+def test_drawdown_starts_over_on_a_rebuy():
+    """
+    The drawdown follows the peak of the bankroll, and a rebuy starts a new one
+    """
+
+    stats = RoundStats()
+    # Up to 1200, down to 0 and a rebuy of 1000 that goes down to 900
+    for outcome, net, tokens in [(WIN, 200, 1200), (LOSE, -600, 600), (LOSE, -600, 0),
+                                 (WIN, 100, 1100), (LOSE, -200, 900)]:
+        stats.add(outcome, abs(net), net, tokens, 10, 20)
+
+    assert stats.max_drawdown == 1200
+    assert stats.longest_drawdown == 2
+    assert stats.drawdown == 200
@@ -0,0 +1,145 @@
+"""
+Tests that a table deals in casino order, settles every seat on its own and reshuffles its shared shoe in time.
+"""
+from fractions import Fraction
+from random import Random
+
+from blackjack.card import CARDS, Card
+from blackjack.deck import Deck
+from blackjack.engine import BLACKJACK, DEALER_BUST, PLAYER_BUST, WIN
+from blackjack.policy import MimicDealer
+from blackjack.rules import Rules
+from blackjack.session import BETTING, DEALER_TURN, PLAYER_TURN, SETTLING
+from blackjack.shoe import Shoe
+from blackjack.table import Table
+
+
+def stacked_deck(*ranks: str) -> Deck:
+    """
+    Makes a single deck that deals cards of the given ranks first, in that order
+
+    Parameters:
+        ranks (str): The ranks of the first cards, at most four of each
+
+    Returns:
+        The stacked deck
+    """
+
+    suits = {}
+    first = []
+    for rank in ranks:
+        suits[rank] = suits.get(rank, -1) + 1
+        first.append(Card(rank, ("Clubs", "Diamonds", "Hearts", "Spades")[suits[rank]]))
+
+    cards = [card for card in CARDS if card not in first] + first[::-1]
+    deck = Deck()
+    deck.set_state(cards, len(cards), 0, [4] * 13, [0])
+    return deck
+
+
+def test_settles_every_seat():
+    """
+    Seats are dealt in casino order and settled against the dealer on their own, a seat that sat out isn't
+    """
+
+    # Seat 0, seat 1, the dealer's upcard, seat 0, seat 1, the hole card and seat 1's hit
+    table = Table(stacked_deck("Ten", "Ten", "Ten", "Nine", "Six", "Eight", "King"), 3)
+    table.bet(0, 100)
+    table.bet(1, 200)
+    table.deal()
+
+    assert table.state == PLAYER_TURN and table.turn == 0
+    assert [card.rank for card in table.d_hand.cards] == ["Ten", "Eight"]
+    table.stay()
+    assert table.turn == 1
+    table.hit()
+    assert table.state == DEALER_TURN
+
+    table.play_dealer()
+    assert table.settle() == [WIN, PLAYER_BUST, None]
+    assert [seat.tokens.total_tokens for seat in table.seats] == [1100, 800, 1000]
+    assert [seat.outcome for seat in table.seats] == [WIN, PLAYER_BUST, None]
+    assert table.state == BETTING
+
+
+def test_blackjack_pays_by_the_rules():
+    """
+    A seat with a blackjack has nothing to decide and is paid what the rules say, the others still play
+    """
+
+    table = Table(stacked_deck("Ace", "Seven", "Six", "King", "Ten", "Ten", "Ten"), 2,
+                  rules=Rules(blackjack_pays=Fraction(3, 2)))
+    table.bet(0, 100)
+    table.bet(1, 100)
+    table.deal()
+
+    assert table.turn == 1
+    table.stay()
+    table.play_dealer()
+    assert [card.rank for card in table.d_hand.cards] == ["Six", "Ten", "Ten"]
+    assert table.settle() == [BLACKJACK, DEALER_BUST]
+    assert [seat.tokens.total_tokens for seat in table.seats] == [1150, 1100]
+
+
+def test_dealer_doesnt_play_when_every_seat_busts():
+    """
+    Once every seat has busted the round goes straight to settling
+    """
+
+    table = Table(stacked_deck("Ten", "Six", "Ten", "Six", "King"), 1)
+    table.bet(0, 100)
+    table.deal()
+    table.hit()
+
+    assert table.state == SETTLING
+    assert len(table.d_hand.cards) == 2
+    assert table.settle() == [PLAYER_BUST]
+
+
+def test_reshuffles_when_the_deck_runs_short():
+    """
+    A single deck is reshuffled before a round that may not have enough cards, so dealing never runs out
+    """
+
+    table = Table(Deck(rng=Random(1)), 7)
+    table.deck.shuffle()
+    policies = [MimicDealer()] * 7
+    rounds = 0
+    while table.deck.reshuffles < 3:
+        left = table.deck.cards_left
+        reshuffles = table.deck.reshuffles
+        table.play_round(policies)
+        rounds += 1
+        assert table.deck.reshuffles == reshuffles + (left < 5 * 8)
+        for seat in table.seats:
+            if seat.tokens.total_tokens <= 0:
+                seat.reset(1000)
+
+    assert rounds > 3
+
+
+def test_shoe_reshuffles_at_the_cut_card():
+    """
+    A shoe is reshuffled before the first round after its cut card, and reset reshuffles it too
+    """
+
+    shoe = Shoe(2, 0.5, rng=Random(2))
+    shoe.shuffle()
+    table = Table(shoe, 2)
+    policies = [MimicDealer(), MimicDealer()]
+
+    while not shoe.needs_reshuffle:
+        table.play_round(policies)
+    assert shoe.reshuffles == 0
+
+    table.play_round(policies)
+    in_round = sum(len(seat.hand.cards) for seat in table.seats) + len(table.d_hand.cards)
+    assert shoe.reshuffles == 1
+    assert shoe.dealt == in_round
+
+    table.seats[0].tokens.bet(100)
+    table.reset(500)
+    assert shoe.reshuffles == 2 and shoe.dealt == 0
+    assert [seat.tokens.total_tokens for seat in table.seats] == [500, 500]
+    assert all(seat.outcome is None and not seat.hand.cards for seat in table.seats)
+    assert table.state == BETTING
@@ -0,0 +1,17 @@
+"""
+Tests that the vectorized backend plays by the same rules as the scalar Engine.
+"""
+import pytest
+
+from blackjack.engine import dealer_policy, stand_policy
+
+vectorized = pytest.importorskip("blackjack.vectorized")
+
+
+@pytest.mark.parametrize("policy, decks", [(dealer_policy, 1), (stand_policy, 1), (dealer_policy, 6)])
+def test_cross_check_has_no_mismatches(policy, decks):
+    """
+    Every round dealt by the vectorized backend ends the same when the Engine plays it
+    """
+
+    assert vectorized.cross_check(20_000, 11, policy, decks) == []